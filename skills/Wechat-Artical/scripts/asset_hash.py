@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+素材文件指纹（sha256）
+
+断点续传、素材库、相似图片去重、文章索引都要用到图片的内容哈希。这里统一计算并缓存：
+    - 大文件用 mmap 映射后直接交给 hashlib（不把整个文件读进内存），小文件按固定大小分块读取
+    - 多个文件在线程池中并行计算（hashlib 计算时会释放 GIL）
+    - 结果按 (inode, 大小, 修改时间) 记录在所在目录的 .asset_hashes.json 中，
+      文件没变时只需要一次 stat，不再读取内容；跨进程、跨次运行都有效
+
+用法：
+    python asset_hash.py <目录或文件...> [--workers 8] [--no-cache]
+
+示例：
+    python asset_hash.py ./artical/我的文章/assets
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+
+
+SIDECAR_FILE = ".asset_hashes.json"
+
+CHUNK_SIZE = 1024 * 1024           # 分块读取的块大小
+MMAP_THRESHOLD = 4 * 1024 * 1024   # 不小于这个大小的文件用 mmap
+DEFAULT_WORKERS = 8
+
+_sidecars = {}                     # {目录: _Sidecar}，同一进程内共用
+_sidecars_lock = threading.Lock()
+
+
+def sha256_file(path) -> str:
+    """计算文件内容的 sha256（不使用缓存）"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                h.update(mapped)
+            return h.hexdigest()
+        buffer = bytearray(min(CHUNK_SIZE, max(size, 1)))
+        view = memoryview(buffer)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+def hash_files(paths: list, workers: int = DEFAULT_WORKERS) -> dict:
+    """
+    并行计算多个文件的 sha256（不使用缓存）
+
+    Returns:
+        {路径: sha256}，键与传入的路径相同
+    """
+    paths = list(dict.fromkeys(paths))
+    if len(paths) <= 1 or workers <= 1:
+        return {path: sha256_file(path) for path in paths}
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return dict(zip(paths, pool.map(sha256_file, paths)))
+
+
+def _stat_key(st) -> list:
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+class _Sidecar:
+    """一个目录的 .asset_hashes.json：{文件名: {"stat": [inode, 大小, 修改时间], "sha256"}}"""
+
+    def __init__(self, directory: Path):
+        self.path = directory / SIDECAR_FILE
+        self.lock = threading.Lock()
+        self.entries = self._read()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def lookup(self, name: str, stat_key: list) -> str:
+        with self.lock:
+            entry = self.entries.get(name)
+        if entry and entry.get("stat") == stat_key:
+            return entry["sha256"]
+        return ""
+
+    def update(self, hashes: dict):
+        """
+        记录新计算的哈希并原子写入（先合并其他进程写入的记录）
+
+        Args:
+            hashes: {文件名: (stat_key, sha256)}
+        """
+        with self.lock:
+            entries = self._read()
+            entries.update(self.entries)
+            for name, (stat_key, digest) in hashes.items():
+                entries[name] = {"stat": stat_key, "sha256": digest}
+            self.entries = entries
+            tmp_path = self.path.with_name(f"{SIDECAR_FILE}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                # 目录只读等情况下只在进程内缓存
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+
+def _sidecar(directory: Path) -> _Sidecar:
+    with _sidecars_lock:
+        sidecar = _sidecars.get(directory)
+        if sidecar is None:
+            sidecar = _sidecars[directory] = _Sidecar(directory)
+        return sidecar
+
+
+def fingerprint_many(paths: list, workers: int = DEFAULT_WORKERS) -> dict:
+    """
+    获取多个文件的 sha256：文件没变（inode、大小、修改时间一致）时直接使用缓存，其余并行计算后写入缓存
+
+    Returns:
+        {路径: sha256}，键与传入的路径相同
+    """
+    result = {}
+    missing = {}    # {路径: (目录, 文件名, stat_key)}
+    for path in dict.fromkeys(paths):
+        full_path = Path(path).resolve()
+        stat_key = _stat_key(full_path.stat())
+        digest = _sidecar(full_path.parent).lookup(full_path.name, stat_key)
+        if digest:
+            result[path] = digest
+        else:
+            missing[path] = (full_path.parent, full_path.name, stat_key)
+    if not missing:
+        return result
+
+    computed = hash_files(list(missing), workers)
+    by_dir = {}
+    for path, digest in computed.items():
+        directory, name, stat_key = missing[path]
+        by_dir.setdefault(directory, {})[name] = (stat_key, digest)
+        result[path] = digest
+    for directory, hashes in by_dir.items():
+        _sidecar(directory).update(hashes)
+    return result
+
+
+def fingerprint(path) -> str:
+    """获取单个文件的 sha256（带缓存，见 fingerprint_many）"""
+    return fingerprint_many([path])[path]
+
+
+def _collect(targets: list) -> list:
+    files = []
+    for target in map(Path, targets):
+        if target.is_dir():
+            files.extend(str(p) for p in sorted(target.iterdir()) if p.is_file() and not p.name.startswith('.'))
+        else:
+            files.append(str(target))
+    return files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="计算素材文件的 sha256（带缓存）")
+    parser.add_argument("paths", nargs="+", help="目录或文件")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并行线程数")
+    parser.add_argument("--no-cache", action="store_true", help="不读写 .asset_hashes.json，全部重新计算")
+    args = parser.parse_args()
+
+    files = _collect(args.paths)
+    if not files:
+        print("错误: 没有找到文件")
+        sys.exit(1)
+    start = time.perf_counter()
+    try:
+        hashes = hash_files(files, args.workers) if args.no_cache else fingerprint_many(files, args.workers)
+    except OSError as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    total = sum(os.path.getsize(path) for path in files)
+    for path in files:
+        print(f"{hashes[path]}  {path}")
+    print(f"{len(files)} 个文件，{total / 1024 / 1024:.1f}MB，耗时 {elapsed * 1000:.1f} ms")
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公众号共享素材库
+
+把 workspace/copy 这类每篇文章都要用的素材（标题图片 1.png..9.png、logo 等）建成素材库：
+清单文件 .library_manifest.json 记录每个文件的内容哈希，以及它在各公众号（appid + 接口地址）下上传后的微信 URL。
+素材只需上传一次（prewarm），之后发布文章时只要图片内容与库中一致，就直接复用 URL，不再上传。
+
+用法：
+    python asset_library.py build   <素材库目录>               # 扫描并更新清单
+    python asset_library.py prewarm <素材库目录>               # 把尚未上传的素材上传到当前公众号
+    python asset_library.py link    <素材库目录> <assets目录> [--hardlink]  # 把素材复制到文章 assets 目录
+    python asset_library.py status  <素材库目录>               # 查看清单和上传情况
+
+示例：
+    python asset_library.py prewarm ./copy
+    python asset_library.py link ./copy ./artical/我的文章/assets
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from asset_hash import hash_files
+
+
+MANIFEST_FILE = ".library_manifest.json"
+
+# 素材库收录的文件类型
+LIBRARY_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+# 旧版清单只按 appid 记录上传地址，视为上传到真实微信接口（与 wechat_publisher.DEFAULT_API_BASE_URL 一致）
+LEGACY_API_BASE_URL = "https://api.weixin.qq.com"
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """跨进程的排他文件锁（没有 fcntl 的平台上不加锁）"""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def upload_key(base_url: str, appid: str) -> str:
+    """清单中 uploads 的键：同一 appid 在真实接口和模拟服务器上传的素材分开记录"""
+    return f"{appid}@{base_url.rstrip('/')}"
+
+
+class AssetLibrary:
+    """素材库清单"""
+
+    def __init__(self, library_dir):
+        self.library_dir = Path(library_dir).expanduser().resolve()
+        self.manifest_path = self.library_dir / MANIFEST_FILE
+        self.lock_path = self.library_dir / (MANIFEST_FILE + ".lock")
+        self.files = {}    # {文件名: {"sha256", "size", "mtime_ns"}}
+        self.uploads = {}  # {upload_key(接口地址, appid): {sha256: {"url", "uploaded_at"}}}
+        # 多公众号并发发布时多个线程共用一个实例
+        self._lock = threading.Lock()
+        self._load()
+
+    def _read(self) -> tuple:
+        """读取清单文件，返回 (files, uploads)"""
+        if not self.manifest_path.exists():
+            return {}, {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        uploads = {
+            key if "@" in key else upload_key(LEGACY_API_BASE_URL, key): urls
+            for key, urls in data.get("uploads", {}).items()
+        }
+        return data.get("files", {}), uploads
+
+    def _load(self):
+        try:
+            self.files, self.uploads = self._read()
+        except Exception as e:
+            print(f"警告: 读取素材库清单失败 - {e}，重新建立")
+
+    def save(self):
+        """
+        原子写入清单文件
+
+        发布和预热可能在多个进程中同时进行：在文件锁内先读出其他进程已写入的上传记录并合并，再写回
+        """
+        tmp_path = self.manifest_path.with_name(f"{self.manifest_path.name}.{os.getpid()}.tmp")
+        with self._lock, _file_lock(self.lock_path):
+            try:
+                _, uploads = self._read()
+            except Exception:
+                uploads = {}
+            for key, urls in self.uploads.items():
+                uploads[key] = {**uploads.get(key, {}), **urls}
+            self.uploads = uploads
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"files": self.files, "uploads": self.uploads}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+    def scan(self) -> dict:
+        """
+        扫描素材库目录，更新文件哈希（大小和修改时间都没变的文件不重新计算）
+
+        Returns:
+            {"added": [...], "changed": [...], "removed": [...]}
+        """
+        if not self.library_dir.is_dir():
+            raise FileNotFoundError(f"素材库目录不存在: {self.library_dir}")
+
+        report = {"added": [], "changed": [], "removed": []}
+        seen = set()
+        stale = {}    # {路径: (文件名, stat)}
+        with os.scandir(self.library_dir) as it:
+            for entry in it:
+                if not entry.is_file() or Path(entry.name).suffix.lower() not in LIBRARY_EXTENSIONS:
+                    continue
+                seen.add(entry.name)
+                st = entry.stat()
+                old = self.files.get(entry.name)
+                if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                    continue
+                stale[entry.path] = (entry.name, st)
+
+        # 新增和修改过的文件并行计算哈希（清单本身已按大小、修改时间缓存）
+        for path, digest in hash_files(sorted(stale)).items():
+            name, st = stale[path]
+            old = self.files.get(name)
+            self.files[name] = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            if old is None:
+                report["added"].append(name)
+            elif old["sha256"] != digest:
+                report["changed"].append(name)
+
+        for name in sorted(set(self.files) - seen):
+            del self.files[name]
+            report["removed"].append(name)
+        return report
+
+    def contains(self, file_hash: str) -> bool:
+        return any(info["sha256"] == file_hash for info in self.files.values())
+
+    def lookup_url(self, base_url: str, appid: str, file_hash: str) -> str:
+        """按内容哈希查找该公众号（在该接口地址下）已上传的 URL"""
+        entry = self.uploads.get(upload_key(base_url, appid), {}).get(file_hash)
+        return entry["url"] if entry else ""
+
+    def record_url(self, base_url: str, appid: str, file_hash: str, url: str):
+        with self._lock:
+            self.uploads.setdefault(upload_key(base_url, appid), {})[file_hash] = {
+                "url": url, "uploaded_at": int(time.time())
+            }
+
+    def prewarm(self, publisher) -> int:
+        """
+        把尚未上传到当前公众号的素材各上传一次
+
+        Args:
+            publisher: WechatPublisher 实例（用于获取 token 和上传图片）
+
+        Returns:
+            本次上传的文件数
+        """
+        pending = [
+            (name, info) for name, info in sorted(self.files.items())
+            if not self.lookup_url(publisher.api_base_url, publisher.appid, info["sha256"])
+        ]
+        if not pending:
+            print("所有素材均已上传，无需预热")
+            return 0
+        if not publisher._get_token():
+            raise RuntimeError("获取 access_token 失败")
+
+        uploaded = 0
+        for name, info in pending:
+            url = publisher._upload_content_image(str(self.library_dir / name))
+            if url:
+                self.record_url(publisher.api_base_url, publisher.appid, info["sha256"], url)
+                uploaded += 1
+                # 每上传一个就保存，中途失败也不丢失已上传的记录
+                self.save()
+        return uploaded
+
+    def link_into(self, assets_dir, hardlink: bool = False) -> list:
+        """
+        把素材放进文章 assets 目录
+
+        默认复制。hardlink=True 时使用硬链接（不占额外空间，跨文件系统等无法硬链接时退回复制），
+        但文章目录中的文件与素材库是同一个文件：原地修改任何一篇文章的标题图片，
+        素材库和其他链接了它的文章都会跟着变，只适合不会在文章里改动素材的场景。
+
+        Returns:
+            [(文件名, "link" 或 "copy")]
+        """
+        assets_dir = Path(assets_dir)
+        assets_dir.mkdir(parents=True, exist_ok=True)
+        result = []
+        for name in sorted(self.files):
+            src = self.library_dir / name
+            dst = assets_dir / name
+            if dst.exists():
+                if os.path.samefile(src, dst):
+                    if hardlink:
+                        result.append((name, "link"))
+                        continue
+                    # 之前以硬链接放入的文件：断开链接，换成独立的副本
+                dst.unlink()
+            if hardlink:
+                try:
+                    os.link(src, dst)
+                    result.append((name, "link"))
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(src, dst)
+            result.append((name, "copy"))
+        return result
+
+
+def _usage():
+    print("用法: python asset_library.py build|prewarm|status <素材库目录>")
+    print("      python asset_library.py link <素材库目录> <assets目录> [--hardlink]")
+    print("示例: python asset_library.py prewarm ./copy")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in ("build", "prewarm", "link", "status"):
+        _usage()
+        sys.exit(1)
+
+    command, library_dir = sys.argv[1], sys.argv[2]
+    try:
+        library = AssetLibrary(library_dir)
+        report = library.scan()
+    except Exception as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+
+    if command == "build":
+        library.save()
+        print(f"素材库: {library.library_dir}，共 {len(library.files)} 个文件")
+        for key, label in (("added", "新增"), ("changed", "变化"), ("removed", "删除")):
+            if report[key]:
+                print(f"  {label}: {', '.join(report[key])}")
+
+    elif command == "prewarm":
+        from wechat_publisher import WechatPublisher
+        library.save()
+        try:
+            count = library.prewarm(WechatPublisher(library.library_dir))
+        except Exception as e:
+            print(f"错误: 预热失败 - {e}")
+            sys.exit(1)
+        print(f"预热完成，本次上传 {count} 个素材")
+
+    elif command == "link":
+        hardlink = "--hardlink" in sys.argv[4:]
+        if len(sys.argv) != 4 + hardlink:
+            _usage()
+            sys.exit(1)
+        library.save()
+        linked = library.link_into(sys.argv[3], hardlink)
+        for name, how in linked:
+            print(f"  {name}: {'硬链接' if how == 'link' else '复制'}")
+        print(f"已放入 {len(linked)} 个素材: {Path(sys.argv[3]).resolve()}")
+
+    else:
+        library.save()
+        print(f"素材库: {library.library_dir}")
+        for name, info in sorted(library.files.items()):
+            accounts = [key for key, urls in library.uploads.items() if info["sha256"] in urls]
+            print(f"  {name}  {info['sha256'][:12]}  已上传: {', '.join(accounts) or '无'}")
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微信公众号异步发布（aiohttp）
+
+WechatPublisher 的协程版本：获取 token、上传封面、上传正文图片、保存草稿都是协程，
+同一批文章共用一个 aiohttp.ClientSession（连接复用），图片以 multipart 流的方式从磁盘上传，
+不整体读入内存。同一篇文章的正文图片并发上传。
+解析、预检、渲染、断点状态、素材库、相似图片去重与 WechatPublisher 完全相同。
+
+一个线程里就能同时发布大量文章；img_creator 等异步代码可以直接 await publish_article_async。
+不写异步代码时使用同步入口 publish_article / publish_articles。
+
+用法：
+    python async_publisher.py <文章目录>... [--concurrency 16] [--new-draft]
+
+示例：
+    python catalog.py list ./artical --dirty --paths | xargs python async_publisher.py --concurrency 32
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+
+from wechat_publisher import (
+    INVALID_TOKEN_ERRCODES, TOKEN_EXPIRY_MARGIN, WechatPublisher,
+    _draft_hash, _file_hash, _get_config, _get_metrics, _get_wechat_api, _record_api_call, _record_publish,
+    _token_cache, _token_lock,
+)
+
+
+DEFAULT_CONCURRENCY = 16     # 同时发布的文章数
+DEFAULT_CONNECTIONS = 100    # 同时打开的 HTTP 连接上限
+HTTP_TIMEOUT = 30            # 单个请求超时（秒）
+
+
+async def _in_thread(func, *args, **kwargs):
+    """
+    在线程池中执行阻塞操作
+
+    预检、哈希、断点状态和素材库清单写入、接口计数的 SQLite 写入都会访问磁盘，
+    直接在协程里执行会卡住同一事件循环上所有文章的上传
+    """
+    import asyncio
+
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+class AsyncSession:
+    """一批发布任务共用的 aiohttp 会话，以及按公众号区分的 token 获取锁"""
+
+    def __init__(self, max_connections: int = DEFAULT_CONNECTIONS):
+        self.max_connections = max_connections
+        self.http = None
+        self._token_locks = {}
+
+    async def __aenter__(self) -> "AsyncSession":
+        import aiohttp
+
+        self.http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.close()
+
+    def token_lock(self, cache_key):
+        """同一公众号同一时刻只有一个协程去获取 token，其余等它完成后直接复用"""
+        import asyncio
+
+        lock = self._token_locks.get(cache_key)
+        if lock is None:
+            lock = self._token_locks[cache_key] = asyncio.Lock()
+        return lock
+
+    async def get_json(self, url: str, params: dict = None) -> dict:
+        async with self.http.get(url, params=params) as response:
+            return await response.json(content_type=None)
+
+    async def post_json(self, url: str, payload: dict) -> dict:
+        async with self.http.post(
+            url,
+            data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+        ) as response:
+            return await response.json(content_type=None)
+
+    async def post_file(self, url: str, file_path: str) -> dict:
+        """multipart 上传（字段名 media），文件由 aiohttp 分块从磁盘读取"""
+        import aiohttp
+
+        with open(file_path, 'rb') as f:
+            form = aiohttp.FormData()
+            form.add_field('media', f, filename=os.path.basename(file_path), content_type='image/png')
+            async with self.http.post(url, data=form) as response:
+                return await response.json(content_type=None)
+
+
+class AsyncWechatPublisher(WechatPublisher):
+    """微信公众号发布器（协程版）"""
+
+    def __init__(self, article_dir: str, session: AsyncSession, account: dict = None, library=None,
+                 sync_draft: bool = True):
+        """
+        Args:
+            article_dir: 文章目录路径
+            session: 共用的 AsyncSession（需已进入 async with）
+            其余参数同 WechatPublisher
+        """
+        super().__init__(article_dir, account, library, sync_draft)
+        self.session = session
+
+    async def run(self) -> str:
+        """执行发布流程"""
+        print("\n" + "=" * 50)
+        print("   微信公众号文章发布")
+        print("=" * 50 + "\n")
+
+        error = await _in_thread(self._prepare)
+        if error:
+            return error
+
+        # access_token 在第一次真正调用接口前才获取（见 _ensure_token）
+        thumb_media_id = await self._ensure_cover(self.parser.get_cover_path())
+        if not thumb_media_id:
+            return self._token_error() or "错误: 上传封面图片失败"
+
+        html_content, parts = await self._process_content()
+        await _in_thread(self.state.set_html_hash, hashlib.sha256(html_content.encode('utf-8')).hexdigest())
+        preview_path = await _in_thread(self._write_preview, html_content)
+        print(f"      已生成预览: {preview_path}")
+
+        result = await self._save_draft(
+            title=self.parser.title,
+            html_content=html_content,
+            thumb_media_id=thumb_media_id,
+            parts=parts,
+        )
+        result = self._token_error() or result
+        self._print_result(result)
+        return result
+
+    # ========== token ==========
+
+    async def _get_token(self, stale: str = "") -> bool:
+        """获取 access_token；stale 为已确认失效的 token，缓存中仍是它时重新获取"""
+        print("[2/6] 获取 access_token...")
+
+        cache_key = (_get_wechat_api()['token'], self.appid)
+        async with self.session.token_lock(cache_key):
+            with _token_lock:
+                token, expires_at = _token_cache.get(cache_key, ("", 0))
+            if token and token != stale and time.time() < expires_at:
+                self.access_token = token
+                print(f"      复用 access_token，剩余 {int(expires_at - time.time())} 秒")
+                return True
+
+            start = time.perf_counter()
+            data = await self.session.get_json(_get_wechat_api()['token'], params={
+                "grant_type": "client_credential", "appid": self.appid, "secret": self.appsecret,
+            })
+            await _in_thread(_record_api_call, self.appid, "token", data, time.perf_counter() - start)
+
+            if 'access_token' in data:
+                _get_metrics().inc("wechat_token_refresh_total", appid=self.appid)
+                self.access_token = data['access_token']
+                expires_in = data.get('expires_in', 7200)
+                with _token_lock:
+                    _token_cache[cache_key] = (self.access_token, time.time() + expires_in - TOKEN_EXPIRY_MARGIN)
+                print(f"      成功，有效期 {expires_in} 秒")
+                return True
+            print(f"      失败: {data}")
+            return False
+
+    async def _ensure_token(self) -> bool:
+        """同 WechatPublisher._ensure_token；并发上传的协程由 token_lock 保证只获取一次"""
+        if self.access_token is None and not self.token_failed:
+            self.token_failed = not await self._get_token()
+        return not self.token_failed
+
+    async def _call_with_token(self, send, api: str) -> dict:
+        """await send(access_token)，token 失效时重新获取一次并重试（并发的协程只会获取一次）"""
+        if not await self._ensure_token():
+            return {"errmsg": "获取 access_token 失败"}
+        start = time.perf_counter()
+        data = await send(self.access_token)
+        await _in_thread(_record_api_call, self.appid, api, data, time.perf_counter() - start)
+        if data.get('errcode') in INVALID_TOKEN_ERRCODES:
+            print(f"      access_token 已失效（{data['errcode']}），重新获取")
+            if await self._get_token(stale=self.access_token):
+                start = time.perf_counter()
+                data = await send(self.access_token)
+                await _in_thread(_record_api_call, self.appid, api, data, time.perf_counter() - start)
+        return data
+
+    # ========== 封面与图片 ==========
+
+    async def _ensure_cover(self, cover_path: str) -> str:
+        """上传封面，封面内容未变化时复用断点状态中的 media_id"""
+        cover_hash = await _in_thread(_file_hash, cover_path)
+        thumb_media_id = self.state.get_thumb(cover_hash)
+        if thumb_media_id:
+            print(f"[3/6] 封面未变化，复用 media_id: {thumb_media_id[:20]}...")
+            return thumb_media_id
+        thumb_media_id = await self._upload_cover(cover_path)
+        if thumb_media_id:
+            await _in_thread(self.state.set_thumb, cover_hash, thumb_media_id)
+        return thumb_media_id
+
+    async def _upload_cover(self, image_path: str) -> str:
+        """上传封面图片"""
+        print(f"[3/6] 上传封面图片: {image_path}")
+
+        def send(access_token):
+            url = f"{_get_wechat_api()['upload_material']}?access_token={access_token}&type=image"
+            return self.session.post_file(url, image_path)
+
+        data = await self._call_with_token(send, "upload_material")
+        if 'media_id' in data:
+            self._record_upload("upload_material", image_path)
+            print(f"      成功，media_id: {data['media_id'][:20]}...")
+            return data['media_id']
+        print(f"      失败: {data}")
+        return ""
+
+    async def _upload_content_image(self, image_path: str) -> str:
+        """上传正文图片"""
+        print(f"      上传图片: {image_path}")
+
+        def send(access_token):
+            return self.session.post_file(f"{_get_wechat_api()['upload_img']}?access_token={access_token}", image_path)
+
+        data = await self._call_with_token(send, "upload_img")
+        if 'url' in data:
+            self._record_upload("upload_img", image_path)
+            print("      成功")
+            return data['url']
+        print(f"      失败: {data}")
+        return ""
+
+    async def _upload_content_image_cached(self, key: str, image_path: str) -> str:
+        """上传正文图片，断点状态或素材库中已有时直接复用"""
+        # 哈希、断点状态写入、素材库相似图片比对都在线程中执行
+        file_hash = await _in_thread(_file_hash, image_path)
+        reused_url = await _in_thread(self._reuse_image_url, key, image_path, file_hash)
+        if reused_url:
+            return reused_url
+
+        wechat_url = await self._upload_content_image(image_path)
+        if wechat_url:
+            await _in_thread(self._remember_image_url, key, file_hash, wechat_url)
+        return wechat_url
+
+    async def _upload_images(self, template: dict) -> dict:
+        """并发上传模板中的图片，相似图片只上传代表图片，返回 {图片 key: 微信 URL}"""
+        import asyncio
+
+        images = template["images"]
+        # 感知哈希要解码图片，放到线程里算，不阻塞其他文章的上传
+        similar = await asyncio.to_thread(self._similar_images, template)
+        keys = [key for key in images if key not in similar]
+        results = await asyncio.gather(*(self._upload_content_image_cached(key, images[key]) for key in keys))
+        urls = {key: url for key, url in zip(keys, results) if url}
+
+        for key in images:
+            if key not in similar:
+                continue
+            if similar[key] in urls:
+                await _in_thread(self._reuse_similar, key, images[key], similar[key], urls)
+                continue
+            # 代表图片上传失败，自己单独上传
+            wechat_url = await self._upload_content_image_cached(key, images[key])
+            if wechat_url:
+                urls[key] = wechat_url
+        return urls
+
+    async def _process_content(self) -> tuple:
+        """处理正文内容，返回 (完整 HTML, 拆分后各篇的 HTML 列表)"""
+        print("[4/6] 处理正文图片...")
+        template = await _in_thread(self._render_template)
+        urls = await self._upload_images(template)
+
+        print("[5/6] 转换为 HTML...")
+        html = self._fill_template(template, urls)
+        parts = self._fill_parts(template, urls)
+        print(f"      转换完成{f'，拆分为 {len(parts)} 篇' if parts else ''}")
+        return html, parts
+
+    # ========== 草稿 ==========
+
+    async def _save_draft(self, title: str, html_content: str, thumb_media_id: str, parts: list = None) -> str:
+        """保存草稿并记录到断点状态（规则同 WechatPublisher._save_draft）"""
+        articles = self._draft_articles(title, html_content, thumb_media_id, parts)
+        draft_hash = _draft_hash(articles)
+        draft = self.state.get_draft()
+
+        if self.sync_draft and self._can_update_draft(draft, len(articles)):
+            index = draft.get("index", 0)
+            if draft.get("hash") == draft_hash:
+                print(f"[6/6] 草稿内容未变化，跳过: {draft['media_id']}")
+                return await _in_thread(self._record_draft, draft["media_id"], draft_hash, index, "unchanged",
+                                        len(articles))
+            for offset, article in enumerate(articles):
+                result = await self._update_draft(draft["media_id"], index + offset, article)
+                if result.get('errcode') != 0:
+                    error = self._update_error(result, offset, len(articles))
+                    if error:
+                        return error
+                    break
+            else:
+                return await _in_thread(self._record_draft, draft["media_id"], draft_hash, index, "updated",
+                                        len(articles))
+
+        result = await self._create_draft(articles)
+        if result and not result.startswith("错误"):
+            await _in_thread(self._record_draft, result, draft_hash, 0, "created", len(articles))
+        return result
+
+    async def _update_draft(self, media_id: str, index: int, article: dict) -> dict:
+        """更新已有草稿中第 index 篇文章，返回接口结果（errcode 为 0 表示成功）"""
+        print(f"[6/6] 更新草稿: {media_id}")
+        payload = {"media_id": media_id, "index": index, "articles": article}
+
+        def send(access_token):
+            return self.session.post_json(f"{_get_wechat_api()['update_draft']}?access_token={access_token}", payload)
+
+        result = await self._call_with_token(send, "update_draft")
+        if result.get('errcode') == 0:
+            print("      成功")
+        else:
+            print(f"      失败: {result}")
+        return result
+
+    async def _create_draft(self, articles: list) -> str:
+        """创建草稿（多篇时为多图文草稿）"""
+        print("[6/6] 创建草稿..." if len(articles) == 1 else f"[6/6] 创建草稿（{len(articles)} 篇）...")
+        payload = {"articles": articles}
+
+        def send(access_token):
+            return self.session.post_json(f"{_get_wechat_api()['add_draft']}?access_token={access_token}", payload)
+
+        result = await self._call_with_token(send, "add_draft")
+        if 'media_id' in result:
+            print(f"      成功! media_id: {result['media_id']}")
+            return result['media_id']
+        print(f"      失败: {result}")
+        return f"错误: {result}"
+
+
+# ============== 入口 ==============
+
+async def publish_article_async(article_dir: str, session: AsyncSession, sync_draft: bool = True) -> str:
+    """
+    发布文章到微信公众号草稿箱（协程）
+
+    Returns:
+        成功返回草稿 media_id，失败返回错误信息
+    """
+    start = time.perf_counter()
+    try:
+        # 构造时会读取断点状态和素材库清单
+        publisher = await _in_thread(AsyncWechatPublisher, article_dir, session, sync_draft=sync_draft)
+        result = await publisher.run()
+    except Exception as e:
+        result = f"错误: {str(e)}"
+    await _in_thread(_record_publish, _get_config()["appid"], article_dir, result, time.perf_counter() - start)
+    await _in_thread(_get_metrics().flush)
+    return result
+
+
+async def publish_articles_async(article_dirs: list, concurrency: int = DEFAULT_CONCURRENCY,
+                                 sync_draft: bool = True, max_connections: int = DEFAULT_CONNECTIONS) -> dict:
+    """
+    并发发布多篇文章，共用一个 aiohttp 会话和 access_token
+
+    Returns:
+        {文章目录: 草稿 media_id 或错误信息}
+    """
+    import asyncio
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async with AsyncSession(max_connections) as session:
+        async def publish(article_dir):
+            async with semaphore:
+                return await publish_article_async(article_dir, session, sync_draft)
+
+        results = await asyncio.gather(*(publish(d) for d in article_dirs))
+    return {str(d): result for d, result in zip(article_dirs, results)}
+
+
+def publish_articles(article_dirs: list, concurrency: int = DEFAULT_CONCURRENCY, sync_draft: bool = True,
+                     max_connections: int = DEFAULT_CONNECTIONS) -> dict:
+    """publish_articles_async 的同步入口（在当前线程运行事件循环）"""
+    import asyncio
+
+    return asyncio.run(publish_articles_async(article_dirs, concurrency, sync_draft, max_connections))
+
+
+def publish_article(article_dir: str, sync_draft: bool = True) -> str:
+    """与 wechat_publisher.publish_article 用法相同，内部使用 aiohttp"""
+    return publish_articles([article_dir], 1, sync_draft)[str(article_dir)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="并发发布文章到公众号草稿箱（aiohttp）")
+    parser.add_argument("dirs", nargs="+", help="文章目录")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同时发布的文章数")
+    parser.add_argument("--new-draft", action="store_true", help="不更新之前的草稿，新建一份")
+    args = parser.parse_args()
+
+    results = publish_articles(args.dirs, args.concurrency, sync_draft=not args.new_draft)
+    print("\n" + "=" * 50)
+    for article_dir, result in results.items():
+        print(f"   {article_dir}: {'发布成功，草稿 media_id: ' + result if not result.startswith('错误') else result}")
+    print("=" * 50)
+    sys.exit(0 if all(not r.startswith("错误") for r in results.values()) else 1)
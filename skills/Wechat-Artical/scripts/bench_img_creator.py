@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+封面生成压测（基于本地生图接口模拟服务器，不调用付费模型）
+
+在多个场景（慢模型、大图、429、超时、随机故障）下生成封面，
+统计端到端耗时、成功率、备用模型使用率和峰值内存（RSS）。
+每个场景在独立子进程中运行，峰值内存互不影响。
+
+用法：
+    python bench_img_creator.py [--scenarios fast,large,429] [--covers 10] [--concurrency 1]
+                                [--timeout 3] [--rpm 0] [--circuit-failures 0] [--json 结果.json]
+
+示例：
+    python bench_img_creator.py --scenarios fast,timeout --covers 20 --concurrency 4
+"""
+
+import io
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from pathlib import Path
+
+from mock_image_server import MOCK_DEFAULTS, start_mock_server
+from bench_utils import percentile
+
+
+# 压测中使用的模型名，模拟服务器按模型名注入故障
+PRIMARY_MODEL = "mock-primary"
+FALLBACK_MODEL = "mock-fallback"
+
+# 场景: (全局参数, 按模型覆盖的参数)
+SCENARIOS = {
+    "fast": ({"latency_ms": 50, "jitter_ms": 20}, {}),
+    "slow": ({"latency_ms": 1500, "jitter_ms": 500}, {}),
+    "large": ({"latency_ms": 50, "width": 2560, "height": 1440}, {}),
+    "429": ({"latency_ms": 50}, {PRIMARY_MODEL: {"rate_429": 0.5}}),
+    "timeout": ({"latency_ms": 50}, {PRIMARY_MODEL: {"rate_timeout": 0.5}}),
+    "flaky": ({"latency_ms": 100, "rate_5xx": 0.2, "rate_no_image": 0.1}, {}),
+}
+
+COVER_PROMPT = "A conductor leading an orchestra of robots, realistic photo, 16:9"
+ARTICLE_MD = "【文章标题】压测封面标题\n\n【引言】\n压测用引言。\n"
+
+
+def _peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB）"""
+    # Linux 的 ru_maxrss 会继承 fork 时父进程的峰值，优先读取 exec 后重新计数的 VmHWM
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_child(spec: dict) -> dict:
+    """子进程：生成 spec["covers"] 张封面，返回耗时和内存数据"""
+    import img_creator
+
+    img_creator._get_config().update({
+        "IMAGE_API_BASE_URL": spec["base_url"],
+        "IMAGE_API_KEY": "sk-mock",
+        "IMAGE_MODEL_NAME": PRIMARY_MODEL,
+        "IMAGE_FALLBACK_MODEL_NAME": FALLBACK_MODEL,
+        "IMAGE_API_RPM": spec["rpm"],
+        "IMAGE_API_BURST": spec["burst"],
+        "IMAGE_API_CIRCUIT_FAILURES": spec["circuit_failures"],
+        # 模拟流量（含注入的 429/5xx）不写入真实的指标目录
+        "METRICS_DIR": "",
+    })
+    img_creator.MODEL_TIMEOUT = spec["timeout"]
+    img_creator.FALLBACK_MODEL_TIMEOUT = spec["timeout"]
+    # 限流/熔断使用独立的状态库，不影响真实环境
+    img_creator.RATE_LIMIT_DB = Path(spec["workdir"]) / "rate_limit.db"
+    baseline_rss = _peak_rss_mb()
+
+    root = Path(spec["workdir"])
+    dirs = []
+    for k in range(spec["covers"]):
+        d = root / f"a{k}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "cover_design.md").write_text(COVER_PROMPT, encoding="utf-8")
+        (d / "artical.md").write_text(ARTICLE_MD, encoding="utf-8")
+        dirs.append(d)
+
+    async def one(d: Path, sem: asyncio.Semaphore):
+        async with sem:
+            start = time.perf_counter()
+            result = await img_creator._create_cover_image_async(str(d))
+            return time.perf_counter() - start, not result.startswith("错误")
+
+    async def run_all():
+        sem = asyncio.Semaphore(spec["concurrency"])
+        return await asyncio.gather(*(one(d, sem) for d in dirs))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        outcomes = asyncio.run(run_all())
+    wall = time.perf_counter() - start
+
+    return {
+        "latencies": [t for t, _ in outcomes],
+        "ok": sum(1 for _, success in outcomes if success),
+        "wall_s": wall,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_scenario(server, name: str, covers: int, concurrency: int, timeout: float, workdir: Path,
+                 limits: dict) -> dict:
+    """在子进程中运行一个场景，结合服务器统计得出备用模型使用率"""
+    options, model_options = SCENARIOS[name]
+    server.options = {**MOCK_DEFAULTS, **options, "hang_seconds": timeout + 5}
+    server.model_options = model_options
+    server.reset()
+
+    spec = {
+        "base_url": server.base_url,
+        "covers": covers,
+        "concurrency": concurrency,
+        "timeout": timeout,
+        "workdir": str(workdir / name),
+        **limits,
+    }
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--child", json.dumps(spec)],
+        capture_output=True, text=True, cwd=str(Path(__file__).resolve().parent),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"场景 {name} 子进程失败:\n{proc.stderr[-2000:]}")
+    child = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    calls = server.snapshot()["calls"]
+    fallback_ok = calls.get(f"{FALLBACK_MODEL}:ok", 0)
+    latencies = child["latencies"]
+    return {
+        "scenario": name,
+        "covers": covers,
+        "ok": child["ok"],
+        "fallback_rate": round(fallback_ok / covers, 3) if covers else 0.0,
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p95_s": round(percentile(latencies, 95), 3),
+        "max_s": round(max(latencies), 3) if latencies else 0.0,
+        "wall_s": round(child["wall_s"], 3),
+        "baseline_rss_mb": round(child["baseline_rss_mb"], 1),
+        "peak_rss_mb": round(child["peak_rss_mb"], 1),
+        "calls": calls,
+    }
+
+
+def main(argv) -> int:
+    if argv and argv[0] == "--child":
+        print(json.dumps(_run_child(json.loads(argv[1]))))
+        return 0
+
+    parser = argparse.ArgumentParser(description="封面生成压测（本地模拟生图接口）")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"场景列表，可选: {', '.join(SCENARIOS)}")
+    parser.add_argument("--covers", type=int, default=10, help="每个场景生成的封面数")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时生成的封面数")
+    parser.add_argument("--timeout", type=float, default=3.0, help="每个模型的请求超时（秒），替代默认的 300/45 秒")
+    parser.add_argument("--rpm", type=float, default=0, help="限流 RPM（0 表示不限流）")
+    parser.add_argument("--burst", type=int, default=2, help="令牌桶容量")
+    parser.add_argument("--circuit-failures", type=int, default=0, help="熔断阈值（0 表示不熔断）")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+    limits = {"rpm": args.rpm, "burst": args.burst, "circuit_failures": args.circuit_failures}
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        print(f"错误: 未知场景 - {', '.join(unknown)}")
+        return 1
+
+    server = start_mock_server()
+    print(f"模拟服务器: {server.base_url}")
+    workdir = Path(tempfile.mkdtemp(prefix="bench_img_creator_"))
+    results = []
+    try:
+        print(f"{'场景':<8} {'成功':>7} {'备用模型':>8} {'p50(s)':>8} {'p95(s)':>8} {'max(s)':>8} {'峰值RSS(MB)':>12}")
+        for name in names:
+            r = run_scenario(server, name, args.covers, args.concurrency, args.timeout, workdir, limits)
+            results.append(r)
+            print(f"{r['scenario']:<8} {r['ok']:>3}/{r['covers']:<3} {r['fallback_rate']:>8.0%} "
+                  f"{r['p50_s']:>8} {r['p95_s']:>8} {r['max_s']:>8} {r['peak_rss_mb']:>12}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"结果已写入: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
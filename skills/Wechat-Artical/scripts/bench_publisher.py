@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布流程压测（基于本地微信 API 模拟服务器，不访问真实微信）
+
+生成不同字数、图片数的合成文章，在不同并发下调用 publish_article，
+统计吞吐量（篇/秒）和单篇耗时分位数。
+--backend requests 为线程池 + WechatPublisher，aiohttp 为单线程协程 + AsyncWechatPublisher。
+
+用法：
+    python bench_publisher.py [--sizes 2000,10000] [--images 0,5,20] [--concurrency 1,4,16]
+                              [--articles 16] [--latency-ms 30] [--backend requests,aiohttp] [--json 结果.json]
+
+示例：
+    python bench_publisher.py --sizes 2000 --images 5 --concurrency 1,8 --latency-ms 50
+    python bench_publisher.py --images 20 --concurrency 64 --articles 64 --backend requests,aiohttp
+"""
+
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import wechat_publisher
+from mock_wechat_server import start_mock_server
+from mock_image_server import synthetic_png
+from bench_utils import SAMPLE_PARAGRAPH, int_list, percentile
+
+
+def make_png(path: Path, width: int, height: int) -> None:
+    """生成随机噪点 PNG（几乎不可压缩，文件大小约为 width*height*3 字节）"""
+    path.write_bytes(synthetic_png(width, height))
+
+
+def make_article(article_dir: Path, chars: int, images: int, sections: int = 5,
+                 image_size: tuple = (320, 180)) -> Path:
+    """
+    生成一篇合成文章（artical.md + assets/）
+
+    Args:
+        article_dir: 文章目录
+        chars: 正文大约字数
+        images: 正文插图数量（不含封面、logo 和标题图片）
+        sections: 章节数（每个章节带【标题N】和对应的 N.png）
+        image_size: 插图尺寸
+
+    Returns:
+        文章目录
+    """
+    assets = article_dir / "assets"
+    assets.mkdir(parents=True, exist_ok=True)
+    make_png(assets / "cover.png", 900, 383)
+    make_png(assets / "logo.png", 120, 40)
+    for n in range(1, sections + 1):
+        make_png(assets / f"{n}.png", 120, 60)
+    for k in range(images):
+        make_png(assets / f"img_{k}.png", *image_size)
+
+    paragraphs = max(chars // len(SAMPLE_PARAGRAPH), sections)
+    lines = [
+        "【文章标题】压测文章", "",
+        "【logo】", "![logo2-un](assets/logo.png)", "",
+        "【引言】", SAMPLE_PARAGRAPH, "",
+        "【封面主图】", "![cover](assets/cover.png)", "",
+    ]
+    per_section = max(paragraphs // sections, 1)
+    image_every = max(paragraphs // images, 1) if images else 0
+    placed = 0
+    for p in range(paragraphs):
+        if p % per_section == 0 and p // per_section < sections:
+            n = p // per_section + 1
+            lines += [f"【标题{n}】", f"# 第{n}章", ""]
+        lines += [SAMPLE_PARAGRAPH, ""]
+        if image_every and p % image_every == 0 and placed < images:
+            lines += [f"![图{placed}](assets/img_{placed}.png)", ""]
+            placed += 1
+    (article_dir / "artical.md").write_text("\n".join(lines), encoding="utf-8")
+    return article_dir
+
+
+async def _publish_async(dirs: list, concurrency: int) -> list:
+    """在当前线程用协程并发发布，返回 [(耗时, 是否成功)]"""
+    import asyncio
+    from async_publisher import AsyncSession, publish_article_async
+
+    semaphore = asyncio.Semaphore(concurrency)
+    async with AsyncSession() as session:
+        async def publish(d: Path):
+            async with semaphore:
+                start = time.perf_counter()
+                result = await publish_article_async(str(d), session)
+                return time.perf_counter() - start, not result.startswith("错误")
+
+        return await asyncio.gather(*(publish(d) for d in dirs))
+
+
+def run_case(root: Path, chars: int, images: int, concurrency: int, articles: int, resume: bool,
+             backend: str = "requests") -> dict:
+    """压测一组参数：并发发布 articles 篇文章"""
+    case_dir = root / f"c{chars}_i{images}"
+    if not case_dir.exists():
+        for k in range(articles):
+            make_article(case_dir / f"a{k}", chars, images)
+    dirs = sorted(p for p in case_dir.iterdir() if p.is_dir())
+    if not resume:
+        for d in dirs:
+            (d / wechat_publisher.STATE_FILE).unlink(missing_ok=True)
+
+    def publish(d: Path):
+        start = time.perf_counter()
+        result = wechat_publisher.publish_article(str(d))
+        return time.perf_counter() - start, not result.startswith("错误")
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if backend == "aiohttp":
+            import asyncio
+            outcomes = asyncio.run(_publish_async(dirs, concurrency))
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(publish, dirs))
+    wall = time.perf_counter() - start
+
+    latencies = [t * 1000 for t, _ in outcomes]
+    ok = sum(1 for _, success in outcomes if success)
+    return {
+        "backend": backend,
+        "chars": chars,
+        "images": images,
+        "concurrency": concurrency,
+        "articles": len(dirs),
+        "ok": ok,
+        "wall_s": round(wall, 3),
+        "throughput": round(len(dirs) / wall, 2),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "max_ms": round(max(latencies), 1),
+    }
+
+
+def backend_list(text: str) -> list:
+    backends = [x.strip() for x in text.split(",") if x.strip()]
+    unknown = set(backends) - {"requests", "aiohttp"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"未知后端: {', '.join(sorted(unknown))}")
+    return backends
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="发布流程压测（本地模拟微信 API）")
+    parser.add_argument("--sizes", type=int_list, default=[2000, 10000], help="正文字数列表")
+    parser.add_argument("--images", type=int_list, default=[0, 5, 20], help="正文插图数量列表")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16], help="并发数列表")
+    parser.add_argument("--articles", type=int, default=16, help="每组参数发布的文章数")
+    parser.add_argument("--latency-ms", type=float, default=30, help="模拟服务器每个请求的延迟")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="模拟服务器延迟抖动")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟服务器 5xx 错误率")
+    parser.add_argument("--resume", action="store_true", help="保留断点状态（测量续传时的耗时）")
+    parser.add_argument("--backend", type=backend_list, default=["requests"], help="requests、aiohttp 或两者")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    server = start_mock_server(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                               server_error_rate=args.error_rate)
+    root = Path(tempfile.mkdtemp(prefix="bench_publisher_"))
+    # 接口地址指向模拟服务器，调用次数、合成图片的感知哈希记到临时数据库，不影响真实的额度统计和去重索引；
+    # 模拟流量（含注入的错误）也不写入真实的指标目录
+    wechat_publisher._get_config().update(api_base_url=server.base_url, metrics_dir="")
+    wechat_publisher._get_wechat_api.cache_clear()
+    wechat_publisher.QUOTA_DB = root / "quota.db"
+    wechat_publisher.IMAGE_HASH_DB = root / "image_hash.db"
+    print(f"模拟服务器: {server.base_url}（延迟 {args.latency_ms}±{args.jitter_ms} ms）")
+
+    results = []
+    try:
+        print(f"{'后端':>8} {'字数':>7} {'插图':>5} {'并发':>5} {'成功':>7} {'篇/秒':>8} "
+              f"{'p50(ms)':>9} {'p95(ms)':>9} {'max(ms)':>9}")
+        for chars in args.sizes:
+            for images in args.images:
+                for concurrency in args.concurrency:
+                    for backend in args.backend:
+                        r = run_case(root, chars, images, concurrency, args.articles, args.resume, backend)
+                        results.append(r)
+                        print(f"{r['backend']:>8} {r['chars']:>7} {r['images']:>5} {r['concurrency']:>5} "
+                              f"{r['ok']:>3}/{r['articles']:<3} {r['throughput']:>8} "
+                              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['max_ms']:>9}")
+        print(f"\n服务器统计: {json.dumps(server.snapshot()['calls'], ensure_ascii=False)}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"结果已写入: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
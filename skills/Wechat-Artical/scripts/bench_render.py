@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量渲染扩展性基准
+
+生成一批合成文章，分别用 1、2、4 … 个进程调用 render_engine.render_batch，
+统计吞吐量（篇/秒）、相对单进程的加速比和并行效率。
+
+用法：
+    python bench_render.py [--articles 400] [--chars 8000] [--workers 1,2,4,8] [--repeat 3] [--json 结果.json]
+
+示例：
+    python bench_render.py --articles 1000 --workers 1,2,4,8,16
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+from render_engine import render_batch
+from bench_utils import SAMPLE_PARAGRAPH, int_list, percentile
+from mock_image_server import synthetic_png
+
+
+def make_markdown_article(article_dir: Path, chars: int, sections: int = 5) -> Path:
+    """生成一篇只含文字和标题图片的合成文章（渲染不读取图片内容，图片只需存在）"""
+    assets = article_dir / "assets"
+    assets.mkdir(parents=True, exist_ok=True)
+    tiny_png = synthetic_png(4, 4)
+    (assets / "cover.png").write_bytes(tiny_png)
+    for n in range(1, sections + 1):
+        (assets / f"{n}.png").write_bytes(tiny_png)
+
+    paragraphs = max(chars // len(SAMPLE_PARAGRAPH), sections)
+    per_section = max(paragraphs // sections, 1)
+    lines = ["【文章标题】渲染压测", "", "【引言】", SAMPLE_PARAGRAPH, "", "【封面主图】", ""]
+    for p in range(paragraphs):
+        if p % per_section == 0 and p // per_section < sections:
+            n = p // per_section + 1
+            lines += [f"【标题{n}】", f"# 第{n}章", "", "## 小节", ""]
+        lines += [SAMPLE_PARAGRAPH, ""]
+        if p % 7 == 3:
+            lines += ["- 要点 **一**", "- 要点 `二`", "", "```python", "print('hello')", "```", ""]
+    (article_dir / "artical.md").write_text("\n".join(lines), encoding="utf-8")
+    return article_dir
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="批量渲染扩展性基准")
+    parser.add_argument("--articles", type=int, default=400, help="文章数")
+    parser.add_argument("--chars", type=int, default=8000, help="每篇文章大约字数")
+    parser.add_argument("--workers", type=int_list, default=None, help="进程数列表，默认 1,2,4… 直到 CPU 核数")
+    parser.add_argument("--chunksize", type=int, default=None, help="每次派发给一个进程的文章数")
+    parser.add_argument("--repeat", type=int, default=3, help="每组取最快的一次")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    cpus = os.cpu_count() or 1
+    workers_list = args.workers or sorted({1, *(2 ** k for k in range(1, cpus.bit_length()) if 2 ** k <= cpus), cpus})
+
+    root = Path(tempfile.mkdtemp(prefix="bench_render_"))
+    results = []
+    try:
+        dirs = [make_markdown_article(root / "src" / f"a{k:05d}", args.chars) for k in range(args.articles)]
+        print(f"CPU 核数: {cpus}，文章数: {len(dirs)}，每篇约 {args.chars} 字")
+        print(f"{'进程数':>6} {'耗时(s)':>8} {'篇/秒':>8} {'加速比':>7} {'效率':>6} {'单篇p50(ms)':>12} {'单篇p95(ms)':>12}")
+
+        base_wall = None
+        for workers in workers_list:
+            best_wall, best_rows = None, None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows = render_batch(dirs, root / "out", workers, args.chunksize)
+                wall = time.perf_counter() - start
+                if best_wall is None or wall < best_wall:
+                    best_wall, best_rows = wall, rows
+            failed = [r for r in best_rows if r["error"]]
+            if failed:
+                print(f"错误: {failed[0]['article']} - {failed[0]['error']}")
+                return 1
+
+            base_wall = base_wall or best_wall * workers_list[0]
+            speedup = base_wall / best_wall
+            per_file = [r["ms"] for r in best_rows]
+            r = {
+                "workers": workers,
+                "wall_s": round(best_wall, 3),
+                "throughput": round(len(dirs) / best_wall, 1),
+                "speedup": round(speedup, 2),
+                "efficiency": round(speedup / workers, 2),
+                "p50_ms": round(percentile(per_file, 50), 2),
+                "p95_ms": round(percentile(per_file, 95), 2),
+            }
+            results.append(r)
+            print(f"{workers:>6} {r['wall_s']:>8} {r['throughput']:>8} {r['speedup']:>7} "
+                  f"{r['efficiency']:>6.0%} {r['p50_ms']:>12} {r['p95_ms']:>12}")
+        if max(workers_list) > cpus:
+            print(f"提示: 进程数超过 CPU 核数（{cpus}）的部分不会再提速")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"cpus": cpus, "results": results}, ensure_ascii=False, indent=2),
+                                   encoding="utf-8")
+        print(f"结果已写入: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
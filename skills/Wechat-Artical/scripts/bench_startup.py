@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+脚本启动耗时基准（基于 python -X importtime）
+
+在全新子进程中导入 wechat_publisher / img_creator，统计模块导入耗时和最慢的导入项，
+并检查 requests、aiohttp、PIL 等重量级依赖没有在导入阶段被加载。
+任何一项超出预算时以退出码 1 结束，可用于发现启动耗时回退。
+
+用法：
+    python bench_startup.py [--budget-ms 60] [--repeat 5] [--top 8] [--json 结果.json]
+
+示例：
+    python bench_startup.py --budget-ms 40 --top 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import compileall
+import subprocess
+from pathlib import Path
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# 被测模块
+TARGETS = ("wechat_publisher", "img_creator")
+
+# 只允许在真正发布/生成图片时才加载的重量级模块
+FORBIDDEN_MODULES = ("requests", "aiohttp", "PIL", "urllib3", "charset_normalizer")
+
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    # 使用预先编译好的 .pyc，测量的是日常调用时的导入耗时而不是编译耗时
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def _parse_importtime(stderr: str) -> list:
+    """
+    解析 -X importtime 输出
+
+    Returns:
+        [(模块名, 自身耗时 us, 累计耗时 us)]
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            # 表头
+            continue
+        rows.append((parts[2].strip(), self_us, cumulative_us))
+    return rows
+
+
+def measure_import(module: str) -> dict:
+    """在子进程中导入 module 一次，返回导入耗时和已加载的顶层模块"""
+    code = f"import sys, {module}; print(','.join(sorted({{m.split('.')[0] for m in sys.modules}})))"
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=str(SCRIPTS_DIR), env=_child_env(),
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+
+    rows = _parse_importtime(proc.stderr)
+    cumulative = next((cum for name, _, cum in rows if name == module), 0)
+    return {
+        "module": module,
+        "import_ms": cumulative / 1000,
+        "process_ms": wall * 1000,
+        "rows": rows,
+        "loaded": set(proc.stdout.strip().split(",")),
+    }
+
+
+def measure_interpreter() -> float:
+    """空解释器启动耗时（ms），作为对照"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True, env=_child_env())
+    return (time.perf_counter() - start) * 1000
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="脚本启动耗时基准（python -X importtime）")
+    parser.add_argument("--modules", default=",".join(TARGETS), help="被测模块列表")
+    parser.add_argument("--budget-ms", type=float, default=60.0, help="单个模块导入耗时上限（取中位数）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块测量次数")
+    parser.add_argument("--top", type=int, default=8, help="列出最慢的导入项个数")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    compileall.compile_dir(str(SCRIPTS_DIR), maxlevels=0, quiet=1)
+    baseline = sorted(measure_interpreter() for _ in range(args.repeat))[args.repeat // 2]
+    print(f"空解释器启动: {baseline:.1f} ms")
+
+    failures = []
+    results = []
+    for module in [m.strip() for m in args.modules.split(",") if m.strip()]:
+        runs = sorted((measure_import(module) for _ in range(args.repeat)), key=lambda r: r["import_ms"])
+        median = runs[len(runs) // 2]
+        heavy = sorted(m for m in FORBIDDEN_MODULES if m in median["loaded"])
+
+        print(f"\n{module}: 导入 {median['import_ms']:.1f} ms（最快 {runs[0]['import_ms']:.1f} ms），"
+              f"进程总耗时 {median['process_ms']:.1f} ms")
+        slowest = sorted(median["rows"], key=lambda row: row[1], reverse=True)[:args.top]
+        for name, self_us, cumulative_us in slowest:
+            print(f"  {self_us / 1000:>7.2f} ms  (累计 {cumulative_us / 1000:>7.2f} ms)  {name}")
+
+        if heavy:
+            failures.append(f"{module} 在导入阶段加载了 {', '.join(heavy)}")
+        if median["import_ms"] > args.budget_ms:
+            failures.append(f"{module} 导入耗时 {median['import_ms']:.1f} ms 超出预算 {args.budget_ms} ms")
+        results.append({
+            "module": module,
+            "import_ms": round(median["import_ms"], 2),
+            "process_ms": round(median["process_ms"], 2),
+            "heavy_modules": heavy,
+            "slowest": [{"module": n, "self_ms": s / 1000, "cumulative_ms": c / 1000} for n, s, c in slowest],
+        })
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"interpreter_ms": round(baseline, 2), "modules": results},
+                                              ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n结果已写入: {args.json}")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"错误: {failure}")
+        return 1
+    print("\n启动耗时检查通过")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
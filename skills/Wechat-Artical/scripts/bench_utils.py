@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测脚本共用的小工具（只依赖标准库）
+
+bench_publisher / bench_img_creator / bench_render 都从这里导入，
+避免互相导入时把发布器、模拟服务器等无关模块一起加载。
+"""
+
+
+# 合成正文使用的段落
+SAMPLE_PARAGRAPH = (
+    "当前很多工具要求用户学习提示词、搭建工作流，这实际上是把技术复杂性转嫁给了用户。"
+    "真正好用的产品应该让用户只描述目标，由系统自己规划步骤并执行，"
+    "这也是**智能体**被越来越多团队关注的原因。"
+)
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def int_list(text: str) -> list:
+    return [int(x) for x in text.split(",") if x.strip()]
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章目录索引（SQLite）
+
+扫描 artical/ 下的所有文章目录，记录标题、封面情况、素材哈希、本地渲染哈希，
+以及 .publish_state.json 中最近一次草稿的 media_id 和发布时的内容指纹。
+扫描是增量的：文件大小和修改时间都没变的文章直接跳过，只对变化的文件重新计算哈希。
+之后可以直接查询未发布、发布后有修改、缺少封面的文章，批量任务只处理需要处理的那部分。
+
+索引保存在 <artical目录>/.catalog.db。
+
+用法：
+    python catalog.py scan <artical目录>
+    python catalog.py list <artical目录> [--unpublished] [--changed] [--dirty] [--no-cover] [--paths] [--json] [--no-scan]
+
+示例：
+    python catalog.py list ./artical --dirty --paths    # 输出需要（重新）发布的文章目录，每行一个
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from contextlib import closing
+from pathlib import Path
+
+from asset_hash import fingerprint, fingerprint_many
+
+
+CATALOG_FILE = ".catalog.db"
+LIST_COLUMNS = ("dir, title, has_cover, cover_hash, md_hash, render_hash, assets_hash, "
+                "draft_media_id, published_render_hash, published_assets_hash, scanned_at")
+STATE_FILE = ".publish_state.json"   # 与 wechat_publisher.STATE_FILE 一致（默认公众号）
+
+
+def _stat_key(st) -> list:
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _scan_assets(assets_dir: Path) -> dict:
+    """{文件名: [大小, 修改时间]}"""
+    result = {}
+    try:
+        with os.scandir(assets_dir) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith('.'):
+                    result[entry.name] = _stat_key(entry.stat())
+    except FileNotFoundError:
+        pass
+    return result
+
+
+def render_hash(article_dir, text: str = None) -> tuple:
+    """
+    本地渲染哈希（标题图片使用相对路径，与 preview.html 一致，不含作者）
+
+    Returns:
+        (文章标题, 渲染结果的 sha256)
+    """
+    from render_engine import AssetIndex, render_local
+
+    article_dir = Path(article_dir)
+    if text is None:
+        text = (article_dir / "artical.md").read_text(encoding="utf-8")
+    title, html = render_local(text, AssetIndex(article_dir / "assets"))
+    return title, hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def cover_file(article_dir, text: str, assets: dict) -> str:
+    """
+    封面图片相对文章目录的路径（与 ArticleParser.get_cover_path 一致：优先【封面主图】中的图片，
+    其次 assets/cover.png），没有封面或封面是网络地址时返回空字符串
+    """
+    from render_engine import ArticleParser
+
+    article_dir = Path(article_dir)
+    parser = ArticleParser(article_dir)
+    parser.parse_lines(text.splitlines(keepends=True), "cover.png" in assets)
+    path = parser.get_cover_path()
+    if not path or path.startswith('http'):
+        return ""
+    return os.path.relpath(path, article_dir)
+
+
+def _cover_stamp(article_dir: Path, cover: str) -> list:
+    """[封面相对路径, [大小, 修改时间]]，文件不存在时第二项为 None"""
+    try:
+        return [cover, _stat_key((article_dir / cover).stat())]
+    except OSError:
+        return [cover, None]
+
+
+def assets_digest(asset_hashes: dict) -> str:
+    """所有素材的整体哈希（文件名 + 内容哈希）"""
+    h = hashlib.sha256()
+    for name in sorted(asset_hashes):
+        h.update(f"{name}\0{asset_hashes[name]}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def source_fingerprint(article_dir) -> dict:
+    """文章当前内容的指纹，发布时记录到断点状态中，索引用它判断发布后是否有修改"""
+    article_dir = Path(article_dir)
+    assets = article_dir / "assets"
+    names = list(_scan_assets(assets))
+    fingerprints = fingerprint_many([str(assets / name) for name in names])
+    hashes = {name: fingerprints[str(assets / name)] for name in names}
+    return {"render_hash": render_hash(article_dir)[1], "assets_hash": assets_digest(hashes)}
+
+
+class Catalog:
+    """文章索引"""
+
+    def __init__(self, root_dir, db_path=None):
+        self.root_dir = Path(root_dir).expanduser().resolve()
+        self.db_path = Path(db_path) if db_path else self.root_dir / CATALOG_FILE
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS articles ("
+                "dir TEXT PRIMARY KEY, title TEXT, has_cover INTEGER, cover_hash TEXT, "
+                "md_hash TEXT, render_hash TEXT, assets_hash TEXT, "
+                "draft_media_id TEXT, published_render_hash TEXT, published_assets_hash TEXT, "
+                "stamp TEXT, scanned_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS assets ("
+                "dir TEXT, name TEXT, size INTEGER, mtime_ns INTEGER, sha256 TEXT, PRIMARY KEY (dir, name))"
+            )
+
+    def scan(self) -> dict:
+        """
+        增量扫描
+
+        Returns:
+            {"added": n, "updated": n, "unchanged": n, "removed": n, "elapsed_ms": ms}
+        """
+        start = time.perf_counter()
+        report = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        with closing(self._connect()) as conn, conn:
+            known = {row["dir"]: row for row in conn.execute("SELECT * FROM articles")}
+            seen = set()
+            with os.scandir(self.root_dir) as it:
+                for entry in it:
+                    if not entry.is_dir() or entry.name.startswith('.'):
+                        continue
+                    article_dir = Path(entry.path)
+                    try:
+                        md_stat = (article_dir / "artical.md").stat()
+                    except FileNotFoundError:
+                        continue
+                    seen.add(entry.name)
+                    old = known.get(entry.name)
+                    stamp = self._stamp(article_dir, md_stat, old)
+                    if old is not None and old["stamp"] == json.dumps(stamp):
+                        report["unchanged"] += 1
+                        continue
+                    self._update_article(conn, entry.name, article_dir, stamp, old)
+                    report["updated" if old else "added"] += 1
+
+            for name in set(known) - seen:
+                conn.execute("DELETE FROM articles WHERE dir = ?", (name,))
+                conn.execute("DELETE FROM assets WHERE dir = ?", (name,))
+                report["removed"] += 1
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return report
+
+    def _stamp(self, article_dir: Path, md_stat, old) -> dict:
+        """文章的大小/修改时间快照，与上次一致则跳过"""
+        try:
+            state_stat = _stat_key((article_dir / STATE_FILE).stat())
+        except FileNotFoundError:
+            state_stat = None
+        stamp = {"md": _stat_key(md_stat), "assets": _scan_assets(article_dir / "assets"), "state": state_stat,
+                 "cover": None}
+        # 【封面主图】可以指向 assets/ 以外的文件：正文没变时沿用上次解析出的封面路径，跟踪它的变化
+        old_stamp = json.loads(old["stamp"]) if old else {}
+        if old_stamp.get("cover") and old_stamp["md"] == stamp["md"]:
+            stamp["cover"] = _cover_stamp(article_dir, old_stamp["cover"][0])
+        return stamp
+
+    def _update_article(self, conn, name: str, article_dir: Path, stamp: dict, old):
+        old_stamp = json.loads(old["stamp"]) if old else {"md": None, "assets": {}, "state": None}
+        row = dict(old) if old else {}
+
+        # 素材：只对大小或修改时间变化的文件重新计算哈希
+        cached = {r["name"]: r for r in conn.execute("SELECT * FROM assets WHERE dir = ?", (name,))}
+        asset_hashes = {}
+        changed = {}
+        for file_name, (size, mtime_ns) in stamp["assets"].items():
+            prev = cached.get(file_name)
+            if prev and prev["size"] == size and prev["mtime_ns"] == mtime_ns:
+                asset_hashes[file_name] = prev["sha256"]
+            else:
+                changed[str(article_dir / "assets" / file_name)] = file_name
+        for path, digest in fingerprint_many(list(changed)).items():
+            file_name = changed[path]
+            size, mtime_ns = stamp["assets"][file_name]
+            asset_hashes[file_name] = digest
+            conn.execute("INSERT OR REPLACE INTO assets (dir, name, size, mtime_ns, sha256) VALUES (?, ?, ?, ?, ?)",
+                         (name, file_name, size, mtime_ns, digest))
+        for file_name in set(cached) - set(asset_hashes):
+            conn.execute("DELETE FROM assets WHERE dir = ? AND name = ?", (name, file_name))
+
+        # 正文或素材列表变化时重新渲染（标题图片、封面是否存在会影响渲染结果），并重新解析封面路径
+        if (stamp["md"] != old_stamp["md"] or set(stamp["assets"]) != set(old_stamp["assets"]) or not old
+                or "cover" not in old_stamp):
+            text = (article_dir / "artical.md").read_text(encoding="utf-8")
+            row["md_hash"] = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            row["title"], row["render_hash"] = render_hash(article_dir, text)
+            cover = cover_file(article_dir, text, stamp["assets"])
+            stamp["cover"] = _cover_stamp(article_dir, cover) if cover else None
+        cover_hash = self._cover_hash(article_dir, stamp["cover"], asset_hashes)
+
+        # 发布记录
+        draft = {}
+        if stamp["state"]:
+            try:
+                draft = json.loads((article_dir / STATE_FILE).read_text(encoding="utf-8")).get("draft", {})
+            except (OSError, ValueError):
+                draft = {}
+        source = draft.get("source", {})
+
+        conn.execute(
+            "INSERT OR REPLACE INTO articles (dir, title, has_cover, cover_hash, md_hash, render_hash, assets_hash, "
+            "draft_media_id, published_render_hash, published_assets_hash, stamp, scanned_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, row["title"], int(bool(cover_hash)), cover_hash,
+             row["md_hash"], row["render_hash"], assets_digest(asset_hashes),
+             draft.get("media_id", ""), source.get("render_hash", ""), source.get("assets_hash", ""),
+             json.dumps(stamp), time.time()),
+        )
+
+    def _cover_hash(self, article_dir: Path, cover_stamp: list, asset_hashes: dict) -> str:
+        """封面文件的 sha256，没有封面或文件不存在时为空字符串"""
+        if not cover_stamp or not cover_stamp[1]:
+            return ""
+        path = (article_dir / cover_stamp[0]).resolve()
+        if path.parent == (article_dir / "assets").resolve() and path.name in asset_hashes:
+            return asset_hashes[path.name]
+        return fingerprint(str(path))
+
+    def list(self, unpublished: bool = False, changed: bool = False, no_cover: bool = False) -> list:
+        """
+        查询文章，多个条件之间为“或”，都不指定时返回全部
+
+        Args:
+            unpublished: 从未创建过草稿
+            changed: 创建草稿后正文或素材有修改
+            no_cover: 缺少封面图片（【封面主图】中的图片或 assets/cover.png）
+        """
+        conditions = []
+        if unpublished:
+            conditions.append("draft_media_id = ''")
+        if changed:
+            conditions.append("(draft_media_id != '' AND (published_render_hash != render_hash "
+                              "OR published_assets_hash != assets_hash))")
+        if no_cover:
+            conditions.append("has_cover = 0")
+        sql = f"SELECT {LIST_COLUMNS} FROM articles"
+        if conditions:
+            sql += " WHERE " + " OR ".join(conditions)
+        with closing(self._connect()) as conn:
+            rows = [dict(r) for r in conn.execute(sql + " ORDER BY dir")]
+        for row in rows:
+            row["path"] = str(self.root_dir / row["dir"])
+            row["published"] = bool(row["draft_media_id"])
+            row["changed"] = row["published"] and (row["published_render_hash"] != row["render_hash"]
+                                                   or row["published_assets_hash"] != row["assets_hash"])
+        return rows
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="文章目录索引")
+    parser.add_argument("command", choices=("scan", "list"))
+    parser.add_argument("root", help="artical 目录")
+    parser.add_argument("--unpublished", action="store_true", help="从未创建过草稿的文章")
+    parser.add_argument("--changed", action="store_true", help="创建草稿后有修改的文章")
+    parser.add_argument("--dirty", action="store_true", help="需要（重新）发布的文章，即 --unpublished --changed")
+    parser.add_argument("--no-cover", action="store_true", help="缺少封面的文章")
+    parser.add_argument("--paths", action="store_true", help="只输出文章目录，每行一个")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    parser.add_argument("--no-scan", action="store_true", help="list 时不先扫描，直接查询现有索引")
+    args = parser.parse_args(argv)
+
+    try:
+        catalog = Catalog(args.root)
+        report = None if args.command == "list" and args.no_scan else catalog.scan()
+    except Exception as e:
+        print(f"错误: {e}")
+        return 1
+
+    if args.command == "scan":
+        print(f"扫描完成（{report['elapsed_ms']} ms）: 新增 {report['added']}，更新 {report['updated']}，"
+              f"未变化 {report['unchanged']}，删除 {report['removed']}")
+        return 0
+
+    rows = catalog.list(unpublished=args.unpublished or args.dirty, changed=args.changed or args.dirty,
+                        no_cover=args.no_cover)
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    elif args.paths:
+        for row in rows:
+            print(row["path"])
+    else:
+        for row in rows:
+            status = "有修改" if row["changed"] else ("已发布" if row["published"] else "未发布")
+            cover = "" if row["has_cover"] else "  缺少封面"
+            print(f"{status}  {row['dir']}  {row['title'] or '无标题'}{cover}")
+        print(f"共 {len(rows)} 篇")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相似图片去重（感知哈希）
+
+作者经常把同一张图以不同文件名、不同编码（png/jpg、缩放后）放进 assets/，每一张都会单独上传。
+这里为每张图片计算 dHash 和 pHash（各 64 位，NumPy 批量计算），两者的汉明距离都不超过阈值、
+且宽高比一致、缩略图逐像素比对也几乎相同时，视为同一张图片，只上传一次。
+
+哈希按文件内容的 sha256 缓存在 SQLite 中（默认 scripts/.image_hash.db），同一张图片只计算一次。
+依赖 numpy 和 Pillow，未安装时去重自动关闭，不影响发布。
+
+用法：
+    python image_dedupe.py <文章目录或图片目录> [--threshold 4]    # 列出相似图片分组
+
+示例：
+    python image_dedupe.py ./artical/我的文章/assets
+"""
+
+import sys
+import sqlite3
+import argparse
+from contextlib import closing
+from pathlib import Path
+
+from asset_hash import fingerprint, fingerprint_many
+
+
+DEFAULT_DB_PATH = Path(__file__).parent / ".image_hash.db"
+
+# 默认阈值：64 位哈希中最多允许几位不同
+DEFAULT_THRESHOLD = 4
+
+# 二次确认：缩放到同一尺寸后，灰度差超过 VERIFY_PIXEL_DIFF 的像素占比不超过 VERIFY_MAX_FRACTION。
+# 只看哈希会把“01”“02”这类只有小块数字不同的横幅标题图误判为相同
+VERIFY_WIDTH = 256
+VERIFY_PIXEL_DIFF = 48
+VERIFY_MAX_FRACTION = 0.005
+MAX_RATIO_DIFF = 0.05
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp"}
+
+
+def available() -> bool:
+    """numpy 和 Pillow 是否可用"""
+    try:
+        import numpy  # noqa: F401
+        from PIL import Image  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _load_gray(path, draft_size: tuple = None) -> tuple:
+    """
+    读取为灰度图，透明部分按白色背景合成（返回前关闭文件）
+
+    Returns:
+        (灰度图, 原始宽高)
+    """
+    from PIL import Image
+
+    with Image.open(path) as img:
+        size = img.size
+        if draft_size and img.format == "JPEG":
+            # JPEG 解码时直接按比例缩小，大图快很多
+            img.draft("L", draft_size)
+        if img.mode in ("RGBA", "LA", "P", "PA"):
+            rgba = img.convert("RGBA")
+            background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+            background.alpha_composite(rgba)
+            return background.convert("L"), size
+        return img.convert("L"), size
+
+
+def _dct_matrix(n: int):
+    import numpy as np
+
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def compute_hashes(paths: list) -> list:
+    """
+    批量计算感知哈希
+
+    Returns:
+        [(dhash, phash, 宽, 高)]，哈希为 64 位整数
+    """
+    import numpy as np
+    from PIL import Image
+
+    dhash_thumbs, phash_thumbs, sizes = [], [], []
+    for path in paths:
+        img, size = _load_gray(path, (128, 128))
+        sizes.append(size)
+        dhash_thumbs.append(np.asarray(img.resize((9, 8), Image.Resampling.LANCZOS), dtype=np.float32))
+        phash_thumbs.append(np.asarray(img.resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float32))
+    if not paths:
+        return []
+
+    # dHash：相邻像素的明暗关系
+    d = np.stack(dhash_thumbs)
+    dbits = (d[:, :, 1:] > d[:, :, :-1]).reshape(len(paths), 64)
+    # pHash：32x32 DCT 的左上 8x8 低频系数与中位数比较
+    dct = _dct_matrix(32)
+    coeffs = np.einsum("ij,njk,lk->nil", dct, np.stack(phash_thumbs), dct)[:, :8, :8].reshape(len(paths), 64)
+    pbits = coeffs > np.median(coeffs[:, 1:], axis=1, keepdims=True)
+
+    weights = (1 << np.arange(63, -1, -1, dtype=np.uint64))
+    dhashes = (dbits.astype(np.uint64) * weights).sum(axis=1)
+    phashes = (pbits.astype(np.uint64) * weights).sum(axis=1)
+    return [(int(dh), int(ph), w, h) for dh, ph, (w, h) in zip(dhashes, phashes, sizes)]
+
+
+def hamming_matrix(hashes: list):
+    """两两之间的汉明距离矩阵"""
+    import numpy as np
+
+    values = np.array(hashes, dtype=np.uint64)
+    xor = values[:, None] ^ values[None, :]
+    return np.unpackbits(xor.view(np.uint8).reshape(len(values), len(values), 8), axis=2).sum(axis=2)
+
+
+class ImageHashIndex:
+    """感知哈希索引"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, threshold: int = DEFAULT_THRESHOLD):
+        self.db_path = Path(db_path)
+        self.threshold = threshold
+        self._memory = {}   # {sha256: (dhash, phash, 宽, 高)}
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def _init_db(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                "sha256 TEXT PRIMARY KEY, dhash TEXT, phash TEXT, width INTEGER, height INTEGER)"
+            )
+
+    def hashes(self, files: dict) -> dict:
+        """
+        获取哈希，未缓存的批量计算后写入缓存
+
+        Args:
+            files: {sha256: 文件路径}
+
+        Returns:
+            {sha256: (dhash, phash, 宽, 高)}，无法解码的图片不在其中
+        """
+        missing = [sha for sha in files if sha not in self._memory]
+        if missing:
+            with closing(self._connect()) as conn:
+                for sha in missing:
+                    row = conn.execute("SELECT dhash, phash, width, height FROM hashes WHERE sha256 = ?",
+                                       (sha,)).fetchone()
+                    if row:
+                        self._memory[sha] = (int(row[0], 16), int(row[1], 16), row[2], row[3])
+
+        todo = [sha for sha in files if sha not in self._memory]
+        if todo:
+            try:
+                computed = dict(zip(todo, compute_hashes([files[sha] for sha in todo])))
+            except Exception:
+                # 有图片无法解码时逐个计算，损坏的图片不参与去重
+                computed = {}
+                for sha in todo:
+                    try:
+                        computed[sha] = compute_hashes([files[sha]])[0]
+                    except Exception:
+                        self._memory[sha] = None
+            self._memory.update(computed)
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO hashes (sha256, dhash, phash, width, height) VALUES (?, ?, ?, ?, ?)",
+                    [(sha, f"{dh:016x}", f"{ph:016x}", w, h) for sha, (dh, ph, w, h) in computed.items()],
+                )
+        return {sha: self._memory[sha] for sha in files if self._memory.get(sha)}
+
+    def group(self, images: dict, exact_only=()) -> dict:
+        """
+        在一组图片中找出相似图片
+
+        Args:
+            images: {key: 文件路径}，顺序决定谁作为代表
+            exact_only: 只在内容完全相同时才合并的 key（如标题图片）
+
+        Returns:
+            {key: 代表图片的 key}，只包含与更早的某张图片相似的 key
+        """
+        if self.threshold < 0 or len(images) < 2:
+            return {}
+        keys = list(images)
+        fingerprints = fingerprint_many(list(images.values()))
+        shas = {key: fingerprints[images[key]] for key in keys}
+        hashes = self.hashes({shas[key]: images[key] for key in keys})
+        keys = [key for key in keys if shas[key] in hashes]
+        if len(keys) < 2:
+            return {}
+
+        values = [hashes[shas[key]] for key in keys]
+        ddist = hamming_matrix([v[0] for v in values])
+        pdist = hamming_matrix([v[1] for v in values])
+
+        result = {}
+        for i in range(1, len(keys)):
+            for j in range(i):
+                if keys[j] in result:
+                    continue
+                if shas[keys[i]] == shas[keys[j]] or (
+                    keys[i] not in exact_only and keys[j] not in exact_only
+                    and ddist[i, j] <= self.threshold and pdist[i, j] <= self.threshold
+                    and self._same_image(images[keys[i]], values[i], images[keys[j]], values[j])
+                ):
+                    result[keys[i]] = keys[j]
+                    break
+        return result
+
+    def find_similar(self, path, candidates: dict, sha: str = "") -> str:
+        """
+        在候选图片中查找与 path 相似的一张
+
+        Args:
+            path: 图片路径
+            candidates: {sha256: 文件路径}
+            sha: path 的 sha256（已计算过时传入）
+
+        Returns:
+            相似图片的 sha256，没有则返回空字符串
+        """
+        if self.threshold < 0 or not candidates:
+            return ""
+        sha = sha or fingerprint(path)
+        if sha in candidates:
+            return sha
+        hashes = self.hashes({sha: path, **candidates})
+        if sha not in hashes:
+            return ""
+        others = [s for s in candidates if s in hashes]
+        if not others:
+            return ""
+        values = [hashes[sha]] + [hashes[s] for s in others]
+        ddist = hamming_matrix([v[0] for v in values])[0]
+        pdist = hamming_matrix([v[1] for v in values])[0]
+        for k, other in enumerate(others, start=1):
+            if ddist[k] <= self.threshold and pdist[k] <= self.threshold and \
+                    self._same_image(path, values[0], candidates[other], values[k]):
+                return other
+        return ""
+
+    def _same_image(self, path_a, info_a: tuple, path_b, info_b: tuple) -> bool:
+        """宽高比一致，且缩放到同一尺寸后几乎没有明显不同的像素"""
+        import numpy as np
+        from PIL import Image
+
+        ratio_a, ratio_b = info_a[2] / info_a[3], info_b[2] / info_b[3]
+        if abs(ratio_a - ratio_b) / ratio_a > MAX_RATIO_DIFF:
+            return False
+        size = (VERIFY_WIDTH, max(8, round(VERIFY_WIDTH / ratio_a)))
+        draft = (size[0] * 2, size[1] * 2)
+        a = np.asarray(_load_gray(path_a, draft)[0].resize(size, Image.Resampling.BOX), dtype=np.int16)
+        b = np.asarray(_load_gray(path_b, draft)[0].resize(size, Image.Resampling.BOX), dtype=np.int16)
+        return float((np.abs(a - b) > VERIFY_PIXEL_DIFF).mean()) <= VERIFY_MAX_FRACTION
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="列出目录中的相似图片")
+    parser.add_argument("path", help="文章目录（检查其 assets/）或图片目录")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD, help="汉明距离阈值（0-64）")
+    args = parser.parse_args()
+
+    if not available():
+        print("错误: 需要安装 numpy 和 Pillow")
+        sys.exit(1)
+    folder = Path(args.path)
+    if (folder / "assets").is_dir():
+        folder = folder / "assets"
+    files = {p.name: str(p) for p in sorted(folder.iterdir()) if p.suffix.lower() in IMAGE_EXTENSIONS}
+    groups = ImageHashIndex(threshold=args.threshold).group(files)
+    if not groups:
+        print(f"{folder}: {len(files)} 张图片，没有相似图片")
+        sys.exit(0)
+    by_rep = {}
+    for key, rep in groups.items():
+        by_rep.setdefault(rep, []).append(key)
+    for rep, dups in by_rep.items():
+        print(f"{rep} ≈ {', '.join(dups)}")
+    print(f"{folder}: {len(files)} 张图片，其中 {len(groups)} 张与其他图片相似")
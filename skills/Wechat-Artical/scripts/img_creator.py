@@ -8,12 +8,14 @@ import os
 import sys
 import re
 import base64
-import asyncio
 import json
+import time
+import functools
 from pathlib import Path
 from typing import List, Union
-import aiohttp
-from PIL import Image, ImageDraw, ImageFont
+
+# 启动优化：asyncio、aiohttp、PIL、限流模块只在真正生成图片时才导入，
+# 配置在首次使用时读取并缓存（见 _get_config）。bench_startup.py 会检查这一点。
 
 
 def _load_config():
@@ -25,7 +27,13 @@ def _load_config():
         "IMAGE_API_BASE_URL": "https://xxx.com/v1",
         "IMAGE_API_KEY": "sk-xxx",
         "IMAGE_MODEL_NAME": "gemini-3-pro-image-preview",
-        "IMAGE_FALLBACK_MODEL_NAME": "gemini-2.0-flash-exp-image-generation"
+        "IMAGE_FALLBACK_MODEL_NAME": "gemini-2.0-flash-exp-image-generation",
+        "IMAGE_API_RPM": 10,
+        "IMAGE_API_BURST": 2,
+        "IMAGE_API_CIRCUIT_FAILURES": 3,
+        "IMAGE_API_CIRCUIT_WINDOW": 600,
+        "IMAGE_API_CIRCUIT_COOLDOWN": 300,
+        "METRICS_DIR": ""
     }
     
     try:
@@ -42,12 +50,39 @@ def _load_config():
         return default_config
 
 
-# API 配置（从同目录下的 config.json 文件读取）
-_config = _load_config()
-BASE_URL = _config["IMAGE_API_BASE_URL"]
-API_KEY = _config["IMAGE_API_KEY"]
-MODEL_NAME = _config["IMAGE_MODEL_NAME"]
-FALLBACK_MODEL_NAME = _config["IMAGE_FALLBACK_MODEL_NAME"]
+# API 配置（从同目录下的 config.json 文件读取，首次使用时加载）
+@functools.lru_cache(maxsize=None)
+def _get_config() -> dict:
+    """读取并缓存配置（返回同一个 dict，修改会生效）"""
+    return _load_config()
+
+
+# 兼容旧代码：模块属性 BASE_URL 等在首次访问时才读取配置
+_CONFIG_ALIASES = {
+    "BASE_URL": "IMAGE_API_BASE_URL",
+    "API_KEY": "IMAGE_API_KEY",
+    "MODEL_NAME": "IMAGE_MODEL_NAME",
+    "FALLBACK_MODEL_NAME": "IMAGE_FALLBACK_MODEL_NAME",
+}
+
+
+def _get_metrics():
+    """生图指标（config.json 未设置 METRICS_DIR 时为空操作）"""
+    from metrics import get_metrics
+    return get_metrics(_get_config().get("METRICS_DIR", ""), "img_creator")
+
+
+def __getattr__(name):
+    if name in _CONFIG_ALIASES:
+        return _get_config()[_CONFIG_ALIASES[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 请求超时（秒）：主模型出图慢，备用模型超时短一些以便尽快失败
+MODEL_TIMEOUT = 300
+FALLBACK_MODEL_TIMEOUT = 45
+
+# 限流与熔断状态库（多个进程共享），None 表示使用 rate_limiter 的默认位置
+RATE_LIMIT_DB = None
 
 
 def create_cover_image(article_dir: str, cover_text: str = "") -> str:
@@ -61,7 +96,17 @@ def create_cover_image(article_dir: str, cover_text: str = "") -> str:
     Returns:
         成功返回图片路径，失败返回错误信息
     """
-    return asyncio.run(_create_cover_image_async(article_dir, cover_text))
+    import asyncio
+
+    start = time.perf_counter()
+    result = asyncio.run(_create_cover_image_async(article_dir, cover_text))
+    seconds = time.perf_counter() - start
+    ok = not result.startswith("错误")
+    metrics = _get_metrics()
+    metrics.observe("cover_create_seconds", seconds, result="ok" if ok else "error")
+    metrics.event("cover", article=str(article_dir), ok=ok, seconds=round(seconds, 3), result=result[:200])
+    metrics.flush()
+    return result
 
 
 async def _create_cover_image_async(article_dir: str, cover_text: str = "") -> str:
@@ -142,6 +187,8 @@ def _add_text_to_image(image_path: str, text: str) -> None:
         image_path: 图片路径
         text: 要添加的文字
     """
+    from PIL import Image, ImageDraw, ImageFont
+
     try:
         # 打开图片
         img = Image.open(image_path)
@@ -286,16 +333,41 @@ async def image2image(
 
 async def _generate(prompt: str, images: List[str], output_path: str) -> str:
     """核心生成逻辑"""
+    import asyncio
+    import aiohttp
+    from rate_limiter import DEFAULT_DB_PATH, ProviderLimiter, provider_key
+
+    config = _get_config()
     content = _build_content(prompt, images)
 
     models = [
-        (MODEL_NAME, 300),
-        (FALLBACK_MODEL_NAME, 45)
+        (config["IMAGE_MODEL_NAME"], MODEL_TIMEOUT),
+        (config["IMAGE_FALLBACK_MODEL_NAME"], FALLBACK_MODEL_TIMEOUT)
     ]
 
+    limiter = ProviderLimiter.from_config(config, RATE_LIMIT_DB or DEFAULT_DB_PATH)
+    metrics = _get_metrics()
     errors = []
     async with aiohttp.ClientSession() as session:
-        for model, timeout in models:
+        for attempt, (model, timeout) in enumerate(models):
+            key = provider_key(config["IMAGE_API_BASE_URL"], model)
+            role = "primary" if attempt == 0 else "fallback"
+
+            # 熔断中的模型直接跳过，交给备用模型
+            if not limiter.allow(key):
+                error_msg = f"模型 {model} 近期连续失败，熔断中，跳过"
+                print(f"✗ {error_msg}")
+                errors.append(error_msg)
+                metrics.inc("image_generate_total", model=model, role=role, result="circuit_open")
+                continue
+
+            # 令牌桶限流：多个封面同时生成时排队，避免超出 RPM 额度
+            wait = limiter.reserve(key)
+            if wait > 0:
+                print(f"模型 {model} 达到请求频率上限，等待 {wait:.1f} 秒...")
+                await asyncio.sleep(wait)
+
+            start = time.perf_counter()
             try:
                 print(f"尝试使用模型: {model} (超时: {timeout}秒)...")
                 data = await _call_api(session, model, content, timeout)
@@ -308,6 +380,8 @@ async def _generate(prompt: str, images: List[str], output_path: str) -> str:
                         os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
                         with open(output_path, "wb") as f:
                             f.write(base64.b64decode(img_data))
+                        limiter.record_success(key)
+                        _record_generate(model, role, "ok", time.perf_counter() - start)
                         print(f"✓ 模型 {model} 成功生成图片")
                         return output_path
                     else:
@@ -323,13 +397,24 @@ async def _generate(prompt: str, images: List[str], output_path: str) -> str:
                 error_msg = f"模型 {model} 失败: {e}"
                 print(f"✗ {error_msg}")
                 errors.append(error_msg)
-                continue
+
+            _record_generate(model, role, "error", time.perf_counter() - start)
+            if limiter.record_failure(key):
+                print(f"  模型 {model} 已熔断，{limiter.cooldown_seconds:.0f} 秒内直接使用备用模型")
 
     # 所有模型都失败，返回详细错误信息
     error_summary = "\n".join([f"  - {err}" for err in errors])
     raise Exception(f"所有模型都失败了:\n{error_summary}")
 
 
+def _record_generate(model: str, role: str, result: str, seconds: float):
+    """记录一次生图请求（role 为 primary 或 fallback）"""
+    metrics = _get_metrics()
+    metrics.inc("image_generate_total", model=model, role=role, result=result)
+    metrics.observe("image_generate_seconds", seconds, model=model, result=result)
+    metrics.event("image_generate", model=model, role=role, result=result, seconds=round(seconds, 3))
+
+
 def _build_content(prompt: str, images: List[str]):
     """构建请求内容"""
     if not images:
@@ -376,11 +461,14 @@ def _extract_image(content) -> str:
 
 async def _call_api(session, model: str, content, timeout: int) -> dict:
     """调用API"""
+    import aiohttp
+
+    config = _get_config()
     async with session.post(
-        f"{BASE_URL}/chat/completions",
+        f"{config['IMAGE_API_BASE_URL']}/chat/completions",
         headers={
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {API_KEY}"
+            "Authorization": f"Bearer {config['IMAGE_API_KEY']}"
         },
         json={
             "model": model,
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布与生图流程的指标（计数器 + 直方图）
+
+wechat_publisher / async_publisher / img_creator 共用。运行中只在内存里累加（一次加锁的字典操作），
+进程结束或一次发布完成时统一落盘：
+    metrics.db              各进程累计值（SQLite，多个进程同时写入也不会丢失计数）
+    wechat_article.prom     由累计值生成的 Prometheus textfile，供 node_exporter 的 textfile collector 采集
+    events.jsonl            逐条事件日志（每次接口调用、每次生图、每篇文章的结果），便于离线分析
+
+在 config.json 中设置 METRICS_DIR 后启用，为空时所有记录都是空操作。
+
+常用查询（PromQL）：
+    上传耗时 P95   histogram_quantile(0.95, sum by (le, api) (rate(wechat_api_seconds_bucket{api=~"upload_.*"}[1h])))
+    每小时草稿数   sum(increase(wechat_drafts_total{action=~"created|updated"}[1h]))
+    备用模型占比   sum(rate(image_generate_total{role="fallback",result="ok"}[1d])) / sum(rate(image_generate_total{result="ok"}[1d]))
+
+用法：
+    python metrics.py <指标目录> [--json]    # 查看累计值和直方图分位数
+
+示例：
+    python metrics.py ~/.openclaw/metrics
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import bisect
+import argparse
+import functools
+import threading
+from contextlib import closing
+from pathlib import Path
+
+
+DB_FILE = "metrics.db"
+TEXTFILE = "wechat_article.prom"
+EVENTS_FILE = "events.jsonl"
+
+# 事件在内存中最多攒这么多条，超过后立即写入 events.jsonl
+MAX_BUFFERED_EVENTS = 1000
+
+# 直方图分桶（秒）
+API_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PUBLISH_BUCKETS = (0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+SLOW_BUCKETS = (1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300)
+
+COUNTER = "counter"
+HISTOGRAM = "histogram"
+
+# 指标定义 {名称: (类型, 说明, 分桶)}
+METRICS = {
+    "wechat_api_calls_total": (COUNTER, "微信接口调用次数（result 为 ok 或错误码）", None),
+    "wechat_api_seconds": (HISTOGRAM, "微信接口调用耗时（秒）", API_BUCKETS),
+    "wechat_upload_bytes_total": (COUNTER, "成功上传到微信的图片字节数", None),
+    "wechat_token_refresh_total": (COUNTER, "从微信获取新 access_token 的次数", None),
+    "wechat_drafts_total": (COUNTER, "草稿保存次数（action 为 created、updated 或 unchanged）", None),
+    "wechat_publish_total": (COUNTER, "文章发布次数（result 为 ok 或 error）", None),
+    "wechat_publish_seconds": (HISTOGRAM, "单篇文章发布耗时（秒）", PUBLISH_BUCKETS),
+    "image_generate_total": (COUNTER, "生图请求次数（role 为 primary 或 fallback，result 为 ok、error 或 circuit_open）", None),
+    "image_generate_seconds": (HISTOGRAM, "单次生图请求耗时（秒）", SLOW_BUCKETS),
+    "cover_create_seconds": (HISTOGRAM, "生成一张封面的总耗时（秒，含重试备用模型和加字）", SLOW_BUCKETS),
+}
+
+
+def _format_labels(labels, extra: tuple = None) -> str:
+    items = [(k, str(v)) for k, v in labels]
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def quantile(buckets: list, q: float) -> float:
+    """
+    按分桶估算分位数（与 PromQL histogram_quantile 相同的线性插值）
+
+    Args:
+        buckets: [(上界, 累计次数)]，按上界升序，最后一个上界为 inf
+    """
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return 0.0
+    rank = q * total
+    lower, prev_count = 0.0, 0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                return lower
+            if count == prev_count:
+                return bound
+            return lower + (bound - lower) * (rank - prev_count) / (count - prev_count)
+        lower, prev_count = bound, count
+    return lower
+
+
+class Metrics:
+    """进程内指标缓冲，flush 时合并到指标目录"""
+
+    def __init__(self, metrics_dir, job: str):
+        """
+        Args:
+            metrics_dir: 指标目录
+            job: 写入事件日志的来源（如 wechat_publisher、img_creator）
+        """
+        self.metrics_dir = Path(metrics_dir).expanduser()
+        self.job = job
+        self._lock = threading.Lock()
+        self._counters = {}     # {(名称, 排序后的标签元组): 增量}
+        self._histograms = {}   # {(名称, 排序后的标签元组): [各桶次数..., +Inf 桶次数, 总和]}
+        self._events = []
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器加 value"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """直方图记录一次观测值"""
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            row = self._histograms.get(key)
+            if row is None:
+                row = self._histograms[key] = [0] * (len(buckets) + 2)
+            row[bisect.bisect_left(buckets, value)] += 1
+            row[-1] += value
+
+    def event(self, name: str, **fields):
+        """追加一条事件日志"""
+        record = {"ts": round(time.time(), 3), "job": self.job, "event": name, **fields}
+        with self._lock:
+            self._events.append(record)
+            full = len(self._events) >= MAX_BUFFERED_EVENTS
+        if full:
+            self._write_events()
+
+    def _write_events(self):
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return
+        self.metrics_dir.mkdir(parents=True, exist_ok=True)
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+        # 一次 write 追加整批事件，多个进程同时追加时行不会交错
+        with open(self.metrics_dir / EVENTS_FILE, "a", encoding="utf-8") as f:
+            f.write(data)
+
+    def flush(self):
+        """把缓冲的增量合并到 metrics.db，重新生成 textfile，并写出事件日志"""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            histograms, self._histograms = self._histograms, {}
+        self._write_events()
+        if not counters and not histograms:
+            return
+
+        import sqlite3
+
+        rows = [(name, json.dumps(labels, ensure_ascii=False), "", value)
+                for (name, labels), value in counters.items()]
+        for (name, labels), row in histograms.items():
+            labels = json.dumps(labels, ensure_ascii=False)
+            bounds = [repr(float(b)) for b in METRICS[name][2]] + ["+Inf"]
+            rows.extend((name, labels, le, count) for le, count in zip(bounds, row) if count)
+            rows.append((name, labels, "sum", row[-1]))
+
+        self.metrics_dir.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(str(self.metrics_dir / DB_FILE), timeout=30)) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS samples ("
+                         "name TEXT, labels TEXT, le TEXT, value REAL, PRIMARY KEY (name, labels, le))")
+            conn.executemany(
+                "INSERT INTO samples (name, labels, le, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name, labels, le) DO UPDATE SET value = value + excluded.value",
+                rows,
+            )
+            samples = conn.execute("SELECT name, labels, le, value FROM samples").fetchall()
+        write_textfile(self.metrics_dir / TEXTFILE, samples)
+
+
+class NullMetrics:
+    """未启用指标时使用，所有记录都是空操作"""
+
+    def inc(self, name: str, value: float = 1, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+    def event(self, name: str, **fields):
+        pass
+
+    def flush(self):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+@functools.lru_cache(maxsize=None)
+def get_metrics(metrics_dir: str, job: str):
+    """
+    同一进程内同一目录共用一个实例，进程退出时自动 flush
+
+    Args:
+        metrics_dir: 指标目录，为空返回 NULL_METRICS
+        job: 事件日志中的来源
+    """
+    if not metrics_dir:
+        return NULL_METRICS
+    metrics = Metrics(metrics_dir, job)
+    atexit.register(metrics.flush)
+    return metrics
+
+
+def load_series(samples: list) -> dict:
+    """
+    把 metrics.db 中的行整理为序列
+
+    Returns:
+        {名称: {标签元组: 计数器值 或 {"buckets": [(上界, 累计次数)], "sum": 总和, "count": 次数}}}
+    """
+    series = {}
+    for name, labels, le, value in samples:
+        if name not in METRICS:
+            continue
+        labels = tuple(tuple(item) for item in json.loads(labels))
+        by_labels = series.setdefault(name, {})
+        if METRICS[name][0] == COUNTER:
+            by_labels[labels] = value
+            continue
+        hist = by_labels.setdefault(labels, {"counts": {}, "sum": 0.0})
+        if le == "sum":
+            hist["sum"] = value
+        else:
+            hist["counts"][float(le)] = value
+
+    for name, by_labels in series.items():
+        if METRICS[name][0] != HISTOGRAM:
+            continue
+        bounds = [float(b) for b in METRICS[name][2]] + [float("inf")]
+        for labels, hist in by_labels.items():
+            cumulative, buckets = 0, []
+            for bound in bounds:
+                cumulative += hist["counts"].get(bound, 0)
+                buckets.append((bound, cumulative))
+            by_labels[labels] = {"buckets": buckets, "sum": hist["sum"], "count": cumulative}
+    return series
+
+
+def write_textfile(path: Path, samples: list):
+    """生成 Prometheus 文本格式，先写临时文件再替换，采集时不会读到写了一半的文件"""
+    lines = []
+    for name, by_labels in sorted(load_series(samples).items()):
+        kind, help_text = METRICS[name][:2]
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(by_labels.items()):
+            if kind == COUNTER:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            for bound, count in value["buckets"]:
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', le))} {_format_value(count)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_value(value['count'])}")
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def summarize(metrics_dir) -> dict:
+    """读取累计值，直方图给出次数、平均值和 P50/P95/P99"""
+    import sqlite3
+
+    db_path = Path(metrics_dir).expanduser() / DB_FILE
+    if not db_path.exists():
+        return {}
+    with closing(sqlite3.connect(str(db_path), timeout=30)) as conn:
+        samples = conn.execute("SELECT name, labels, le, value FROM samples").fetchall()
+
+    result = {}
+    for name, by_labels in sorted(load_series(samples).items()):
+        rows = []
+        for labels, value in sorted(by_labels.items()):
+            row = {"labels": dict(labels)}
+            if METRICS[name][0] == COUNTER:
+                row["value"] = value
+            else:
+                count = value["count"]
+                row.update({
+                    "count": count,
+                    "avg": value["sum"] / count if count else 0.0,
+                    "p50": quantile(value["buckets"], 0.5),
+                    "p95": quantile(value["buckets"], 0.95),
+                    "p99": quantile(value["buckets"], 0.99),
+                })
+            rows.append(row)
+        result[name] = rows
+    return result
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="查看发布与生图指标")
+    parser.add_argument("metrics_dir", help="指标目录（config.json 中的 METRICS_DIR）")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args(argv)
+
+    result = summarize(args.metrics_dir)
+    if not result:
+        print(f"错误: {Path(args.metrics_dir) / DB_FILE} 不存在或没有数据")
+        return 1
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    for name, rows in result.items():
+        print(f"{name}  {METRICS[name][1]}")
+        for row in rows:
+            labels = ", ".join(f"{k}={v}" for k, v in row["labels"].items()) or "-"
+            if "value" in row:
+                print(f"    {labels}: {_format_value(row['value'])}")
+            else:
+                print(f"    {labels}: {int(row['count'])} 次，平均 {row['avg']:.3f}s，"
+                      f"P50 {row['p50']:.3f}s，P95 {row['p95']:.3f}s，P99 {row['p99']:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
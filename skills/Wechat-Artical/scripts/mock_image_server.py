@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 OpenAI 兼容生图接口模拟服务器（用于压测 img_creator，不调用付费模型）
+
+实现接口：
+    POST /v1/chat/completions
+    GET  /mock/stats      调用统计（模拟服务器专用）
+    POST /mock/reset      清空统计（模拟服务器专用）
+
+返回合成 PNG，响应格式覆盖 _extract_image 支持的三种形态：
+    data_uri        content 为字符串，内含 data:image/png;base64,...
+    image_url_list  content 为列表，包含 {"type": "image_url", ...}
+    text_embedded   content 为列表，图片 data URI 嵌在 {"type": "text"} 的文字中
+
+支持可调延迟、429/5xx/超时/无图片的失败率，以及按模型覆盖参数。
+把 config.json 中的 IMAGE_API_BASE_URL 改为 <服务器地址>/v1 即可让 img_creator 连到这里。
+
+用法：
+    python mock_image_server.py [--port 8701] [--latency-ms 500] [--rate-429 0.1] [--shape random] ...
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import base64
+import random
+import struct
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+RESPONSE_SHAPES = ("data_uri", "image_url_list", "text_embedded")
+
+# 默认参数
+MOCK_DEFAULTS = {
+    "latency_ms": 0,          # 每个请求的固定延迟
+    "jitter_ms": 0,           # 延迟随机抖动上限
+    "rate_429": 0.0,          # 返回 429 的概率
+    "rate_5xx": 0.0,          # 返回 500/502/503 的概率
+    "rate_timeout": 0.0,      # 挂起 hang_seconds 秒不响应的概率（模拟客户端超时）
+    "rate_no_image": 0.0,     # 返回不含图片的文字回复的概率
+    "hang_seconds": 600.0,    # 模拟超时时的挂起时长
+    "shape": "random",        # 响应格式：RESPONSE_SHAPES 之一或 random
+    "width": 1280,            # 合成图片尺寸（越大 base64 越大）
+    "height": 720,
+}
+
+
+def synthetic_png(width: int, height: int) -> bytes:
+    """生成随机噪点 PNG（几乎不可压缩，文件大小约为 width*height*3 字节）"""
+    raw = b"".join(b"\x00" + os.urandom(width * 3) for _ in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    png = b"\x89PNG\r\n\x1a\n"
+    png += chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    png += chunk(b"IDAT", zlib.compress(raw, 1))
+    png += chunk(b"IEND", b"")
+    return png
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, model_options: dict = None,
+                      **options) -> "MockImageServer":
+    """
+    在后台线程启动模拟服务器
+
+    Args:
+        host: 监听地址
+        port: 端口，0 表示随机空闲端口
+        model_options: 按模型覆盖参数，如 {"主模型": {"rate_429": 0.5}}
+        **options: 覆盖 MOCK_DEFAULTS 中的参数
+
+    Returns:
+        服务器实例，base_url 属性为 OpenAI 兼容的根地址（含 /v1），用完调用 shutdown()
+    """
+    server = MockImageServer((host, port), options, model_options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class MockImageServer(ThreadingHTTPServer):
+    """模拟服务器，保存参数、合成图片缓存和调用统计"""
+
+    daemon_threads = True
+
+    def __init__(self, address, options: dict, model_options: dict = None):
+        for opts in [options, *(model_options or {}).values()]:
+            unknown = set(opts) - set(MOCK_DEFAULTS)
+            if unknown:
+                raise ValueError(f"未知参数: {', '.join(sorted(unknown))}")
+        super().__init__(address, _MockHandler)
+        self.options = {**MOCK_DEFAULTS, **options}
+        self.model_options = model_options or {}
+        self.lock = threading.Lock()
+        self.stats = Counter()   # {"模型:结果": 次数}
+        self._images = {}        # {(宽, 高): base64}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def options_for(self, model: str) -> dict:
+        return {**self.options, **self.model_options.get(model, {})}
+
+    def image_b64(self, width: int, height: int) -> str:
+        """同尺寸的合成图片只生成一次"""
+        key = (width, height)
+        with self.lock:
+            if key not in self._images:
+                self._images[key] = base64.b64encode(synthetic_png(width, height)).decode()
+            return self._images[key]
+
+    def record(self, model: str, outcome: str):
+        with self.lock:
+            self.stats[f"{model}:{outcome}"] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"calls": dict(self.stats), "options": self.options, "model_options": self.model_options}
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """请求处理"""
+
+    server: MockImageServer
+
+    def log_message(self, format, *args):
+        # 压测时不输出访问日志
+        pass
+
+    def do_GET(self):
+        if self.path == "/mock/stats":
+            return self._send_json(self.server.snapshot())
+        self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path == "/mock/reset":
+            self.server.reset()
+            return self._send_json({"ok": True})
+        if self.path != "/v1/chat/completions":
+            return self._send_json({"error": {"message": "not found"}}, status=404)
+
+        try:
+            model = json.loads(body.decode("utf-8"))["model"]
+        except Exception:
+            return self._send_json({"error": {"message": "invalid request body"}}, status=400)
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self.server.record(model, "401")
+            return self._send_json({"error": {"message": "missing api key"}}, status=401)
+
+        opts = self.server.options_for(model)
+        delay = opts["latency_ms"] + random.uniform(0, opts["jitter_ms"])
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        roll = random.random()
+        if roll < opts["rate_timeout"]:
+            self.server.record(model, "timeout")
+            time.sleep(opts["hang_seconds"])
+            return
+        roll -= opts["rate_timeout"]
+        if roll < opts["rate_429"]:
+            self.server.record(model, "429")
+            return self._send_json({"error": {"message": "Rate limit reached, please retry later"}}, status=429)
+        roll -= opts["rate_429"]
+        if roll < opts["rate_5xx"]:
+            self.server.record(model, "5xx")
+            return self._send_text("upstream error", status=random.choice([500, 502, 503]))
+        roll -= opts["rate_5xx"]
+        if roll < opts["rate_no_image"]:
+            self.server.record(model, "no_image")
+            return self._send_json(_completion(model, "抱歉，我无法生成这张图片。"))
+
+        shape = opts["shape"] if opts["shape"] in RESPONSE_SHAPES else random.choice(RESPONSE_SHAPES)
+        data_uri = f"data:image/png;base64,{self.server.image_b64(opts['width'], opts['height'])}"
+        if shape == "data_uri":
+            content = f"![image]({data_uri})"
+        elif shape == "image_url_list":
+            content = [{"type": "image_url", "image_url": {"url": data_uri}}]
+        else:
+            content = [{"type": "text", "text": f"这是生成的图片：\n{data_uri}\n"}]
+        self.server.record(model, "ok")
+        self._send_json(_completion(model, content))
+
+    def _send_json(self, data: dict, status: int = 200):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._send(payload, "application/json; charset=utf-8", status)
+
+    def _send_text(self, text: str, status: int):
+        self._send(text.encode("utf-8"), "text/plain; charset=utf-8", status)
+
+    def _send(self, payload: bytes, content_type: str, status: int):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端已超时断开
+            pass
+
+
+def _completion(model: str, content) -> dict:
+    """构造 chat/completions 响应"""
+    return {
+        "id": f"chatcmpl-mock-{random.getrandbits(48):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容生图接口模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8701)
+    for key, value in MOCK_DEFAULTS.items():
+        kwargs = {"choices": ("random",) + RESPONSE_SHAPES} if key == "shape" else {}
+        parser.add_argument(f"--{key.replace('_', '-')}", dest=key, type=type(value), default=value, **kwargs)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = vars(_parse_args(sys.argv[1:]))
+    host, port = args.pop("host"), args.pop("port")
+    server = MockImageServer((host, port), args)
+    print(f"生图接口模拟服务器已启动: {server.base_url}")
+    print(f"在 config.json 中设置 \"IMAGE_API_BASE_URL\": \"{server.base_url}\" 即可使用")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n已停止")
+    finally:
+        server.server_close()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地微信公众号 API 模拟服务器（用于压测和联调，不访问真实微信）
+
+实现接口：
+    GET  /cgi-bin/token
+    POST /cgi-bin/material/add_material
+    POST /cgi-bin/media/uploadimg
+    POST /cgi-bin/draft/add
+    POST /cgi-bin/draft/update
+    POST /cgi-bin/openapi/quota/get   查询接口当天的调用额度
+    GET  /mock/stats      调用统计（模拟服务器专用）
+    POST /mock/reset      清空统计和 token（模拟服务器专用）
+
+支持可配置的延迟、错误注入（40001 token 失效、45009 频率限制、5xx）、大小限制和每日调用次数上限。
+把 config.json 中的 WECHAT_API_BASE_URL 改为本服务器地址即可让发布脚本连到这里。
+
+用法：
+    python mock_wechat_server.py [--port 8700] [--latency-ms 50] [--token-expiry-rate 0.01] ...
+
+示例：
+    python mock_wechat_server.py --port 8700 --latency-ms 80 --jitter-ms 30 --server-error-rate 0.02
+"""
+
+import sys
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+# 默认参数（大小限制与微信官方文档一致）
+MOCK_DEFAULTS = {
+    "latency_ms": 0,                          # 每个请求的固定延迟
+    "jitter_ms": 0,                           # 延迟随机抖动上限
+    "token_expiry_rate": 0.0,                 # 随机返回 40001 并作废当前 token 的概率
+    "rate_limit_rate": 0.0,                   # 随机返回 45009 的概率
+    "server_error_rate": 0.0,                 # 随机返回 HTTP 5xx 的概率
+    "token_ttl": 7200,                        # access_token 有效期（秒）
+    "max_uploadimg_bytes": 1024 * 1024,       # uploadimg 图片上限 1MB
+    "max_material_bytes": 10 * 1024 * 1024,   # 永久素材图片上限 10MB
+    "max_content_chars": 20000,               # 草稿正文上限 2 万字符
+    "max_content_bytes": 1024 * 1024,         # 草稿正文上限 1MB
+    "daily_quota": 0,                         # 每个接口的日调用次数上限，超过返回 45009（0 表示不限）
+}
+
+# 接口路径 → 统计用的接口名
+ENDPOINTS = {
+    "/cgi-bin/token": "token",
+    "/cgi-bin/material/add_material": "add_material",
+    "/cgi-bin/media/uploadimg": "uploadimg",
+    "/cgi-bin/draft/add": "draft_add",
+    "/cgi-bin/draft/update": "draft_update",
+}
+
+# 微信错误码
+ERR_INVALID_TOKEN = {"errcode": 40001, "errmsg": "invalid credential, access_token is invalid or not latest"}
+ERR_RATE_LIMIT = {"errcode": 45009, "errmsg": "reach max api daily quota limit"}
+ERR_IMAGE_SIZE = {"errcode": 40009, "errmsg": "invalid image size"}
+ERR_CONTENT_SIZE = {"errcode": 45002, "errmsg": "content size out of limit"}
+ERR_MISSING_MEDIA = {"errcode": 41005, "errmsg": "media data missing"}
+ERR_BAD_JSON = {"errcode": 44002, "errmsg": "empty post data"}
+ERR_INVALID_MEDIA = {"errcode": 40007, "errmsg": "invalid media_id"}
+ERR_CGI_PATH = {"errcode": 76021, "errmsg": "cgi_path not found"}
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **options) -> "MockWechatServer":
+    """
+    在后台线程启动模拟服务器
+
+    Args:
+        host: 监听地址
+        port: 端口，0 表示随机空闲端口
+        **options: 覆盖 MOCK_DEFAULTS 中的参数
+
+    Returns:
+        服务器实例，base_url 属性为根地址，用完调用 shutdown()
+    """
+    server = MockWechatServer((host, port), options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class MockWechatServer(ThreadingHTTPServer):
+    """模拟服务器，保存参数、token 和调用统计"""
+
+    daemon_threads = True
+    # 默认 listen 队列只有 5，高并发压测时连接会被直接重置
+    request_queue_size = 1024
+
+    def __init__(self, address, options: dict):
+        unknown = set(options) - set(MOCK_DEFAULTS)
+        if unknown:
+            raise ValueError(f"未知参数: {', '.join(sorted(unknown))}")
+        super().__init__(address, _MockHandler)
+        self.options = {**MOCK_DEFAULTS, **options}
+        self.lock = threading.Lock()
+        self.tokens = {}        # {token: 过期时间}
+        self.drafts = {}        # {草稿 media_id: 文章数}
+        self.stats = Counter()  # {"接口:结果": 次数}
+        self.usage = Counter()  # {接口: 当天调用次数}（计入额度的调用）
+        self.bytes_received = 0
+        self._seq = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def next_id(self) -> int:
+        with self.lock:
+            self._seq += 1
+            return self._seq
+
+    def record(self, endpoint: str, outcome: str, nbytes: int = 0):
+        with self.lock:
+            self.stats[f"{endpoint}:{outcome}"] += 1
+            self.bytes_received += nbytes
+
+    def use_quota(self, endpoint: str) -> bool:
+        """计入一次调用，超过日调用上限时返回 False"""
+        limit = self.options["daily_quota"]
+        with self.lock:
+            if limit and self.usage[endpoint] >= limit:
+                return False
+            self.usage[endpoint] += 1
+            return True
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"calls": dict(self.stats), "usage": dict(self.usage),
+                    "bytes_received": self.bytes_received, "options": self.options}
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.usage.clear()
+            self.tokens.clear()
+            self.bytes_received = 0
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """请求处理"""
+
+    server: MockWechatServer
+
+    def log_message(self, format, *args):
+        # 压测时不输出访问日志
+        pass
+
+    # ========== 路由 ==========
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/mock/stats":
+            return self._send_json(self.server.snapshot())
+        if url.path == "/cgi-bin/token":
+            return self._handle(ENDPOINTS[url.path], query, b"", self._token)
+        self._send_json({"errcode": 404, "errmsg": "not found"}, status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        routes = {
+            "/cgi-bin/material/add_material": self._add_material,
+            "/cgi-bin/media/uploadimg": self._uploadimg,
+            "/cgi-bin/draft/add": self._draft_add,
+            "/cgi-bin/draft/update": self._draft_update,
+        }
+        if url.path == "/mock/reset":
+            self.server.reset()
+            return self._send_json({"errcode": 0, "errmsg": "ok"})
+        if url.path == "/cgi-bin/openapi/quota/get":
+            return self._handle("quota_get", query, body, self._quota_get)
+        if url.path in routes:
+            return self._handle(ENDPOINTS[url.path], query, body, routes[url.path])
+        self._send_json({"errcode": 404, "errmsg": "not found"}, status=404)
+
+    def _handle(self, endpoint: str, query: dict, body: bytes, handler):
+        """公共流程：延迟 → 错误注入 → token 校验 → 具体接口"""
+        opts = self.server.options
+        delay = opts["latency_ms"] + random.uniform(0, opts["jitter_ms"])
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if random.random() < opts["server_error_rate"]:
+            self.server.record(endpoint, "5xx", len(body))
+            return self._send_text("Bad Gateway", status=random.choice([500, 502, 503]))
+        if random.random() < opts["rate_limit_rate"] or (
+            endpoint != "quota_get" and not self.server.use_quota(endpoint)
+        ):
+            self.server.record(endpoint, "45009", len(body))
+            return self._send_json(ERR_RATE_LIMIT)
+
+        if endpoint != "token":
+            token = query.get("access_token", "")
+            if not self._token_valid(token) or random.random() < opts["token_expiry_rate"]:
+                with self.server.lock:
+                    self.server.tokens.pop(token, None)
+                self.server.record(endpoint, "40001", len(body))
+                return self._send_json(ERR_INVALID_TOKEN)
+
+        outcome, data = handler(query, body)
+        self.server.record(endpoint, outcome, len(body))
+        self._send_json(data)
+
+    # ========== 接口实现 ==========
+
+    def _token(self, query: dict, body: bytes):
+        if query.get("grant_type") != "client_credential" or not query.get("appid") or not query.get("secret"):
+            return "40002", {"errcode": 40002, "errmsg": "invalid grant_type"}
+        token = secrets.token_urlsafe(48)
+        ttl = self.server.options["token_ttl"]
+        with self.server.lock:
+            self.server.tokens[token] = time.time() + ttl
+        return "ok", {"access_token": token, "expires_in": ttl}
+
+    def _add_material(self, query: dict, body: bytes):
+        size = _multipart_file_size(self.headers.get("Content-Type", ""), body)
+        if size is None:
+            return "41005", ERR_MISSING_MEDIA
+        if size > self.server.options["max_material_bytes"]:
+            return "40009", ERR_IMAGE_SIZE
+        seq = self.server.next_id()
+        return "ok", {
+            "media_id": f"MOCK_MEDIA_{seq}_{secrets.token_hex(8)}",
+            "url": f"http://mmbiz.qpic.cn/mock/material/{seq}/0",
+        }
+
+    def _uploadimg(self, query: dict, body: bytes):
+        size = _multipart_file_size(self.headers.get("Content-Type", ""), body)
+        if size is None:
+            return "41005", ERR_MISSING_MEDIA
+        if size > self.server.options["max_uploadimg_bytes"]:
+            return "40009", ERR_IMAGE_SIZE
+        return "ok", {"url": f"http://mmbiz.qpic.cn/mock/img/{self.server.next_id()}/0"}
+
+    def _draft_add(self, query: dict, body: bytes):
+        try:
+            articles = json.loads(body.decode("utf-8"))["articles"]
+        except Exception:
+            return "44002", ERR_BAD_JSON
+        if any(not self._content_ok(article) for article in articles):
+            return "45002", ERR_CONTENT_SIZE
+        media_id = f"MOCK_DRAFT_{self.server.next_id()}_{secrets.token_hex(8)}"
+        with self.server.lock:
+            self.server.drafts[media_id] = len(articles)
+        return "ok", {"media_id": media_id}
+
+    def _draft_update(self, query: dict, body: bytes):
+        try:
+            data = json.loads(body.decode("utf-8"))
+            media_id, index, article = data["media_id"], int(data["index"]), data["articles"]
+        except Exception:
+            return "44002", ERR_BAD_JSON
+        with self.server.lock:
+            count = self.server.drafts.get(media_id)
+        # 草稿不存在（已删除、已发表）或 index 越界
+        if count is None or not 0 <= index < count:
+            return "40007", ERR_INVALID_MEDIA
+        if not self._content_ok(article):
+            return "45002", ERR_CONTENT_SIZE
+        return "ok", {"errcode": 0, "errmsg": "ok"}
+
+    def _quota_get(self, query: dict, body: bytes):
+        try:
+            cgi_path = json.loads(body.decode("utf-8"))["cgi_path"]
+        except Exception:
+            return "44002", ERR_BAD_JSON
+        endpoint = ENDPOINTS.get(cgi_path)
+        if endpoint is None:
+            return "76021", ERR_CGI_PATH
+        limit = self.server.options["daily_quota"]
+        with self.server.lock:
+            used = self.server.usage[endpoint]
+        return "ok", {"errcode": 0, "errmsg": "ok",
+                      "quota": {"daily_limit": limit, "used": used, "remain": max(limit - used, 0)}}
+
+    def _content_ok(self, article: dict) -> bool:
+        opts = self.server.options
+        content = article.get("content", "")
+        return len(content) <= opts["max_content_chars"] and len(content.encode("utf-8")) <= opts["max_content_bytes"]
+
+    # ========== 工具 ==========
+
+    def _token_valid(self, token: str) -> bool:
+        with self.server.lock:
+            expires_at = self.server.tokens.get(token)
+        return expires_at is not None and expires_at > time.time()
+
+    def _send_json(self, data: dict, status: int = 200):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_text(self, text: str, status: int):
+        payload = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def _multipart_file_size(content_type: str, body: bytes):
+    """返回 multipart 请求中 media 文件部分的字节数，找不到返回 None"""
+    if "boundary=" not in content_type:
+        return None
+    boundary = content_type.split("boundary=", 1)[1].split(";")[0].strip().strip('"').encode()
+    for part in body.split(b"--" + boundary):
+        header_end = part.find(b"\r\n\r\n")
+        if header_end < 0:
+            continue
+        headers = part[:header_end]
+        if b'name="media"' in headers:
+            payload = part[header_end + 4:]
+            if payload.endswith(b"\r\n"):
+                payload = payload[:-2]
+            return len(payload)
+    return None
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="本地微信公众号 API 模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    for key, value in MOCK_DEFAULTS.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", dest=key, type=type(value), default=value)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = vars(_parse_args(sys.argv[1:]))
+    host, port = args.pop("host"), args.pop("port")
+    server = MockWechatServer((host, port), args)
+    print(f"微信 API 模拟服务器已启动: {server.base_url}")
+    print(f"在 config.json 中设置 \"WECHAT_API_BASE_URL\": \"{server.base_url}\" 即可使用")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n已停止")
+    finally:
+        server.server_close()
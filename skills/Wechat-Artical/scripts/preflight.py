@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布前预检（不调用任何微信接口）
+
+在获取 token、上传封面之前检查文章能否顺利发布：
+    - 文章标题、封面是否存在
+    - 正文引用的图片是否存在，格式、尺寸、大小是否符合微信限制
+    - 【标题N】标记是否都有对应的标题图片（assets/N.png 或 N.jpg，N 不限）
+    - 渲染后的正文是否超出草稿长度限制；超出时规划按【标题N】拆分为多篇（同一个多图文草稿）
+
+图片只读取文件头解析格式和尺寸，并行检查，整篇文章通常几毫秒完成。
+
+用法：
+    python preflight.py <文章目录路径> [--json]
+
+示例：
+    python preflight.py ./artical/artical1
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import struct
+from pathlib import Path
+
+from render_engine import ArticleParser, AssetIndex, RenderEngine
+
+
+# 微信接口限制
+WECHAT_LIMITS = {
+    "cover_formats": ("png", "jpeg", "gif", "bmp"),   # 永久素材（封面）
+    "cover_max_bytes": 10 * 1024 * 1024,
+    "content_formats": ("png", "jpeg"),               # uploadimg（正文图片）只支持 jpg/png
+    "content_max_bytes": 1024 * 1024,
+    "max_content_chars": 20000,                       # 草稿正文
+    "max_content_bytes": 1024 * 1024,
+    "max_title_chars": 64,
+    "max_draft_articles": 8,                          # 一个草稿最多几篇文章
+}
+
+# 封面推荐比例 2.35:1（900x383），偏差超过这个范围给出警告
+COVER_RATIO = 2.35
+COVER_RATIO_TOLERANCE = 0.35
+
+# 估算正文长度时，用来代替上传后微信图片地址的占位 URL（与真实地址长度相近）
+SAMPLE_WECHAT_URL = "http://mmbiz.qpic.cn/mmbiz_png/" + "x" * 96 + "/0?wx_fmt=png"
+# 估算正文长度、规划拆分时代替作者的占位（页脚中显示作者，按较长的作者名估算）
+SAMPLE_AUTHOR = "x" * 32
+
+IMAGE_PATTERN = r'!\[([^\]]*)\]\(([^)]+)\)'
+
+
+def image_info(path) -> tuple:
+    """
+    从文件头读取图片格式和尺寸
+
+    Returns:
+        (格式, 宽, 高)，无法识别时格式为 ""，尺寸为 0
+    """
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', head[16:24])
+            return "png", width, height
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            width, height = struct.unpack('<HH', head[6:10])
+            return "gif", width, height
+        if head[:2] == b'BM' and len(head) >= 26:
+            width, height = struct.unpack('<ii', head[18:26])
+            return "bmp", width, abs(height)
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return "webp", 0, 0
+        if head[:2] == b'\xff\xd8':
+            return ("jpeg",) + _jpeg_size(f)
+    return "", 0, 0
+
+
+def _jpeg_size(f) -> tuple:
+    """按段扫描 JPEG，找到 SOF 段读取尺寸"""
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return 0, 0
+        code = marker[1]
+        if code == 0xFF:
+            # 填充字节
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return 0, 0
+        length = struct.unpack('>H', length_bytes)[0]
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                return 0, 0
+            height, width = struct.unpack('>HH', data[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _check_image(item: dict) -> dict:
+    """检查单张图片，问题写入 item["problems"]"""
+    path = item["path"]
+    problems = item["problems"] = []
+    try:
+        item["bytes"] = os.path.getsize(path)
+        item["format"], item["width"], item["height"] = image_info(path)
+    except FileNotFoundError:
+        problems.append("文件不存在")
+        return item
+    except OSError as e:
+        problems.append(f"无法读取 - {e}")
+        return item
+
+    if item["role"] == "cover":
+        formats, max_bytes = WECHAT_LIMITS["cover_formats"], WECHAT_LIMITS["cover_max_bytes"]
+    else:
+        formats, max_bytes = WECHAT_LIMITS["content_formats"], WECHAT_LIMITS["content_max_bytes"]
+
+    if not item["format"]:
+        problems.append("无法识别的图片格式（文件可能已损坏）")
+    elif item["format"] not in formats:
+        problems.append(f"格式 {item['format']} 不受支持（仅支持 {'/'.join(formats)}）")
+    elif not item["width"] or not item["height"]:
+        problems.append("无法读取图片尺寸（文件可能已损坏）")
+    if item["bytes"] > max_bytes:
+        problems.append(f"大小 {item['bytes'] / 1024 / 1024:.2f}MB 超过上限 {max_bytes // 1024 // 1024}MB")
+    return item
+
+
+def preflight(article_dir, split: bool = True) -> dict:
+    """
+    发布前预检
+
+    Args:
+        article_dir: 文章目录路径
+        split: 正文超出草稿上限时是否规划拆分（False 时直接报错）
+
+    Returns:
+        {"ok", "title", "errors", "warnings", "images": [...], "html_chars", "html_bytes", "plan", "elapsed_ms"}
+        images 中每项为 {"key", "path", "role"(cover/title/content), "format", "width", "height", "bytes", "problems"}
+        plan 为拆分方案 [[起始块, 结束块], ...]（见 RenderEngine.plan_parts），不需要拆分时为空列表
+    """
+    start = time.perf_counter()
+    article_dir = Path(article_dir).resolve()
+    report = {"ok": False, "title": "", "errors": [], "warnings": [], "images": [],
+              "html_chars": 0, "html_bytes": 0, "plan": [], "elapsed_ms": 0.0}
+    errors, warnings = report["errors"], report["warnings"]
+
+    parser = ArticleParser(article_dir)
+    try:
+        parser.parse()
+    except Exception as e:
+        errors.append(f"解析文章失败 - {e}")
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return report
+    content = parser.get_content()
+
+    report["title"] = parser.title
+    if not parser.title:
+        errors.append("未找到文章标题（【文章标题】）")
+    elif len(parser.title) > WECHAT_LIMITS["max_title_chars"]:
+        errors.append(f"标题 {len(parser.title)} 字，超过上限 {WECHAT_LIMITS['max_title_chars']} 字")
+
+    # 收集需要检查的图片
+    images = []
+    cover_path = parser.get_cover_path()
+    if not cover_path:
+        errors.append("封面图片不存在（assets/cover.png）")
+    elif cover_path.startswith('http'):
+        errors.append(f"封面必须是本地图片: {cover_path}")
+    else:
+        images.append({"key": os.path.relpath(cover_path, article_dir), "path": cover_path, "role": "cover"})
+
+    assets = AssetIndex(article_dir / "assets")
+    title_nums = parser.title_numbers()
+    resolved = assets.resolve_titles(title_nums)
+    for num in title_nums:
+        # 没有对应图片时按 N.png 检查，报告为缺少文件
+        name = resolved.get(num, f"{num}.png")
+        images.append({"key": f"assets/{name}", "path": str(assets.path(name)), "role": "title"})
+
+    seen = {item["key"] for item in images}
+    for alt, img_path in re.findall(IMAGE_PATTERN, content):
+        if img_path.startswith('http'):
+            warnings.append(f"外链图片不会上传到微信，可能无法显示: {img_path}")
+            continue
+        if img_path not in seen:
+            seen.add(img_path)
+            images.append({"key": img_path, "path": str(article_dir / img_path), "role": "content"})
+
+    # 并行读取文件头
+    if len(images) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(8, len(images))) as pool:
+            report["images"] = list(pool.map(_check_image, images))
+    else:
+        report["images"] = [_check_image(item) for item in images]
+
+    labels = {"cover": "封面", "title": "标题图片", "content": "正文图片"}
+    for item in report["images"]:
+        for problem in item["problems"]:
+            if item["role"] == "title" and problem == "文件不存在":
+                errors.append(f"【标题{Path(item['key']).stem}】缺少对应的 {item['key']}（或 .jpg）")
+            else:
+                errors.append(f"{labels[item['role']]} {item['key']}: {problem}")
+        if item["role"] == "cover" and not item["problems"]:
+            ratio = item["width"] / item["height"]
+            if abs(ratio - COVER_RATIO) > COVER_RATIO_TOLERANCE:
+                warnings.append(f"封面比例 {item['width']}x{item['height']}（{ratio:.2f}:1）与推荐的 "
+                                f"900x383（{COVER_RATIO}:1）相差较大，可能被裁剪")
+
+    # 渲染后的正文长度（图片地址按上传后的微信地址长度估算）
+    render_content = content
+    for item in report["images"]:
+        if item["role"] == "content":
+            render_content = render_content.replace(f"]({item['key']})", f"]({SAMPLE_WECHAT_URL})")
+    engine = RenderEngine()
+    sample_titles = {num: SAMPLE_WECHAT_URL for num in title_nums}
+    html = engine.render(render_content, sample_titles, SAMPLE_AUTHOR)
+    report["html_chars"] = len(html)
+    report["html_bytes"] = len(html.encode('utf-8'))
+    too_long = []
+    if report["html_chars"] > WECHAT_LIMITS["max_content_chars"]:
+        too_long.append(f"渲染后的正文 {report['html_chars']} 字符，超过草稿上限 {WECHAT_LIMITS['max_content_chars']} 字符")
+    if report["html_bytes"] > WECHAT_LIMITS["max_content_bytes"]:
+        too_long.append(f"渲染后的正文 {report['html_bytes'] / 1024:.0f}KB，超过草稿上限 "
+                        f"{WECHAT_LIMITS['max_content_bytes'] // 1024}KB")
+    if too_long and split:
+        # 在上传任何图片之前确定拆分方案
+        try:
+            plan = engine.plan_parts(render_content, sample_titles, SAMPLE_AUTHOR,
+                                     WECHAT_LIMITS["max_content_chars"], WECHAT_LIMITS["max_content_bytes"],
+                                     WECHAT_LIMITS["max_draft_articles"])
+            report["plan"] = [list(item) for item in plan]
+            warnings.append(f"{too_long[0]}，将按【标题N】拆分为 {len(plan)} 篇，保存在同一个草稿中")
+        except ValueError as e:
+            errors.append(f"{too_long[0]}，且无法拆分: {e}")
+    else:
+        errors.extend(too_long)
+
+    report["ok"] = not errors
+    report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return report
+
+
+def format_report(report: dict) -> str:
+    """把预检结果整理成可读文本"""
+    lines = [f"预检{'通过' if report['ok'] else '未通过'}（{report['elapsed_ms']:.1f} ms）: {report['title'] or '无标题'}"]
+    lines.append(f"  图片 {len(report['images'])} 张，渲染后正文 {report['html_chars']} 字符"
+                 + (f"，拆分为 {len(report['plan'])} 篇" if report["plan"] else ""))
+    lines += [f"  错误: {e}" for e in report["errors"]]
+    lines += [f"  警告: {w}" for w in report["warnings"]]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    if as_json:
+        args.remove("--json")
+    if len(args) != 1:
+        print("用法: python preflight.py <文章目录路径> [--json]")
+        print("示例: python preflight.py ./artical/artical1")
+        sys.exit(1)
+
+    result = preflight(args[0])
+    print(json.dumps(result, ensure_ascii=False, indent=2) if as_json else format_report(result))
+    sys.exit(0 if result["ok"] else 1)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章预览监听脚本
+
+监听文章目录（artical.md 和 assets/），文件变化后去抖并只重新渲染受影响的部分，
+原子写入 preview.html 并输出重建耗时。Linux 下使用 inotify，其他系统轮询文件修改时间。
+
+用法：
+    python preview_watcher.py <文章目录路径>
+    python wechat_publisher.py <文章目录路径> --watch
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+
+from render_engine import title_image_number
+
+# 去抖时间：最后一次事件后安静这么久才开始重建
+DEBOUNCE_SECONDS = 0.03
+# 轮询模式下的扫描间隔
+POLL_INTERVAL = 0.05
+
+# inotify 事件掩码
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+
+def watch_article(publisher) -> None:
+    """
+    监听文章目录，实时更新 preview.html
+
+    Args:
+        publisher: WechatPublisher 实例（只使用其本地渲染能力，不调用微信接口）
+    """
+    article_dir = publisher.article_dir
+    if not article_dir.is_dir():
+        print(f"错误: 目录不存在 - {article_dir}")
+        return
+
+    start = time.perf_counter()
+    try:
+        preview_path = publisher.render_preview()
+    except Exception as e:
+        print(f"错误: 渲染预览失败 - {e}")
+    else:
+        print(f"已生成预览: {preview_path} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    source = _InotifySource(article_dir) if _InotifySource.available() else _PollingSource(article_dir)
+    print(f"监听中（{source.name}）: {article_dir}，按 Ctrl+C 退出")
+
+    try:
+        while True:
+            changed = source.wait(None)
+            first_event = time.perf_counter()
+
+            # 去抖：持续收集事件，直到安静 DEBOUNCE_SECONDS
+            while True:
+                more = source.wait(DEBOUNCE_SECONDS)
+                if not more:
+                    break
+                changed |= more
+
+            changed = {name for name in changed if _is_relevant(name)}
+            if not changed:
+                continue
+
+            md_changed = "artical.md" in changed
+            title_changed = any(title_image_number(Path(name).name) for name in changed)
+            if not md_changed and not title_changed:
+                # 正文图片以相对路径引用，内容替换后刷新浏览器即可，HTML 无需重建
+                print(f"变化: {', '.join(sorted(changed))}，HTML 无需重建")
+                continue
+
+            render_start = time.perf_counter()
+            try:
+                publisher.render_preview(reparse=md_changed)
+            except Exception as e:
+                print(f"错误: 渲染预览失败 - {e}")
+                continue
+            done = time.perf_counter()
+            print(
+                f"已更新预览: {', '.join(sorted(changed))} -> 渲染 {(done - render_start) * 1000:.1f} ms，"
+                f"总延迟 {(done - first_event) * 1000:.1f} ms"
+            )
+    except KeyboardInterrupt:
+        print("\n已停止监听")
+    finally:
+        source.close()
+
+
+def _is_relevant(name: str) -> bool:
+    """只关心 artical.md 和 assets/ 下的文件，忽略预览文件、状态文件等自身输出"""
+    path = Path(name)
+    if path.name.startswith('.') or path.name.startswith('preview.html'):
+        return False
+    return name == "artical.md" or (path.parts and path.parts[0] == "assets" and len(path.parts) == 2)
+
+
+class _InotifySource:
+    """基于 inotify 的事件源（Linux）"""
+
+    name = "inotify"
+
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith('linux'):
+            return False
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            return False
+        return hasattr(ctypes.CDLL(libc_name), 'inotify_init1')
+
+    def __init__(self, article_dir: Path):
+        self.article_dir = article_dir
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._watches = {}  # {wd: 相对目录}
+        self._add_watch(article_dir, "")
+        if (article_dir / "assets").is_dir():
+            self._add_watch(article_dir / "assets", "assets")
+
+    def _add_watch(self, path: Path, rel: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), _WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = rel
+
+    def wait(self, timeout):
+        """等待事件，返回变化文件的相对路径集合（超时返回空集合）"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        buf = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset + 16 <= len(buf):
+            wd, mask, _cookie, length = struct.unpack_from('iIII', buf, offset)
+            raw_name = buf[offset + 16:offset + 16 + length].rstrip(b'\0')
+            offset += 16 + length
+
+            rel_dir = self._watches.get(wd)
+            if rel_dir is None or not raw_name:
+                continue
+            name = os.fsdecode(raw_name)
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+
+            # assets 目录在监听开始后才创建
+            if mask & _IN_ISDIR:
+                if rel == "assets" and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self._add_watch(self.article_dir / "assets", "assets")
+                continue
+            changed.add(rel)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingSource:
+    """轮询文件修改时间的事件源（inotify 不可用时的降级方案）"""
+
+    name = "轮询"
+
+    def __init__(self, article_dir: Path):
+        self.article_dir = article_dir
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        for rel_dir in ("", "assets"):
+            directory = self.article_dir / rel_dir if rel_dir else self.article_dir
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_file():
+                            st = entry.stat()
+                            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                            snapshot[rel] = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                continue
+        return snapshot
+
+    def wait(self, timeout):
+        """轮询直到发现变化或超时，返回变化文件的相对路径集合"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            current = self._scan()
+            changed = {
+                name for name in current.keys() | self._snapshot.keys()
+                if current.get(name) != self._snapshot.get(name)
+            }
+            self._snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.perf_counter() >= deadline:
+                return set()
+            time.sleep(POLL_INTERVAL if deadline is None else min(POLL_INTERVAL, max(deadline - time.perf_counter(), 0)))
+
+    def close(self):
+        pass
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("用法: python preview_watcher.py <文章目录路径>")
+        print("示例: python preview_watcher.py ./artical/artical1")
+        sys.exit(1)
+
+    from wechat_publisher import WechatPublisher
+    watch_article(WechatPublisher(sys.argv[1]))
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微信接口日调用额度统计与发布调度
+
+微信对 access_token、uploadimg、add_material、draft/add 等接口都有每日调用次数上限（北京时间 0 点清零），
+批量发布时用完就会返回 45009。这里：
+    QuotaTracker   按 (接口根地址, appid, 接口) 统计当天的调用次数，发布脚本每次调用接口都会记录；
+                   也可以用 openapi/quota/get 查询微信端的实际用量进行校准
+    plan / run     估算每篇文章需要的调用次数，按优先级从高到低装入剩余额度，
+                   放不下的推迟到下一个额度周期（下次执行时自动排在前面）
+
+状态保存在 SQLite 数据库中（默认 scripts/.quota.db），跨进程共享。
+只调度默认公众号（config.json 中的 WECHAT_APPID）。
+
+用法：
+    python quota_scheduler.py status [--sync] [--json]
+    python quota_scheduler.py plan <文章目录>... [--priority 目录=N] [--sync] [--json]
+    python quota_scheduler.py run <文章目录>... [--priority 目录=N] [--sync] [--json]
+    python quota_scheduler.py reset
+
+示例：
+    python catalog.py list ./artical --dirty --paths | xargs python quota_scheduler.py run --priority ./artical/重点文章=10
+"""
+
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+DEFAULT_DB_PATH = Path(__file__).parent / ".quota.db"
+
+# 统计的接口（名称与 wechat_publisher.build_wechat_api 一致）及默认日调用上限，
+# 实际上限以公众号后台“接口权限”页为准，可在 config.json 的 WECHAT_DAILY_QUOTAS 中覆盖
+DEFAULT_DAILY_QUOTAS = {
+    "token": 2000,
+    "upload_material": 5000,
+    "upload_img": 5000,
+    "add_draft": 1000,
+    "update_draft": 1000,
+}
+
+# 调用次数超过上限时微信返回的错误码
+QUOTA_EXCEEDED_ERRCODE = 45009
+
+# 额度在北京时间 0 点清零
+QUOTA_TIMEZONE = timezone(timedelta(hours=8))
+
+
+def quota_window(now: float = None) -> str:
+    """当前额度周期（北京时间日期）"""
+    return datetime.fromtimestamp(time.time() if now is None else now, QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+
+def seconds_until_reset(now: float = None) -> float:
+    """距离下次额度清零的秒数"""
+    current = datetime.fromtimestamp(time.time() if now is None else now, QUOTA_TIMEZONE)
+    tomorrow = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - current).total_seconds()
+
+
+class QuotaTracker:
+    """跨进程共享的接口调用次数统计，以及被推迟的发布任务"""
+
+    def __init__(self, base_url: str, limits: dict = None, db_path=DEFAULT_DB_PATH):
+        """
+        Args:
+            base_url: 微信 API 根地址（模拟服务器的调用不计入真实微信的额度）
+            limits: {接口: 日调用上限}，未指定的接口使用 DEFAULT_DAILY_QUOTAS
+            db_path: 状态数据库路径
+        """
+        self.base_url = base_url.rstrip('/')
+        self.limits = {**DEFAULT_DAILY_QUOTAS, **(limits or {})}
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程复用一个连接：每次接口调用都要写一次，反复打开关闭连接比写入本身慢得多"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # WAL + NORMAL 避免每次提交都刷盘
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            "base_url TEXT, appid TEXT, api TEXT, window TEXT, used INTEGER, daily_limit INTEGER, "
+            "exhausted INTEGER, updated_at REAL, PRIMARY KEY (base_url, appid, api, window))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS deferred ("
+            "base_url TEXT, appid TEXT, dir TEXT, priority INTEGER, reason TEXT, deferred_at REAL, "
+            "PRIMARY KEY (base_url, appid, dir))"
+        )
+
+    def _transaction(self, fn):
+        """在写锁事务中执行 fn(conn)，保证多进程读改写的原子性"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _upsert(self, appid: str, api: str, used_sql: str, params: tuple, exhausted: int = 0,
+                daily_limit: int = None):
+        window = quota_window()
+
+        def fn(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO usage (base_url, appid, api, window, used, daily_limit, exhausted, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, NULL, 0, 0)",
+                (self.base_url, appid, api, window),
+            )
+            conn.execute(
+                f"UPDATE usage SET used = {used_sql}, exhausted = MAX(exhausted, ?), "
+                "daily_limit = COALESCE(?, daily_limit), updated_at = ? "
+                "WHERE base_url = ? AND appid = ? AND api = ? AND window = ?",
+                params + (exhausted, daily_limit, time.time(), self.base_url, appid, api, window),
+            )
+
+        self._transaction(fn)
+
+    # ========== 记录 ==========
+
+    def record(self, appid: str, api: str, count: int = 1):
+        """记录 count 次调用"""
+        self._upsert(appid, api, "used + ?", (count,))
+
+    def mark_exhausted(self, appid: str, api: str):
+        """接口返回 45009：本周期内该接口额度已用完"""
+        self._upsert(appid, api, "used + ?", (1,), exhausted=1)
+
+    def sync(self, appid: str, api: str, used: int, daily_limit: int = None):
+        """用微信端查询到的用量校准（取本地记录和微信端的较大值）"""
+        self._upsert(appid, api, "MAX(used, ?)", (int(used),), daily_limit=daily_limit or None)
+
+    # ========== 查询 ==========
+
+    def remaining(self, appid: str) -> dict:
+        """
+        本周期各接口的剩余额度
+
+        Returns:
+            {接口: {"limit", "used", "remaining"}}
+        """
+        rows = {row["api"]: row for row in self._connect().execute(
+            "SELECT api, used, daily_limit, exhausted FROM usage WHERE base_url = ? AND appid = ? AND window = ?",
+            (self.base_url, appid, quota_window()),
+        )}
+        result = {}
+        for api in self.limits:
+            row = rows.get(api)
+            limit = (row["daily_limit"] if row and row["daily_limit"] else None) or self.limits[api]
+            used = row["used"] if row else 0
+            left = 0 if row and row["exhausted"] else max(limit - used, 0)
+            result[api] = {"limit": limit, "used": used, "remaining": left}
+        return result
+
+    # ========== 推迟的任务 ==========
+
+    def defer(self, appid: str, jobs: list):
+        """记录推迟的任务 [{"dir", "priority", "reason"}]，下次调度时自动加入"""
+        def fn(conn):
+            for job in jobs:
+                conn.execute(
+                    "INSERT OR REPLACE INTO deferred (base_url, appid, dir, priority, reason, deferred_at) "
+                    "VALUES (?, ?, ?, ?, ?, COALESCE((SELECT deferred_at FROM deferred "
+                    "WHERE base_url = ? AND appid = ? AND dir = ?), ?))",
+                    (self.base_url, appid, job["dir"], job["priority"], job.get("reason", ""),
+                     self.base_url, appid, job["dir"], time.time()),
+                )
+
+        self._transaction(fn)
+
+    def pending(self, appid: str) -> list:
+        """之前被推迟、尚未发布的任务（先推迟的在前）"""
+        return [dict(row) for row in self._connect().execute(
+            "SELECT dir, priority, reason, deferred_at FROM deferred WHERE base_url = ? AND appid = ? "
+            "ORDER BY deferred_at", (self.base_url, appid),
+        )]
+
+    def clear_pending(self, appid: str, dirs: list):
+        self._transaction(lambda conn: conn.executemany(
+            "DELETE FROM deferred WHERE base_url = ? AND appid = ? AND dir = ?",
+            [(self.base_url, appid, d) for d in dirs],
+        ))
+
+    def reset(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM usage WHERE base_url = ?", (self.base_url,))
+        conn.execute("DELETE FROM deferred WHERE base_url = ?", (self.base_url,))
+
+
+# ============== 调度 ==============
+
+def estimate_calls(article_dir) -> dict:
+    """
+    估算发布一篇文章需要的接口调用次数（上限估计，不调用任何接口）
+
+    断点状态或素材库中已有的封面、图片不计入；新建草稿计 1 次，更新草稿按拆分后的篇数计
+    （每篇一次 draft/update，篇数取预检给出的拆分方案）。access_token 整批共用，不计入单篇文章。
+    """
+    from wechat_publisher import WechatPublisher, _file_hash, _get_config, preflight
+
+    publisher = WechatPublisher(article_dir)
+    publisher.parser.parse()
+    calls = {"upload_material": 0, "upload_img": 0, "add_draft": 0, "update_draft": 0}
+
+    cover_path = publisher.parser.get_cover_path()
+    if cover_path and not publisher.state.get_thumb(_file_hash(cover_path)):
+        calls["upload_material"] = 1
+    for key, image_path in publisher._render_template()["images"].items():
+        file_hash = _file_hash(image_path)
+        if publisher.state.get_image_url(key, file_hash):
+            continue
+        if publisher.library and publisher.library.lookup_url(publisher.api_base_url, publisher.appid, file_hash):
+            continue
+        calls["upload_img"] += 1
+    parts = len(preflight(publisher.article_dir, _get_config()["split_long_article"])["plan"]) or 1
+    draft = publisher.state.get_draft()
+    if draft.get("media_id") and draft.get("parts", 1) == parts:
+        calls["update_draft"] = parts
+    else:
+        calls["add_draft"] = 1
+    return calls
+
+
+def plan(jobs: list, remaining: dict) -> tuple:
+    """
+    按优先级从高到低把任务装入剩余额度
+
+    放不下的任务推迟，但不会挡住后面调用次数更少、放得下的任务。
+
+    Args:
+        jobs: [{"dir", "priority", "calls": {接口: 次数}}]，优先级相同时保持原顺序
+        remaining: QuotaTracker.remaining() 的结果
+
+    Returns:
+        (计划执行的任务, 推迟的任务)，推迟的任务带有 "reason"
+    """
+    budget = {api: info["remaining"] for api, info in remaining.items()}
+    # 整批任务需要先获取一次 access_token
+    budget["token"] = budget.get("token", 0) - 1
+    scheduled, deferred = [], []
+    for job in sorted(jobs, key=lambda j: -j["priority"]):
+        if budget["token"] < 0:
+            deferred.append({**job, "reason": "token 额度不足"})
+            continue
+        short = [f"{api} 额度不足（需要 {n}，剩余 {budget.get(api, 0)}）"
+                 for api, n in job["calls"].items() if n > budget.get(api, 0)]
+        if short:
+            deferred.append({**job, "reason": "；".join(short)})
+            continue
+        for api, n in job["calls"].items():
+            budget[api] -= n
+        scheduled.append(job)
+    return scheduled, deferred
+
+
+class PublishScheduler:
+    """按剩余额度调度默认公众号的发布任务"""
+
+    def __init__(self, tracker: QuotaTracker = None):
+        from wechat_publisher import _default_account, _get_quota_tracker
+
+        self.appid = _default_account()["appid"]
+        self.tracker = tracker or _get_quota_tracker()
+
+    def collect(self, dirs: list, priorities: dict = None) -> tuple:
+        """
+        整理任务：之前推迟的任务在前，再加上本次指定的文章目录，并估算调用次数
+
+        Returns:
+            (任务列表, 无法估算的任务 [{"dir", "error"}])
+        """
+        priorities = priorities or {}
+        jobs = {}
+        for item in self.tracker.pending(self.appid):
+            jobs[item["dir"]] = {"dir": item["dir"], "priority": item["priority"], "deferred": True}
+        for d in dirs:
+            key = str(Path(d).resolve())
+            priority = priorities.get(key, jobs.get(key, {}).get("priority", 0))
+            jobs[key] = {"dir": key, "priority": priority, "deferred": key in jobs}
+
+        result, errors = [], []
+        for job in jobs.values():
+            try:
+                job["calls"] = estimate_calls(job["dir"])
+            except Exception as e:
+                errors.append({"dir": job["dir"], "error": f"错误: 估算调用次数失败 - {str(e)}"})
+                continue
+            result.append(job)
+        return result, errors
+
+    def sync(self, article_dir):
+        """用 openapi/quota/get 查询微信端的实际用量"""
+        from wechat_publisher import WechatPublisher
+
+        publisher = WechatPublisher(article_dir)
+        if not publisher._get_token():
+            return "错误: 获取 access_token 失败"
+        for api in self.tracker.limits:
+            quota = publisher.query_quota(api)
+            if quota:
+                self.tracker.sync(self.appid, api, quota.get("used", 0), quota.get("daily_limit"))
+        return ""
+
+    def plan(self, dirs: list, priorities: dict = None) -> dict:
+        """只生成计划，不发布"""
+        jobs, errors = self.collect(dirs, priorities)
+        remaining = self.tracker.remaining(self.appid)
+        scheduled, deferred = plan(jobs, remaining)
+        return self._report(remaining, scheduled, deferred, errors)
+
+    def run(self, dirs: list, priorities: dict = None) -> dict:
+        """
+        按计划依次发布；推迟的任务记录下来，下个额度周期再执行
+
+        每篇发布前用最新的剩余额度重新确认（估算可能偏少，其他进程也可能在消耗额度），
+        遇到 45009 立即停止，其余任务全部推迟。
+        """
+        from wechat_publisher import publish_article
+
+        jobs, errors = self.collect(dirs, priorities)
+        scheduled, deferred = plan(jobs, self.tracker.remaining(self.appid))
+        results = {}
+        for index, job in enumerate(scheduled):
+            fits, late = plan([job], self.tracker.remaining(self.appid))
+            if late:
+                deferred += late + [{**j, "reason": "额度不足，随前一篇一起推迟"} for j in scheduled[index + 1:]]
+                break
+            result = publish_article(job["dir"])
+            results[job["dir"]] = result
+            if result.startswith("错误") and str(QUOTA_EXCEEDED_ERRCODE) in result:
+                deferred += [{**job, "reason": "接口返回 45009"}] + \
+                            [{**j, "reason": "额度已用完"} for j in scheduled[index + 1:]]
+                break
+
+        # 已执行过的任务（无论成败）移出待发布列表，因额度失败的会在下面重新推迟
+        self.tracker.clear_pending(self.appid, list(results))
+        self.tracker.defer(self.appid, deferred)
+        report = self._report(self.tracker.remaining(self.appid),
+                              [j for j in scheduled if j["dir"] in results], deferred, errors)
+        report["results"] = results
+        return report
+
+    def _report(self, remaining: dict, scheduled: list, deferred: list, errors: list) -> dict:
+        return {
+            "appid": self.appid,
+            "window": quota_window(),
+            "reset_in_hours": round(seconds_until_reset() / 3600, 1),
+            "remaining": remaining,
+            "scheduled": scheduled,
+            "deferred": deferred,
+            "errors": errors,
+        }
+
+
+def format_report(report: dict) -> str:
+    """把调度结果整理成可读文本"""
+    lines = [f"接口日调用额度（{report['window']}，{report['reset_in_hours']} 小时后清零）:"]
+    for api, info in report["remaining"].items():
+        lines.append(f"  {api:<16} 已用 {info['used']:>5}/{info['limit']:<6} 剩余 {info['remaining']}")
+    if "scheduled" in report:
+        results = report.get("results", {})
+        lines.append(f"{'已发布' if 'results' in report else '计划发布'} {len(report['scheduled'])} 篇，"
+                     f"推迟 {len(report['deferred'])} 篇")
+        for job in report["scheduled"]:
+            calls = "，".join(f"{api} {n}" for api, n in job["calls"].items() if n)
+            result = f"  → {results[job['dir']]}" if job["dir"] in results else ""
+            lines.append(f"  [优先级 {job['priority']}] {job['dir']}  预计调用: {calls}{result}")
+        for job in report["deferred"]:
+            lines.append(f"  推迟 [优先级 {job['priority']}] {job['dir']}: {job['reason']}")
+        for job in report["errors"]:
+            lines.append(f"  {job['dir']}: {job['error']}")
+    return "\n".join(lines)
+
+
+def _parse_priorities(items: list) -> dict:
+    priorities = {}
+    for item in items:
+        path, _, value = item.rpartition("=")
+        if not path:
+            raise ValueError(f"优先级格式应为 目录=数字: {item}")
+        priorities[str(Path(path).resolve())] = int(value)
+    return priorities
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="微信接口日调用额度统计与发布调度")
+    parser.add_argument("command", choices=("status", "plan", "run", "reset"))
+    parser.add_argument("dirs", nargs="*", help="文章目录，列在前面的优先级相同时先发布")
+    parser.add_argument("--priority", action="append", default=[], help="目录=N，数字越大越先发布（默认 0）")
+    parser.add_argument("--sync", action="store_true", help="先用 openapi/quota/get 查询微信端的实际用量")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        scheduler = PublishScheduler()
+        priorities = _parse_priorities(args.priority)
+    except Exception as e:
+        print(f"错误: {e}")
+        return 1
+
+    if args.command == "reset":
+        scheduler.tracker.reset()
+        print("已清空调用统计和推迟的任务")
+        return 0
+    if args.sync:
+        sync_dir = (args.dirs or [item["dir"] for item in scheduler.tracker.pending(scheduler.appid)] or ["."])[0]
+        error = scheduler.sync(sync_dir)
+        if error:
+            print(error)
+            return 1
+
+    if args.command == "status":
+        report = {"appid": scheduler.appid, "window": quota_window(),
+                  "reset_in_hours": round(seconds_until_reset() / 3600, 1),
+                  "remaining": scheduler.tracker.remaining(scheduler.appid),
+                  "pending": scheduler.tracker.pending(scheduler.appid)}
+        if args.json:
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            print(format_report(report))
+            for item in report["pending"]:
+                print(f"  待发布 [优先级 {item['priority']}] {item['dir']}: {item['reason']}")
+        return 0
+
+    report = (scheduler.run if args.command == "run" else scheduler.plan)(args.dirs, priorities)
+    print(json.dumps(report, ensure_ascii=False, indent=2) if args.json else format_report(report))
+    failed = any(r.startswith("错误") for r in report.get("results", {}).values())
+    return 1 if failed or report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生图接口限流与熔断
+
+按 (接口根地址, 模型) 维护：
+    令牌桶    每分钟请求数（RPM）上限，多个进程同时生成封面时共享额度
+    熔断器    窗口期内失败 N 次后熔断，直接跳到备用模型；冷却后半开放行一次试探请求
+
+状态保存在 SQLite 数据库中（默认 scripts/.rate_limit.db），跨进程共享。
+
+用法：
+    python rate_limiter.py            # 查看当前令牌桶和熔断状态
+    python rate_limiter.py --reset    # 清空全部状态
+"""
+
+import sys
+import json
+import time
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+
+DEFAULT_DB_PATH = Path(__file__).parent / ".rate_limit.db"
+
+# 熔断器状态
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def provider_key(base_url: str, model: str) -> str:
+    """限流/熔断的维度：接口根地址 + 模型"""
+    return f"{base_url.rstrip('/')}#{model}"
+
+
+class ProviderLimiter:
+    """跨进程共享的令牌桶 + 熔断器"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, rpm: float = 10, burst: int = 2,
+                 failure_threshold: int = 3, window_seconds: float = 600,
+                 cooldown_seconds: float = 300, trial_timeout: float = 300):
+        """
+        Args:
+            db_path: 状态数据库路径
+            rpm: 每分钟允许的请求数（<=0 表示不限流）
+            burst: 令牌桶容量（允许的瞬时并发请求数）
+            failure_threshold: 窗口期内失败多少次后熔断（<=0 表示不熔断）
+            window_seconds: 失败计数窗口（秒）
+            cooldown_seconds: 熔断后多久进入半开状态（秒）
+            trial_timeout: 半开试探请求超过这么久没有结果，允许再放行一次（秒）
+        """
+        self.db_path = Path(db_path)
+        self.rate = rpm / 60.0
+        self.burst = max(int(burst), 1)
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.trial_timeout = trial_timeout
+        self._init_db()
+
+    @classmethod
+    def from_config(cls, config: dict, db_path=DEFAULT_DB_PATH) -> "ProviderLimiter":
+        """按 config.json 中的 IMAGE_API_* 配置创建"""
+        return cls(
+            db_path=db_path,
+            rpm=float(config.get("IMAGE_API_RPM", 10)),
+            burst=int(config.get("IMAGE_API_BURST", 2)),
+            failure_threshold=int(config.get("IMAGE_API_CIRCUIT_FAILURES", 3)),
+            window_seconds=float(config.get("IMAGE_API_CIRCUIT_WINDOW", 600)),
+            cooldown_seconds=float(config.get("IMAGE_API_CIRCUIT_COOLDOWN", 300)),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated_at REAL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS circuits ("
+                "key TEXT PRIMARY KEY, state TEXT, failures TEXT, opened_at REAL, trial_at REAL)"
+            )
+
+    def _transaction(self, fn):
+        """在写锁事务中执行 fn(conn)，保证多进程读改写的原子性"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # ========== 令牌桶 ==========
+
+    def reserve(self, key: str) -> float:
+        """
+        预约一个令牌
+
+        Returns:
+            调用方需要等待的秒数（0 表示可以立即请求）
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        def fn(conn):
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = float(self.burst) if row is None else min(
+                float(self.burst), row["tokens"] + (now - row["updated_at"]) * self.rate
+            )
+            # 令牌可以透支：透支的部分就是需要排队等待的时间
+            tokens -= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            return max(0.0, -tokens / self.rate)
+
+        return self._transaction(fn)
+
+    # ========== 熔断器 ==========
+
+    def allow(self, key: str) -> bool:
+        """熔断器是否放行本次请求（半开状态只放行一个试探请求）"""
+        if self.failure_threshold <= 0:
+            return True
+
+        def fn(conn):
+            now = time.time()
+            row = conn.execute("SELECT state, opened_at, trial_at FROM circuits WHERE key = ?", (key,)).fetchone()
+            if row is None or row["state"] == CLOSED:
+                return True
+            if row["state"] == OPEN:
+                if now - row["opened_at"] < self.cooldown_seconds:
+                    return False
+            elif row["trial_at"] and now - row["trial_at"] < self.trial_timeout:
+                # 半开状态下已有试探请求在进行
+                return False
+            conn.execute("UPDATE circuits SET state = ?, trial_at = ? WHERE key = ?", (HALF_OPEN, now, key))
+            return True
+
+        return self._transaction(fn)
+
+    def record_success(self, key: str):
+        """请求成功：关闭熔断器并清空失败记录"""
+        if self.failure_threshold <= 0:
+            return
+        self._transaction(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO circuits (key, state, failures, opened_at, trial_at) VALUES (?, ?, '[]', 0, 0)",
+            (key, CLOSED),
+        ))
+
+    def record_failure(self, key: str) -> bool:
+        """
+        请求失败：记录失败，达到阈值或半开试探失败时熔断
+
+        Returns:
+            本次失败后熔断器是否处于熔断状态
+        """
+        if self.failure_threshold <= 0:
+            return False
+
+        def fn(conn):
+            now = time.time()
+            row = conn.execute("SELECT state, failures FROM circuits WHERE key = ?", (key,)).fetchone()
+            failures = json.loads(row["failures"]) if row else []
+            failures = [t for t in failures if now - t < self.window_seconds] + [now]
+            tripped = (row is not None and row["state"] == HALF_OPEN) or len(failures) >= self.failure_threshold
+            conn.execute(
+                "INSERT OR REPLACE INTO circuits (key, state, failures, opened_at, trial_at) VALUES (?, ?, ?, ?, 0)",
+                (key, OPEN if tripped else CLOSED, json.dumps(failures), now if tripped else 0),
+            )
+            return tripped
+
+        return self._transaction(fn)
+
+    # ========== 查看与重置 ==========
+
+    def status(self) -> dict:
+        """返回所有 key 的令牌和熔断状态"""
+        now = time.time()
+        result = {}
+        with closing(self._connect()) as conn:
+            for row in conn.execute("SELECT key, tokens, updated_at FROM buckets"):
+                tokens = min(float(self.burst), row["tokens"] + (now - row["updated_at"]) * self.rate)
+                result.setdefault(row["key"], {})["tokens"] = round(tokens, 2)
+            for row in conn.execute("SELECT key, state, failures, opened_at FROM circuits"):
+                failures = [t for t in json.loads(row["failures"]) if now - t < self.window_seconds]
+                entry = result.setdefault(row["key"], {})
+                entry["circuit"] = row["state"]
+                entry["recent_failures"] = len(failures)
+                if row["state"] == OPEN:
+                    entry["half_open_in"] = round(max(0.0, self.cooldown_seconds - (now - row["opened_at"])), 1)
+        return result
+
+    def reset(self):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM buckets")
+            conn.execute("DELETE FROM circuits")
+
+
+if __name__ == "__main__":
+    config_path = Path(__file__).parent / "config.json"
+    try:
+        config = json.loads(config_path.read_text(encoding="utf-8"))
+    except Exception:
+        config = {}
+    limiter = ProviderLimiter.from_config(config)
+    if len(sys.argv) > 1 and sys.argv[1] == "--reset":
+        limiter.reset()
+        print("已清空限流和熔断状态")
+        sys.exit(0)
+
+    status = limiter.status()
+    if not status:
+        print("暂无记录")
+    for key, entry in sorted(status.items()):
+        print(f"{key}: {json.dumps(entry, ensure_ascii=False)}")
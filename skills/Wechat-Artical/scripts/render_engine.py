@@ -0,0 +1,965 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章渲染引擎（纯函数：Markdown 进，HTML 出）
+
+不依赖网络和 config.json，RenderEngine 可以 pickle，适合在进程池中批量渲染
+（换主题、回归对比、重建历史文章）。wechat_publisher 的预览和发布也使用这里的渲染。
+
+用法：
+    python render_engine.py <文章目录或其上级目录...> [--out 输出目录] [--workers N] [--chunksize K]
+
+示例：
+    python render_engine.py ./artical --out ./rendered --workers 8
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from html import escape
+from pathlib import Path
+
+
+# 样式配置
+STYLE = {
+    "primary_color": "#003399",
+    "text_color": "#333",
+    "light_text": "#3f3f3f",
+    "font_family": "-apple-system, BlinkMacSystemFont, 'Helvetica Neue', 'PingFang SC', 'Hiragino Sans GB', 'Microsoft YaHei UI', 'Microsoft YaHei', Arial, sans-serif",
+    "code_theme": "default",   # 代码高亮主题（pygments 样式名），为空表示不高亮
+}
+
+
+# 估算拆分后每篇导航长度时使用的篇数（导航文字中的数字位数会影响长度）
+PART_NAV_RESERVE = 99
+
+
+# ========== 代码高亮 ==========
+# 微信会去掉 class 属性，所以用 pygments 生成内联样式。pygments 未安装、代码块没有标注语言
+# 或语言无法识别时，按原样转义输出。高亮结果按 (语言, 代码哈希, 主题) 缓存在进程内，
+# 词法分析器只在文章用到对应语言时才加载。
+
+HIGHLIGHT_CACHE_SIZE = 2048
+_highlight_cache = OrderedDict()   # {(语言, 代码 sha1, 主题): (HTML, 背景色, 文字颜色)}
+
+
+@lru_cache(maxsize=None)
+def _lexer(lang: str):
+    """按语言名加载词法分析器，不认识的语言返回 None"""
+    try:
+        from pygments.lexers import get_lexer_by_name
+        from pygments.util import ClassNotFound
+    except ImportError:
+        return None
+    try:
+        # 保留首尾空行，输出与原代码逐字符对应
+        return get_lexer_by_name(lang, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _formatter(theme: str):
+    """内联样式的 HTML 格式化器，主题不存在时返回 None"""
+    from pygments.formatters import HtmlFormatter
+    from pygments.token import Token
+    from pygments.util import ClassNotFound
+
+    try:
+        formatter = HtmlFormatter(noclasses=True, nowrap=True, style=theme)
+    except ClassNotFound:
+        return None
+    color = formatter.style.style_for_token(Token.Text)["color"]
+    return formatter, formatter.style.background_color, f"#{color}" if color else ""
+
+
+def highlight_code(code: str, lang: str, theme: str = STYLE["code_theme"]):
+    """
+    代码高亮
+
+    Returns:
+        (HTML, 背景色, 文字颜色)，不能高亮时返回 None
+    """
+    if not lang or not theme:
+        return None
+    key = (lang, hashlib.sha1(code.encode("utf-8")).hexdigest(), theme)
+    cached = _highlight_cache.get(key)
+    if cached is not None:
+        _highlight_cache.move_to_end(key)
+        return cached
+    lexer = _lexer(lang)
+    formatter = _formatter(theme) if lexer else None
+    if not formatter:
+        return None
+
+    from pygments import highlight
+
+    result = (highlight(code, lexer, formatter[0]), formatter[1], formatter[2])
+    _highlight_cache[key] = result
+    if len(_highlight_cache) > HIGHLIGHT_CACHE_SIZE:
+        _highlight_cache.popitem(last=False)
+    return result
+
+
+# ========== 素材目录 ==========
+
+# 标题图片支持的扩展名（正文图片接口只接受 png/jpg），同一序号有多个文件时按此顺序优先
+TITLE_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def title_image_number(name: str) -> str:
+    """标题图片文件名对应的序号（如 12.png -> "12"，01.jpg -> "1"），不是标题图片时返回空字符串"""
+    stem, ext = os.path.splitext(name)
+    if not (stem.isascii() and stem.isdigit()) or ext.lower() not in TITLE_IMAGE_EXTENSIONS:
+        return ""
+    return str(int(stem))
+
+
+class AssetIndex:
+    """
+    文章 assets 目录的索引
+
+    一次 os.scandir 列出全部文件，之后按文件名、标题序号查找都不再访问文件系统
+    """
+
+    def __init__(self, assets_dir):
+        self.assets_dir = Path(assets_dir)
+        self.files = {}          # {文件名: os.DirEntry}
+        self.title_images = {}   # {标题序号: 文件名}
+        try:
+            with os.scandir(self.assets_dir) as it:
+                for entry in it:
+                    if entry.is_file():
+                        self.files[entry.name] = entry
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+
+        rank = {ext: i for i, ext in enumerate(TITLE_IMAGE_EXTENSIONS)}
+        candidates = sorted((rank[os.path.splitext(name)[1].lower()], name)
+                            for name in self.files if title_image_number(name))
+        for _, name in candidates:
+            self.title_images.setdefault(title_image_number(name), name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.files
+
+    def path(self, name: str) -> Path:
+        return self.assets_dir / name
+
+    def mtime_ns(self, name: str) -> int:
+        return self.files[name].stat().st_mtime_ns
+
+    def resolve_titles(self, numbers) -> dict:
+        """
+        解析文章用到的标题图片
+
+        Args:
+            numbers: 【标题N】中的序号（见 ArticleParser.title_numbers）
+
+        Returns:
+            {标题序号: 文件名}，只包含有对应图片的序号
+        """
+        result = {}
+        for num in numbers:
+            name = self.title_images.get(str(int(num)))
+            if name:
+                result[num] = name
+        return result
+
+
+class ArticleParser:
+    """文章解析器"""
+
+    # 内部标记
+    QUOTE_START = "__QUOTE_START__"
+    QUOTE_END = "__QUOTE_END__"
+    TITLE_IMAGE_PREFIX = "__TITLE_IMAGE_"  # 标题图片标记前缀，如 __TITLE_IMAGE_1__
+
+    def __init__(self, article_dir: str = "."):
+        self.article_dir = Path(article_dir).resolve()
+        self.title = ""
+        self.cover_image = ""
+        self.content_lines = []    # 所有内容（包含引言标记）
+        self._in_quote = False     # 跟踪是否在引言块中
+
+    def parse(self) -> bool:
+        """解析 artical.md 文件"""
+        md_path = self.article_dir / "artical.md"
+        if not md_path.exists():
+            raise FileNotFoundError(f"找不到 artical.md: {md_path}")
+
+        with open(md_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+
+        return self.parse_lines(lines, (self.article_dir / "assets" / "cover.png").exists())
+
+    def parse_lines(self, lines: list, cover_exists: bool = False) -> bool:
+        """
+        解析文章内容（不访问文件系统）
+
+        Args:
+            lines: artical.md 的各行（保留换行符）
+            cover_exists: assets/cover.png 是否存在
+        """
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            stripped = line.strip()
+
+            # 解析【文章标题】行 - 提取标题，整行不保留
+            if stripped.startswith('【文章标题】'):
+                title_part = stripped.replace('【文章标题】', '').strip()
+                # 去掉开头的 # 符号
+                title_part = re.sub(r'^#+\s*', '', title_part)
+                self.title = title_part
+                i += 1
+                continue
+
+            # 解析【封面主图】标记 - 自动使用 assets/cover.png，同时闭合引言
+            if '【封面主图' in stripped and stripped.startswith('【') and '】' in stripped:
+                # 如果在引言块中，先闭合引言
+                if self._in_quote:
+                    self.content_lines.append(self.QUOTE_END + "\n")
+                    self._in_quote = False
+                
+                # 自动设置封面路径为 assets/cover.png
+                if cover_exists:
+                    self.cover_image = "assets/cover.png"
+                else:
+                    # 向后兼容：如果下一行有图片语法，也支持
+                    i += 1
+                    while i < len(lines):
+                        next_line = lines[i].strip()
+                        if next_line:
+                            img_match = re.match(r'!\[([^\]]*)\]\(([^)]+)\)', next_line)
+                            if img_match:
+                                self.cover_image = img_match.group(2)
+                                # 不再把封面图片加入正文
+                            i += 1
+                            break
+                        i += 1
+                    continue
+                
+                i += 1
+                # 跳过下一行如果是图片语法（向后兼容）
+                if i < len(lines):
+                    next_line = lines[i].strip()
+                    if re.match(r'!\[([^\]]*)\]\(([^)]+)\)', next_line):
+                        i += 1
+                continue
+
+            # 解析【引言】标记 - 插入引言开始标记
+            if stripped == '【引言】':
+                self.content_lines.append(self.QUOTE_START + "\n")
+                self._in_quote = True
+                i += 1
+                continue
+
+            # 解析【正文】标记 - 插入引言结束标记
+            if stripped == '【正文】':
+                if self._in_quote:
+                    self.content_lines.append(self.QUOTE_END + "\n")
+                    self._in_quote = False
+                i += 1
+                continue
+
+            # 解析【标题1】【标题2】等标记 - 转换为内部标记，保留下一行标题文字
+            title_match = re.match(r'^【标题(\d+)】$', stripped)
+            if title_match:
+                # 如果在引言块中，先闭合引言
+                if self._in_quote:
+                    self.content_lines.append(self.QUOTE_END + "\n")
+                    self._in_quote = False
+                
+                title_num = title_match.group(1)
+                # 插入内部标记
+                self.content_lines.append(f"{self.TITLE_IMAGE_PREFIX}{title_num}__\n")
+                i += 1
+                # 下一行是标题文字，保留
+                if i < len(lines):
+                    self.content_lines.append(lines[i])
+                    i += 1
+                continue
+
+            # 其他【xxx】标记行 - 不保留
+            if stripped.startswith('【') and '】' in stripped:
+                i += 1
+                continue
+
+            # 普通行 - 保留
+            self.content_lines.append(line)
+            i += 1
+
+        # 解析结束时，如果引言未闭合，自动闭合
+        if self._in_quote:
+            self.content_lines.append(self.QUOTE_END + "\n")
+            self._in_quote = False
+
+        return True
+
+    def get_content(self) -> str:
+        """获取处理后的正文内容"""
+        return ''.join(self.content_lines)
+
+    def title_numbers(self) -> list:
+        """正文中【标题N】的序号（去重，按出现顺序）"""
+        pattern = re.compile(rf'{self.TITLE_IMAGE_PREFIX}(\d+)__')
+        matches = (pattern.fullmatch(line.strip()) for line in self.content_lines
+                   if line.startswith(self.TITLE_IMAGE_PREFIX))
+        return list(dict.fromkeys(m.group(1) for m in matches if m))
+
+    def get_cover_path(self) -> str:
+        """获取封面图片完整路径"""
+        # 优先使用解析到的路径
+        if self.cover_image:
+            if self.cover_image.startswith('http'):
+                return self.cover_image
+            return str(self.article_dir / self.cover_image)
+        
+        # 自动检测 assets/cover.png
+        auto_cover = self.article_dir / "assets" / "cover.png"
+        if auto_cover.exists():
+            return str(auto_cover)
+        
+        return ""
+
+class RenderEngine:
+    """
+    渲染引擎
+
+    只依赖传入的正文、标题图片地址和作者；逐块渲染并缓存结果，
+    同一个实例重复渲染相近的内容（watch 模式）时只重新渲染改动的块。
+    """
+
+    def __init__(self, primary: str = STYLE["primary_color"], code_theme: str = STYLE["code_theme"]):
+        self.primary = primary
+        self.code_theme = code_theme
+        self.title_image_urls = {}
+        self.author = ""
+        self._block_cache = {}      # 块渲染缓存 {块: HTML}
+
+    def render(self, md: str, title_image_urls: dict = None, author: str = "") -> str:
+        """
+        Markdown（ArticleParser 处理后的正文）转 HTML
+
+        Args:
+            md: 正文
+            title_image_urls: 标题图片地址 {标题序号: URL}，缺少的标题降级为普通标题
+            author: 页脚显示的作者
+        """
+        self.title_image_urls = title_image_urls or {}
+        self.author = author
+        return self._render_page(self._render_blocks(self._parse_blocks(md)))
+
+    def plan_parts(self, md: str, title_image_urls: dict = None, author: str = "",
+                   max_chars: int = 0, max_bytes: int = 0, max_parts: int = 0) -> list:
+        """
+        正文超出单篇长度上限时，规划在哪些【标题N】处拆分
+
+        以【标题N】开始的块为一节（第一个标题之前的引言等归入第一篇），按顺序把尽量多的节放进一篇，
+        每篇的长度包含外层容器、导航和页脚。
+
+        Args:
+            max_chars / max_bytes: 单篇渲染后的字符数 / UTF-8 字节数上限，0 表示不限
+            max_parts: 最多拆成几篇，0 表示不限
+
+        Returns:
+            [(起始块序号, 结束块序号)]，不需要拆分时只有一项
+
+        Raises:
+            ValueError: 某一节单独就超出上限，或需要的篇数超过 max_parts
+        """
+        self.title_image_urls = title_image_urls or {}
+        self.author = author
+        blocks = self._parse_blocks(md)
+        htmls = self._render_blocks(blocks)
+
+        def fits(chars, nbytes):
+            return (not max_chars or chars <= max_chars) and (not max_bytes or nbytes <= max_bytes)
+
+        full = self._render_page(htmls)
+        if fits(len(full), len(full.encode('utf-8'))):
+            return [(0, len(blocks))]
+
+        # 每篇固定的开销：容器、页脚、导航（按篇数最多的情况估算），块之间用换行连接
+        frame = self._render_page([], (PART_NAV_RESERVE, PART_NAV_RESERVE))
+        frame_chars, frame_bytes = len(frame), len(frame.encode('utf-8'))
+        sizes = [(len(h) + 1, len(h.encode('utf-8')) + 1) if h else (0, 0) for h in htmls]
+
+        starts = [0] + [i for i, block in enumerate(blocks) if block[0] == 'title_image' and i > 0]
+        sections = list(zip(starts, starts[1:] + [len(blocks)]))
+
+        plan = []
+        part_start, chars, nbytes = 0, frame_chars, frame_bytes
+        for start, end in sections:
+            section_chars = sum(c for c, _ in sizes[start:end])
+            section_bytes = sum(b for _, b in sizes[start:end])
+            if not fits(frame_chars + section_chars, frame_bytes + section_bytes):
+                name = f"【标题{blocks[start][1]}】" if blocks[start][0] == 'title_image' else "开头"
+                raise ValueError(f"{name}一节渲染后 {frame_chars + section_chars} 字符，单独一篇也超出上限")
+            if start > part_start and not fits(chars + section_chars, nbytes + section_bytes):
+                plan.append((part_start, start))
+                part_start, chars, nbytes = start, frame_chars, frame_bytes
+            chars += section_chars
+            nbytes += section_bytes
+        plan.append((part_start, len(blocks)))
+
+        if max_parts and len(plan) > max_parts:
+            raise ValueError(f"需要拆分为 {len(plan)} 篇，超过一个草稿最多 {max_parts} 篇的限制")
+        return plan
+
+    def render_parts(self, md: str, plan: list, title_image_urls: dict = None, author: str = "") -> list:
+        """
+        按 plan_parts 的结果渲染拆分后的各篇，每篇带连载导航和自己的页脚
+
+        Returns:
+            [各篇 HTML]
+        """
+        self.title_image_urls = title_image_urls or {}
+        self.author = author
+        htmls = self._render_blocks(self._parse_blocks(md))
+        return [self._render_page(htmls[start:end], (index, len(plan)))
+                for index, (start, end) in enumerate(plan, start=1)]
+
+    def _render_blocks(self, blocks: list) -> list:
+        """逐块渲染，未变化的块直接复用缓存（watch 模式下只重新渲染改动的块）"""
+        block_cache = {}
+        htmls = []
+        for block in blocks:
+            key = (block, self.title_image_urls.get(block[1])) if block[0] == 'title_image' else block
+            html = self._block_cache.get(key)
+            if html is None:
+                html = self._render_block(block)
+            block_cache[key] = html
+            htmls.append(html)
+        self._block_cache = block_cache
+        return htmls
+
+    def _render_page(self, block_htmls: list, part: tuple = None) -> str:
+        """
+        外层容器 + 各块 + 页脚
+
+        Args:
+            part: 拆分发布时为 (第几篇, 共几篇)，在开头和结尾加上连载导航
+        """
+        html_parts = []
+
+        # 外层容器
+        html_parts.append(f'<section style="font-family: {STYLE["font_family"]}; letter-spacing: 0.5px; text-align: justify; padding: 10px; color: {STYLE["text_color"]};">')
+        if part:
+            html_parts.append(self._render_part_nav(*part, top=True))
+        html_parts.extend(html for html in block_htmls if html)
+        if part:
+            html_parts.append(self._render_part_nav(*part, top=False))
+
+        # 页脚
+        html_parts.append(self._render_footer())
+        html_parts.append('</section>')
+
+        return '\n'.join(html_parts)
+
+    def _parse_blocks(self, md: str) -> list:
+        """
+        把 Markdown 拆分为块结构
+
+        每个块是一个可哈希的元组 (类型, 参数...)，渲染只依赖块本身和标题图片 URL。
+        """
+        blocks = []
+        is_first_heading = True  # 标记是否是第一个标题
+
+        lines = md.split('\n')
+        i = 0
+
+        while i < len(lines):
+            line = lines[i].strip()
+
+            # 跳过空行
+            if not line:
+                i += 1
+                continue
+
+            # 引言块开始标记 - 按普通段落处理引言内容
+            if line == ArticleParser.QUOTE_START:
+                quote_blocks = []
+                i += 1
+                while i < len(lines) and lines[i].strip() != ArticleParser.QUOTE_END:
+                    quote_line = lines[i].strip()
+                    if quote_line:
+                        # 处理图片
+                        img_match = re.match(r'!\[([^\]]*)\]\(([^)]+)\)', quote_line)
+                        if img_match:
+                            alt, src = img_match.groups()
+                            quote_blocks.append(('image', src, alt))
+                        else:
+                            # 普通段落
+                            quote_blocks.append(('paragraph', quote_line))
+                    i += 1
+                i += 1  # 跳过 QUOTE_END
+                blocks.append(('quote', tuple(quote_blocks)))
+                continue
+
+            # 处理【标题X】标记 - 渲染图片+标题文字
+            title_img_match = re.match(r'__TITLE_IMAGE_(\d+)__', line)
+            if title_img_match:
+                title_num = title_img_match.group(1)
+                i += 1
+                # 下一行是标题文字
+                title_text = ""
+                if i < len(lines):
+                    title_text = lines[i].strip()
+                    i += 1
+                blocks.append(('title_image', title_num, title_text))
+                continue
+
+            # 代码块
+            if line.startswith('```'):
+                # ```python 中的语言名用于代码高亮
+                lang = line[3:].strip().split(' ')[0].lower()
+                code_lines = []
+                i += 1
+                while i < len(lines) and not lines[i].strip().startswith('```'):
+                    code_lines.append(lines[i])
+                    i += 1
+                blocks.append(('code', '\n'.join(code_lines), lang))
+                i += 1
+                continue
+
+            # 一级标题
+            if line.startswith('# ') and not line.startswith('## '):
+                blocks.append(('h1', line[2:].strip(), is_first_heading))
+                is_first_heading = False
+                i += 1
+                continue
+
+            # 二级标题
+            if line.startswith('## '):
+                blocks.append(('h2', line[3:].strip()))
+                i += 1
+                continue
+
+            # 三级标题
+            if line.startswith('### '):
+                blocks.append(('h3', line[4:].strip()))
+                i += 1
+                continue
+
+            # 图片
+            img_match = re.match(r'!\[([^\]]*)\]\(([^)]+)\)', line)
+            if img_match:
+                alt, src = img_match.groups()
+                blocks.append(('image', src, alt))
+                i += 1
+                continue
+
+            # 无序列表
+            if line.startswith('- ') or line.startswith('* '):
+                list_items = []
+                while i < len(lines):
+                    l = lines[i].strip()
+                    if l.startswith('- ') or l.startswith('* '):
+                        list_items.append(l[2:])
+                        i += 1
+                    elif l == '':
+                        i += 1
+                        break
+                    else:
+                        break
+                blocks.append(('ul', tuple(list_items)))
+                continue
+
+            # 有序列表
+            if re.match(r'^\d+\. ', line):
+                list_items = []
+                while i < len(lines):
+                    l = lines[i].strip()
+                    if re.match(r'^\d+\. ', l):
+                        list_items.append(re.sub(r'^\d+\. ', '', l))
+                        i += 1
+                    elif l == '':
+                        i += 1
+                        break
+                    else:
+                        break
+                blocks.append(('ol', tuple(list_items)))
+                continue
+
+            # 分隔线
+            if line == '---' or line == '***':
+                blocks.append(('divider',))
+                i += 1
+                continue
+
+            # 普通段落
+            blocks.append(('paragraph', line))
+            i += 1
+
+        return blocks
+
+    def _render_block(self, block: tuple) -> str:
+        """渲染单个块"""
+        kind = block[0]
+        if kind == 'quote':
+            return '\n'.join(self._render_block(sub) for sub in block[1])
+        if kind == 'title_image':
+            return self._render_title_with_image(block[1], block[2])
+        if kind == 'code':
+            return self._render_code(block[1], block[2])
+        if kind == 'h1':
+            return self._render_h1(block[1], block[2])
+        if kind == 'h2':
+            return self._render_h2(block[1])
+        if kind == 'h3':
+            return self._render_h3(block[1])
+        if kind == 'image':
+            return self._render_image(block[1], block[2])
+        if kind == 'ul':
+            return self._render_ul(block[1])
+        if kind == 'ol':
+            return self._render_ol(block[1])
+        if kind == 'divider':
+            return self._render_divider()
+        return self._render_paragraph(block[1])
+
+    # ========== 样式渲染方法 ==========
+
+    def _render_quote(self, text):
+        return f'''
+<section style="margin: 40px 0px;">
+    <section style="border-top: 2px solid {self.primary}; width: 60px; margin-bottom: 25px;"></section>
+    <section style="display: flex; align-items: flex-start;">
+        <section style="margin-right: 12px;">
+            <span style="font-size: 60px; line-height: 40px; color: {self.primary}; font-family: Georgia, serif;">"</span>
+        </section>
+        <section style="flex: 1; text-align: justify; font-size: 17px; color: {STYLE['light_text']}; line-height: 1.8; letter-spacing: 0.5px;">
+            {text}
+        </section>
+    </section>
+    <section style="display: flex; justify-content: flex-end; margin-top: 15px;">
+        <span style="font-size: 60px; line-height: 20px; color: {self.primary}; font-family: Georgia, serif; height: 30px; display: block;">"</span>
+    </section>
+</section>'''
+
+    def _render_title_with_image(self, title_num: str, title_text: str):
+        """渲染标题图片+标题文字"""
+        # 去掉标题文字开头的 # 号
+        title_text = re.sub(r'^#+\s*', '', title_text.strip())
+
+        # 从预上传的映射中获取微信URL
+        img_url = self.title_image_urls.get(title_num)
+
+        if not img_url:
+            # 如果没有找到URL（图片不存在或上传失败），降级为普通标题渲染
+            return self._render_h1(title_text, False)
+
+        return f'''
+<section style="margin: 45px 0 30px 0;">
+    <section style="text-align: left; margin-bottom: 15px;">
+        <img src="{img_url}" alt="标题{title_num}" style="max-width: 120px; height: auto;"/>
+    </section>
+    <section style="font-size: 24px; font-weight: bold; color: #1a1a1a; letter-spacing: 1px; line-height: 1.6; text-align: left;">
+        {self._process_inline(title_text)}
+    </section>
+</section>'''
+
+    def _render_h1(self, text, is_first=False):
+        # 第一个标题顶部边距小一些
+        margin_top = "20px" if is_first else "45px"
+        return f'''
+<section style="margin: {margin_top} 0 20px 0; display: flex; align-items: center;">
+    <section style="width: 4px; height: 26px; background-color: {self.primary}; margin-right: 12px; flex-shrink: 0;"></section>
+    <section style="font-size: 24px; font-weight: bold; color: #1a1a1a; letter-spacing: 1.5px;">
+        {self._process_inline(text)}
+    </section>
+</section>'''
+
+    def _render_h2(self, text):
+        return f'''
+<section style="margin: 35px 0 15px 0;">
+    <section style="font-size: 17px; font-weight: bold; color: {self.primary}; letter-spacing: 1px;">
+        {self._process_inline(text)}
+    </section>
+</section>'''
+
+    def _render_h3(self, text):
+        return f'''
+<section style="margin: 25px 0 10px 0;">
+    <section style="font-size: 16px; font-weight: bold; color: #1a1a1a; letter-spacing: 0.5px;">
+        {self._process_inline(text)}
+    </section>
+</section>'''
+
+    def _render_image(self, src, alt=""):
+        return f'''
+<section style="text-align: center; margin: 25px 0;">
+    <img src="{src}" alt="{alt}" style="max-width: 100%; border-radius: 5px;"/>
+</section>'''
+
+    def _render_paragraph(self, text):
+        processed = self._process_inline(text)
+        return f'''
+<section style="font-size: 17px; color: {STYLE['text_color']}; line-height: 1.8; margin-bottom: 15px;">
+    <p>{processed}</p>
+</section>'''
+
+    def _render_ul(self, items):
+        li_html = ''.join([
+            f'<li style="margin: 8px 0; line-height: 1.8;">{self._process_inline(item)}</li>'
+            for item in items
+        ])
+        return f'''
+<section style="font-size: 17px; color: {STYLE['text_color']}; line-height: 1.8; margin: 15px 0; padding-left: 20px;">
+    <ul style="margin: 0; padding-left: 20px;">{li_html}</ul>
+</section>'''
+
+    def _render_ol(self, items):
+        li_html = ''.join([
+            f'<li style="margin: 8px 0; line-height: 1.8;">{self._process_inline(item)}</li>'
+            for item in items
+        ])
+        return f'''
+<section style="font-size: 17px; color: {STYLE['text_color']}; line-height: 1.8; margin: 15px 0; padding-left: 20px;">
+    <ol style="margin: 0; padding-left: 20px;">{li_html}</ol>
+</section>'''
+
+    def _render_code(self, code, lang=""):
+        highlighted = highlight_code(code, lang, self.code_theme)
+        if highlighted:
+            body, background, color = highlighted
+            color = f" color: {color};" if color else ""
+        else:
+            body = code.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            background, color = "#f5f5f5", ""
+        return f'''
+<section style="margin: 20px 0;">
+    <pre style="background: {background}; padding: 15px; border-radius: 5px; overflow-x: auto; font-size: 14px; line-height: 1.6;{color}"><code>{body}</code></pre>
+</section>'''
+
+    def _render_divider(self):
+        return f'''
+<section style="margin: 45px auto; display: flex; align-items: center; justify-content: center; width: 60%;">
+    <section style="flex: 1; height: 1px; background-color: {self.primary}; opacity: 0.15;"></section>
+    <section style="width: 4px; height: 4px; background-color: {self.primary}; margin: 0 15px; transform: rotate(45deg);"></section>
+    <section style="flex: 1; height: 1px; background-color: {self.primary}; opacity: 0.15;"></section>
+</section>'''
+
+    def _render_part_nav(self, index: int, total: int, top: bool):
+        """连载导航：各篇在同一次推送中，按顺序排列"""
+        if top:
+            text = f"连载 {index}/{total}" + ("" if index == 1 else f"，接本次推送第 {index - 1} 篇")
+        elif index < total:
+            text = f"未完，请继续阅读本次推送第 {index + 1} 篇"
+        else:
+            text = f"全文完（共 {total} 篇）"
+        margin = "0 0 25px 0" if top else "40px 0 0 0"
+        return f'''
+<section style="margin: {margin}; text-align: center;">
+    <span style="display: inline-block; font-size: 13px; color: {self.primary}; border: 1px solid {self.primary}; border-radius: 12px; padding: 2px 12px; letter-spacing: 1px;">{text}</span>
+</section>'''
+
+    def _render_footer(self):
+        return f'''
+<section style="margin-top: 60px; border-top: 1px solid #eee; text-align: center; padding-top: 20px;">
+    <span style="font-size: 11px; color: #bbb; letter-spacing: 3px; font-family: 'Helvetica Neue', Helvetica, sans-serif; text-transform: uppercase;">
+        {self.author} · 2026 Edition
+    </span>
+</section>'''
+
+    def _process_inline(self, text):
+        """处理行内样式"""
+        # 粗体
+        text = re.sub(
+            r'\*\*(.+?)\*\*',
+            f'<span style="color: {self.primary}; font-weight: bold;">\\1</span>',
+            text
+        )
+        # 斜体
+        text = re.sub(r'\*(.+?)\*', r'<em>\1</em>', text)
+        # 链接
+        text = re.sub(
+            r'\[([^\]]+)\]\(([^)]+)\)',
+            f'<a href="\\2" style="color: {self.primary}; text-decoration: none;">\\1</a>',
+            text
+        )
+        # 行内代码
+        text = re.sub(
+            r'`([^`]+)`',
+            r'<code style="background: #f5f5f5; padding: 2px 6px; border-radius: 3px; font-size: 14px;">\1</code>',
+            text
+        )
+        return text
+
+
+def render_markdown(text: str, title_image_urls: dict = None, author: str = "",
+                    cover_exists: bool = False) -> tuple:
+    """
+    把 artical.md 的原始内容渲染为 HTML
+
+    Args:
+        text: artical.md 内容
+        title_image_urls: 标题图片地址 {标题序号: URL}
+        author: 页脚显示的作者
+        cover_exists: assets/cover.png 是否存在（影响【封面主图】后一行的处理）
+
+    Returns:
+        (文章标题, HTML)
+    """
+    parser = ArticleParser()
+    parser.parse_lines(text.splitlines(keepends=True), cover_exists)
+    return parser.title, RenderEngine().render(parser.get_content(), title_image_urls, author)
+
+
+def render_local(text: str, assets: AssetIndex, author: str = "") -> tuple:
+    """
+    渲染为本地预览用的 HTML（标题图片使用 assets/ 相对路径，与 preview.html 一致）
+
+    Returns:
+        (文章标题, HTML)
+    """
+    parser = ArticleParser()
+    parser.parse_lines(text.splitlines(keepends=True), "cover.png" in assets)
+    title_image_urls = {num: f"assets/{name}" for num, name in assets.resolve_titles(parser.title_numbers()).items()}
+    return parser.title, RenderEngine().render(parser.get_content(), title_image_urls, author)
+
+
+def part_title(title: str, index: int, total: int, max_chars: int = 0) -> str:
+    """拆分后第 index 篇的标题，如“标题（2/3）”；超出 max_chars 时截短原标题"""
+    suffix = f"（{index}/{total}）"
+    if max_chars and len(title) + len(suffix) > max_chars:
+        title = title[:max(max_chars - len(suffix) - 1, 0)] + "…"
+    return title + suffix
+
+
+# ========== 批量渲染 ==========
+
+def find_articles(paths: list) -> list:
+    """在给定路径中查找文章目录（包含 artical.md 的目录，只向下找一层）"""
+    found = []
+    for path in map(Path, paths):
+        if (path / "artical.md").is_file():
+            found.append(path)
+        elif path.is_dir():
+            found.extend(sorted(p for p in path.iterdir() if (p / "artical.md").is_file()))
+    return found
+
+
+def _render_article_dir(job: tuple) -> dict:
+    """
+    进程池任务：渲染一篇文章并写入输出文件（标题图片使用本地相对路径，与 preview.html 一致）
+
+    Args:
+        job: (文章目录, 输出文件, 作者)
+    """
+    article_dir, output_path, author = job
+    start = time.perf_counter()
+    try:
+        text = (Path(article_dir) / "artical.md").read_text(encoding="utf-8")
+        title, html = render_local(text, AssetIndex(Path(article_dir) / "assets"), author)
+        Path(output_path).write_text(
+            f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{escape(title)}</title></head>'
+            f'<body style="max-width:600px;margin:0 auto;">{html}</body></html>',
+            encoding="utf-8",
+        )
+        error = ""
+    except Exception as e:
+        html, error = "", str(e)
+    return {
+        "article": str(article_dir),
+        "output": str(output_path),
+        "bytes": len(html.encode("utf-8")),
+        "ms": round((time.perf_counter() - start) * 1000, 3),
+        "error": error,
+    }
+
+
+def _output_names(article_dirs: list) -> list:
+    """
+    每篇文章的输出文件名（不含扩展名）
+
+    默认为文章目录名；不同上级目录下有同名文章时加上上级目录名（如 2024_文章），仍重名时再加序号
+    """
+    dirs = [Path(d).resolve() for d in article_dirs]
+    unique_dirs = list(dict.fromkeys(dirs))
+    name_counts = {}
+    for d in unique_dirs:
+        name_counts[d.name] = name_counts.get(d.name, 0) + 1
+
+    names, used = {}, set()
+    for d in unique_dirs:
+        base = d.name if name_counts[d.name] == 1 else f"{d.parent.name}_{d.name}"
+        name, n = base, 2
+        while name in used:
+            name, n = f"{base}_{n}", n + 1
+        used.add(name)
+        names[d] = name
+    return [names[d] for d in dirs]
+
+
+def render_batch(article_dirs: list, out_dir, workers: int = None, chunksize: int = None,
+                 author: str = "") -> list:
+    """
+    用进程池批量渲染文章，输出 <out_dir>/<文章目录名>.html（目录名重复时见 _output_names）
+
+    Args:
+        article_dirs: 文章目录列表
+        out_dir: 输出目录
+        workers: 进程数，默认为 CPU 核数；1 表示在当前进程中串行渲染
+        chunksize: 每次分给一个进程的文章数，默认按进程数平均分成若干块
+
+    Returns:
+        每篇文章的结果 {"article", "output", "bytes", "ms", "error"}，顺序与输入一致
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names = _output_names(article_dirs)
+    renamed = sorted({f"{d} -> {name}.html" for d, name in zip(article_dirs, names) if name != Path(d).name})
+    if renamed:
+        print(f"警告: 有同名的文章目录，输出文件改为: {'; '.join(renamed)}")
+    jobs = [(str(d), str(out_dir / f"{name}.html"), author) for d, name in zip(article_dirs, names)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        return [_render_article_dir(job) for job in jobs]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # 分块派发，减少进程间通信次数；每个进程大约分到 4 块，兼顾负载均衡
+    chunksize = chunksize or max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_article_dir, jobs, chunksize=chunksize))
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="批量渲染文章为 HTML（多进程）")
+    parser.add_argument("paths", nargs="+", help="文章目录，或包含多个文章目录的上级目录")
+    parser.add_argument("--out", default="rendered", help="输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认 CPU 核数）")
+    parser.add_argument("--chunksize", type=int, default=None, help="每次派发给一个进程的文章数")
+    parser.add_argument("--author", default="", help="页脚作者")
+    args = parser.parse_args(argv)
+
+    article_dirs = find_articles(args.paths)
+    if not article_dirs:
+        print("错误: 没有找到包含 artical.md 的文章目录")
+        return 1
+
+    start = time.perf_counter()
+    results = render_batch(article_dirs, args.out, args.workers, args.chunksize, args.author)
+    wall = time.perf_counter() - start
+
+    timing_path = Path(args.out) / "timings.json"
+    timing_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    failed = [r for r in results if r["error"]]
+    for r in failed:
+        print(f"错误: {r['article']} - {r['error']}")
+    print(f"渲染 {len(results) - len(failed)}/{len(results)} 篇，耗时 {wall:.2f} 秒"
+          f"（{len(results) / wall:.1f} 篇/秒），每篇耗时见 {timing_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
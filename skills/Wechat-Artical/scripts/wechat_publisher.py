@@ -4,19 +4,46 @@
 微信公众号一键发布脚本
 
 用法：
-    python wechat_publisher.py <文章目录路径>
+    python wechat_publisher.py <文章目录路径> [--watch] [--accounts 名称1,名称2|all] [--new-draft]
 
 示例：
     python wechat_publisher.py ./artical/artical1
+    python wechat_publisher.py ./artical/artical1 --watch   # 只在本地实时更新 preview.html
+    python wechat_publisher.py ./artical/artical1 --accounts all   # 同时发布到 config.json 中的全部公众号
+
+断点续传：
+    每个完成的阶段会记录在文章目录下的 .publish_state.json 中，
+    发布失败后重新执行会复用已上传的封面和图片，从未完成的阶段继续。
+    删除该文件即可强制全部重新上传。
+    多公众号发布时，非默认公众号的状态保存在 .publish_state.<appid>.json 中。
+    记录按公众号和接口地址区分，在模拟服务器与真实接口之间切换后不会复用对方上传的素材。
+
+草稿同步：
+    状态文件同时记录草稿 media_id 和标题+正文的哈希。再次发布时内容没有变化则不调用接口，
+    有变化则用 draft/update 更新原草稿（原草稿已删除或已发表时才新建），草稿箱里不会堆积重复草稿。
+    加 --new-draft 强制新建草稿。
 """
 
 import os
 import sys
 import re
 import json
-import requests
+import time
+import hashlib
+import functools
+import threading
 from pathlib import Path
 
+from asset_hash import fingerprint, fingerprint_many
+from preflight import WECHAT_LIMITS, preflight
+from render_engine import STYLE, ArticleParser, AssetIndex, RenderEngine, part_title  # noqa: F401  STYLE 保留为本模块属性，兼容外部引用
+
+# 启动优化：requests 等较重的模块只在真正调用微信接口时才导入，
+# 配置在首次使用时读取并缓存（见 _get_config）。bench_startup.py 会检查这一点。
+
+
+DEFAULT_API_BASE_URL = "https://api.weixin.qq.com"
+
 
 def _load_config():
     """从同目录下的配置文件读取配置"""
@@ -27,6 +54,13 @@ def _load_config():
         "WECHAT_APPID": "wxxxxx",
         "WECHAT_APPSECRET": "0axxxx",
         "WECHAT_AUTHOR": "xxxx",
+        "WECHAT_API_BASE_URL": DEFAULT_API_BASE_URL,
+        "ASSET_LIBRARY_DIR": "",
+        "WECHAT_ACCOUNTS": [],
+        "IMAGE_DEDUPE_THRESHOLD": 4,
+        "WECHAT_DAILY_QUOTAS": {},
+        "METRICS_DIR": "",
+        "SPLIT_LONG_ARTICLE": True,
     }
     
     try:
@@ -43,200 +77,393 @@ def _load_config():
         return default_config
 
 
-# ============== 配置（从同目录下的 config.json 文件读取）==============
-_config = _load_config()
-CONFIG = {
-    "appid": _config.get("WECHAT_APPID", "wxxxxx"),
-    "appsecret": _config.get("WECHAT_APPSECRET", "0axxxx"),
-    "author": _config.get("WECHAT_AUTHOR", "xxxx"),
-}
-
-# 样式配置
-STYLE = {
-    "primary_color": "#003399",
-    "text_color": "#333",
-    "light_text": "#3f3f3f",
-    "font_family": "-apple-system, BlinkMacSystemFont, 'Helvetica Neue', 'PingFang SC', 'Hiragino Sans GB', 'Microsoft YaHei UI', 'Microsoft YaHei', Arial, sans-serif",
-}
-
-# 微信 API 地址
-WECHAT_API = {
-    "token": "https://api.weixin.qq.com/cgi-bin/token",
-    "upload_material": "https://api.weixin.qq.com/cgi-bin/material/add_material",
-    "upload_img": "https://api.weixin.qq.com/cgi-bin/media/uploadimg",
-    "add_draft": "https://api.weixin.qq.com/cgi-bin/draft/add",
-}
-
-
-def publish_article(article_dir: str) -> str:
+# ============== 配置（从同目录下的 config.json 文件读取，首次使用时加载）==============
+@functools.lru_cache(maxsize=None)
+def _get_config() -> dict:
+    """读取并缓存发布配置"""
+    config = _load_config()
+    result = {
+        "appid": config.get("WECHAT_APPID", "wxxxxx"),
+        "appsecret": config.get("WECHAT_APPSECRET", "0axxxx"),
+        "author": config.get("WECHAT_AUTHOR", "xxxx"),
+        "asset_library": config.get("ASSET_LIBRARY_DIR", ""),
+        "api_base_url": config.get("WECHAT_API_BASE_URL", DEFAULT_API_BASE_URL),
+        # 相似图片去重的汉明距离阈值，-1 表示关闭
+        "image_dedupe_threshold": int(config.get("IMAGE_DEDUPE_THRESHOLD", 4)),
+        # 各接口日调用上限，未配置的接口使用 quota_scheduler.DEFAULT_DAILY_QUOTAS
+        "quotas": config.get("WECHAT_DAILY_QUOTAS") or {},
+        # 指标目录，为空表示不记录（见 metrics.py）
+        "metrics_dir": config.get("METRICS_DIR", ""),
+        # 正文超出草稿上限时按【标题N】拆分为多篇
+        "split_long_article": bool(config.get("SPLIT_LONG_ARTICLE", True)),
+    }
+    # 多公众号：WECHAT_ACCOUNTS 为 [{"name", "appid", "appsecret", "author"}]，
+    # 未配置时只有 WECHAT_APPID 对应的一个默认公众号
+    accounts = []
+    for item in config.get("WECHAT_ACCOUNTS") or []:
+        accounts.append({
+            "name": item.get("name") or item["appid"],
+            "appid": item["appid"],
+            "appsecret": item["appsecret"],
+            "author": item.get("author", result["author"]),
+        })
+    if not accounts:
+        accounts.append({"name": "default", "appid": result["appid"],
+                         "appsecret": result["appsecret"], "author": result["author"]})
+    result["accounts"] = accounts
+    return result
+
+
+def build_wechat_api(base_url: str) -> dict:
+    """根据 API 根地址生成各接口地址（可指向本地模拟服务器）"""
+    base_url = base_url.rstrip('/')
+    return {
+        "token": f"{base_url}/cgi-bin/token",
+        "upload_material": f"{base_url}/cgi-bin/material/add_material",
+        "upload_img": f"{base_url}/cgi-bin/media/uploadimg",
+        "add_draft": f"{base_url}/cgi-bin/draft/add",
+        "update_draft": f"{base_url}/cgi-bin/draft/update",
+        "quota_get": f"{base_url}/cgi-bin/openapi/quota/get",
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _get_wechat_api() -> dict:
+    """微信 API 地址（根地址由 config.json 的 WECHAT_API_BASE_URL 决定）"""
+    return build_wechat_api(_get_config()["api_base_url"])
+
+
+def _api_base_url() -> str:
+    """当前生效的 API 根地址（压测等场景会在运行时把 WECHAT_API 改为指向模拟服务器）"""
+    return _get_wechat_api()["token"].rsplit("/cgi-bin/", 1)[0]
+
+
+# 接口调用次数数据库，为 None 时使用 quota_scheduler.DEFAULT_DB_PATH（压测时指向临时文件）
+QUOTA_DB = None
+# 相似图片感知哈希数据库，为 None 时使用 image_dedupe.DEFAULT_DB_PATH（压测时指向临时文件）
+IMAGE_HASH_DB = None
+
+
+@functools.lru_cache(maxsize=None)
+def _quota_tracker(base_url: str, db_path):
+    from quota_scheduler import DEFAULT_DB_PATH, QuotaTracker
+    return QuotaTracker(base_url, _get_config()["quotas"], db_path or DEFAULT_DB_PATH)
+
+
+def _get_quota_tracker():
+    """接口调用次数统计（按当前生效的 API 根地址区分，指向模拟服务器时不计入真实额度）"""
+    return _quota_tracker(_api_base_url(), QUOTA_DB)
+
+
+def _get_metrics():
+    """发布指标（config.json 未设置 METRICS_DIR 时为空操作）"""
+    from metrics import get_metrics
+    return get_metrics(_get_config()["metrics_dir"], "wechat_publisher")
+
+
+def _record_api_call(appid: str, api: str, data: dict, seconds: float = None):
+    """记录一次接口调用（次数、耗时），返回 45009 时标记该接口本周期额度已用完"""
+    metrics = _get_metrics()
+    result = str(data.get('errcode') or "ok")
+    metrics.inc("wechat_api_calls_total", api=api, result=result)
+    if seconds is not None:
+        metrics.observe("wechat_api_seconds", seconds, api=api)
+        metrics.event("api_call", appid=appid, api=api, result=result, seconds=round(seconds, 4))
+    try:
+        tracker = _get_quota_tracker()
+        if data.get('errcode') == 45009:
+            tracker.mark_exhausted(appid, api)
+        else:
+            tracker.record(appid, api)
+    except Exception as e:
+        # 统计失败不影响发布
+        print(f"      警告: 记录接口调用次数失败 - {e}")
+
+
+def __getattr__(name):
+    """CONFIG / WECHAT_API 在首次访问时才加载（返回缓存的同一个 dict，修改会生效）"""
+    if name == "CONFIG":
+        return _get_config()
+    if name == "WECHAT_API":
+        return _get_wechat_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 断点状态文件（保存在文章目录下）
+STATE_FILE = ".publish_state.json"
+
+# 多公众号发布时，HTML 模板中图片地址和作者的占位符
+IMAGE_PLACEHOLDER = "{{{{wechat-img:{}}}}}"
+IMAGE_PLACEHOLDER_RE = re.compile(r'\{\{wechat-img:([^}]*)\}\}')
+AUTHOR_PLACEHOLDER = "{{wechat-author}}"
+
+# access_token 缓存 {(token 接口, appid): (token, 过期时间)}，同一进程内多篇文章、多个线程共用
+_token_cache = {}
+_token_lock = threading.Lock()
+# 每个 (token 接口, appid) 一把获取锁：同一公众号同一时刻只有一个线程去获取 token，
+# 其余等它完成后直接复用（client_credential 每次获取都会让之前的 token 失效）
+_token_fetch_locks = {}
+# 提前这么多秒视为过期，避免用到临界时刻的 token
+TOKEN_EXPIRY_MARGIN = 300
+# token 失效的错误码（被新 token 顶替、过期、不合法），遇到后重新获取 token 再试一次
+INVALID_TOKEN_ERRCODES = (40001, 40014, 42001)
+# 草稿或其中第 index 篇不存在（已删除、已发表）的错误码，只有这种情况才改为新建草稿
+DRAFT_MISSING_ERRCODES = (40007,)
+
+
+def _token_fetch_lock(cache_key) -> threading.Lock:
+    with _token_lock:
+        lock = _token_fetch_locks.get(cache_key)
+        if lock is None:
+            lock = _token_fetch_locks[cache_key] = threading.Lock()
+        return lock
+
+
+def _default_account() -> dict:
+    config = _get_config()
+    return {"name": "default", "appid": config["appid"],
+            "appsecret": config["appsecret"], "author": config["author"]}
+
+
+def _state_file(appid: str) -> str:
+    """默认公众号沿用 .publish_state.json，其他公众号各自一个状态文件"""
+    if appid == _get_config()["appid"]:
+        return STATE_FILE
+    return f".publish_state.{appid}.json"
+
+
+def publish_article(article_dir: str, sync_draft: bool = True) -> str:
     """
     发布文章到微信公众号草稿箱
 
     Args:
         article_dir: 文章目录路径
+        sync_draft: 是否更新该文章之前创建的草稿（False 时总是新建草稿）
 
     Returns:
         成功返回草稿 media_id，失败返回错误信息
     """
+    start = time.perf_counter()
     try:
-        publisher = WechatPublisher(article_dir)
-        return publisher.run()
+        publisher = WechatPublisher(article_dir, sync_draft=sync_draft)
+        result = publisher.run()
     except Exception as e:
-        return f"错误: {str(e)}"
+        result = f"错误: {str(e)}"
+    _record_publish(_get_config()["appid"], article_dir, result, time.perf_counter() - start)
+    _get_metrics().flush()
+    return result
 
 
-class ArticleParser:
-    """文章解析器"""
+def publish_to_accounts(article_dir: str, names: list = None, max_workers: int = None,
+                        sync_draft: bool = True) -> dict:
+    """
+    把一篇文章同时发布到多个公众号的草稿箱
 
-    # 内部标记
-    QUOTE_START = "__QUOTE_START__"
-    QUOTE_END = "__QUOTE_END__"
-    TITLE_IMAGE_PREFIX = "__TITLE_IMAGE_"  # 标题图片标记前缀，如 __TITLE_IMAGE_1__
+    文章只解析、渲染一次，得到图片地址和作者为占位符的 HTML 模板；
+    之后每个公众号并发执行：获取（或复用）token、上传该公众号缺少的图片、
+    替换成该公众号的图片地址和作者、创建草稿。某个公众号失败不影响其他公众号。
 
-    def __init__(self, article_dir: str):
-        self.article_dir = Path(article_dir).resolve()
-        self.title = ""
-        self.cover_image = ""
-        self.content_lines = []    # 所有内容（包含引言标记）
-        self._in_quote = False     # 跟踪是否在引言块中
-
-    def parse(self) -> bool:
-        """解析 artical.md 文件"""
-        md_path = self.article_dir / "artical.md"
-        if not md_path.exists():
-            raise FileNotFoundError(f"找不到 artical.md: {md_path}")
-
-        with open(md_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            stripped = line.strip()
-
-            # 解析【文章标题】行 - 提取标题，整行不保留
-            if stripped.startswith('【文章标题】'):
-                title_part = stripped.replace('【文章标题】', '').strip()
-                # 去掉开头的 # 符号
-                title_part = re.sub(r'^#+\s*', '', title_part)
-                self.title = title_part
-                i += 1
-                continue
+    Args:
+        article_dir: 文章目录路径
+        names: 公众号名称列表（config.json 中 WECHAT_ACCOUNTS 的 name），None 表示全部
+        max_workers: 最大并发数，默认每个公众号一个线程
+        sync_draft: 是否更新各公众号之前创建的草稿（False 时总是新建草稿）
 
-            # 解析【封面主图】标记 - 自动使用 assets/cover.png，同时闭合引言
-            if '【封面主图' in stripped and stripped.startswith('【') and '】' in stripped:
-                # 如果在引言块中，先闭合引言
-                if self._in_quote:
-                    self.content_lines.append(self.QUOTE_END + "\n")
-                    self._in_quote = False
-                
-                # 自动设置封面路径为 assets/cover.png
-                cover_path = self.article_dir / "assets" / "cover.png"
-                if cover_path.exists():
-                    self.cover_image = "assets/cover.png"
-                else:
-                    # 向后兼容：如果下一行有图片语法，也支持
-                    i += 1
-                    while i < len(lines):
-                        next_line = lines[i].strip()
-                        if next_line:
-                            img_match = re.match(r'!\[([^\]]*)\]\(([^)]+)\)', next_line)
-                            if img_match:
-                                self.cover_image = img_match.group(2)
-                                # 不再把封面图片加入正文
-                            i += 1
-                            break
-                        i += 1
-                    continue
-                
-                i += 1
-                # 跳过下一行如果是图片语法（向后兼容）
-                if i < len(lines):
-                    next_line = lines[i].strip()
-                    if re.match(r'!\[([^\]]*)\]\(([^)]+)\)', next_line):
-                        i += 1
-                continue
+    Returns:
+        {公众号名称: 草稿 media_id 或错误信息}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    accounts = _get_config()["accounts"]
+    if names:
+        by_name = {account["name"]: account for account in accounts}
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            return {name: "错误: config.json 中没有这个公众号" for name in unknown}
+        accounts = [by_name[name] for name in names]
+
+    # 预检：所有公众号都会失败的问题在调用任何接口之前发现
+    report = preflight(article_dir, _get_config()["split_long_article"])
+    if not report["ok"]:
+        error = "错误: 预检未通过 - " + "；".join(report["errors"])
+        return {account["name"]: error for account in accounts}
 
-            # 解析【引言】标记 - 插入引言开始标记
-            if stripped == '【引言】':
-                self.content_lines.append(self.QUOTE_START + "\n")
-                self._in_quote = True
-                i += 1
-                continue
+    try:
+        renderer = WechatPublisher(article_dir, accounts[0])
+        renderer.parser.parse()
+        renderer.split_plan = report["plan"]
+    except Exception as e:
+        return {account["name"]: f"错误: 解析文章失败 - {str(e)}" for account in accounts}
+    cover_path = renderer.parser.get_cover_path()
+
+    print(f"渲染文章模板: {renderer.parser.title}")
+    template = renderer._render_template()
+    # 本地预览使用相对路径的图片
+    preview_path = renderer._write_preview(
+        renderer._fill_template(template, {key: key for key in template["images"]})
+    )
+    print(f"已生成预览: {preview_path}")
+
+    def publish(account: dict) -> str:
+        start = time.perf_counter()
+        try:
+            publisher = WechatPublisher(article_dir, account, library=renderer.library, sync_draft=sync_draft)
+            publisher.parser = renderer.parser
+            result = publisher._publish_template(template, cover_path)
+        except Exception as e:
+            result = f"错误: {str(e)}"
+        _record_publish(account["appid"], article_dir, result, time.perf_counter() - start)
+        return result
 
-            # 解析【正文】标记 - 插入引言结束标记
-            if stripped == '【正文】':
-                if self._in_quote:
-                    self.content_lines.append(self.QUOTE_END + "\n")
-                    self._in_quote = False
-                i += 1
-                continue
+    with ThreadPoolExecutor(max_workers=max_workers or len(accounts)) as pool:
+        results = list(pool.map(publish, accounts))
+    _get_metrics().flush()
+    return {account["name"]: result for account, result in zip(accounts, results)}
 
-            # 解析【标题1】【标题2】等标记 - 转换为内部标记，保留下一行标题文字
-            title_match = re.match(r'^【标题(\d+)】$', stripped)
-            if title_match:
-                # 如果在引言块中，先闭合引言
-                if self._in_quote:
-                    self.content_lines.append(self.QUOTE_END + "\n")
-                    self._in_quote = False
-                
-                title_num = title_match.group(1)
-                # 插入内部标记
-                self.content_lines.append(f"{self.TITLE_IMAGE_PREFIX}{title_num}__\n")
-                i += 1
-                # 下一行是标题文字，保留
-                if i < len(lines):
-                    self.content_lines.append(lines[i])
-                    i += 1
-                continue
 
-            # 其他【xxx】标记行 - 不保留
-            if stripped.startswith('【') and '】' in stripped:
-                i += 1
-                continue
+def _record_publish(appid: str, article_dir, result: str, seconds: float):
+    """记录一篇文章（一个公众号）的发布结果和耗时"""
+    ok = not result.startswith("错误")
+    metrics = _get_metrics()
+    metrics.inc("wechat_publish_total", result="ok" if ok else "error")
+    metrics.observe("wechat_publish_seconds", seconds)
+    metrics.event("publish", appid=appid, article=str(article_dir), ok=ok,
+                  seconds=round(seconds, 3), result=result[:200])
 
-            # 普通行 - 保留
-            self.content_lines.append(line)
-            i += 1
 
-        # 解析结束时，如果引言未闭合，自动闭合
-        if self._in_quote:
-            self.content_lines.append(self.QUOTE_END + "\n")
-            self._in_quote = False
+def _file_hash(path: str) -> str:
+    """计算文件内容的 sha256（按 inode、大小、修改时间缓存，见 asset_hash）"""
+    return fingerprint(path)
+
+
+def _draft_hash(articles: list) -> str:
+    """草稿内容哈希（每篇的标题、作者、封面、正文等全部字段）"""
+    # 只有一篇时按单篇计算，与拆分功能加入之前记录的哈希一致
+    content = articles[0] if len(articles) == 1 else articles
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
 
-        return True
 
-    def get_content(self) -> str:
-        """获取处理后的正文内容"""
-        return ''.join(self.content_lines)
-
-    def get_cover_path(self) -> str:
-        """获取封面图片完整路径"""
-        # 优先使用解析到的路径
-        if self.cover_image:
-            if self.cover_image.startswith('http'):
-                return self.cover_image
-            return str(self.article_dir / self.cover_image)
-        
-        # 自动检测 assets/cover.png
-        auto_cover = self.article_dir / "assets" / "cover.png"
-        if auto_cover.exists():
-            return str(auto_cover)
-        
+class PublishState:
+    """
+    发布断点状态
+
+    记录每个已完成的阶段（封面 media_id、正文图片 URL、HTML 哈希、草稿 media_id），
+    发布失败后重新执行时从第一个未完成的阶段继续。每个资源都带有源文件哈希，
+    源文件变化后对应的记录自动失效。
+    """
+
+    def __init__(self, article_dir: str, appid: str, base_url: str = None):
+        self.path = Path(article_dir) / _state_file(appid)
+        self.appid = appid
+        self.base_url = (base_url or _api_base_url()).rstrip('/')
+        self.data = self._empty()
+        # 协程版发布器在线程池中并发记录同一篇文章的多张图片
+        self._lock = threading.RLock()
+        self._load()
+
+    def _empty(self) -> dict:
+        return {"appid": self.appid, "api_base_url": self.base_url,
+                "thumb": {}, "images": {}, "html_hash": "", "draft": {}}
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"      警告: 读取断点状态失败 - {e}，重新开始")
+            return
+        # 素材属于具体公众号和接口地址，换了 appid 或在模拟服务器与真实接口之间切换时之前的记录全部作废
+        # （没有记录接口地址的旧状态文件视为真实接口）
+        if data.get("appid") != self.appid or data.get("api_base_url", DEFAULT_API_BASE_URL) != self.base_url:
+            return
+        self.data = {**self._empty(), **data}
+
+    def save(self):
+        """原子写入状态文件"""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def get_thumb(self, file_hash: str) -> str:
+        """获取封面 media_id（封面内容未变化时）"""
+        thumb = self.data["thumb"]
+        if thumb.get("hash") == file_hash:
+            return thumb.get("media_id", "")
         return ""
 
+    def set_thumb(self, file_hash: str, media_id: str):
+        with self._lock:
+            self.data["thumb"] = {"hash": file_hash, "media_id": media_id}
+            self.save()
+
+    def get_image_url(self, key: str, file_hash: str) -> str:
+        """获取正文图片的微信 URL（图片内容未变化时）"""
+        entry = self.data["images"].get(key)
+        if entry and entry.get("hash") == file_hash:
+            return entry.get("url", "")
+        return ""
+
+    def set_image_url(self, key: str, file_hash: str, url: str):
+        with self._lock:
+            self.data["images"][key] = {"hash": file_hash, "url": url}
+            self.save()
+
+    def set_html_hash(self, html_hash: str):
+        with self._lock:
+            self.data["html_hash"] = html_hash
+            self.save()
+
+    def get_draft(self) -> dict:
+        """上次创建的草稿 {"media_id", "index", "parts", "hash", "source"}"""
+        return self.data["draft"]
+
+    def set_draft(self, media_id: str, draft_hash: str, index: int = 0, source: dict = None, parts: int = 1):
+        """
+        source 为发布时文章内容的指纹（见 catalog.source_fingerprint），文章索引据此判断发布后是否有修改；
+        parts 为拆分后的篇数，各篇依次位于草稿的 index、index+1 …
+        """
+        with self._lock:
+            self.data["draft"] = {"media_id": media_id, "index": index, "parts": parts, "hash": draft_hash,
+                                  "source": source or {}}
+            self.save()
+
 
 class WechatPublisher:
     """微信公众号发布器"""
 
-    def __init__(self, article_dir: str):
+    def __init__(self, article_dir: str, account: dict = None, library=None, sync_draft: bool = True):
+        """
+        Args:
+            article_dir: 文章目录路径
+            account: 公众号 {"name", "appid", "appsecret", "author"}，默认为 config.json 中的 WECHAT_APPID
+            library: 共享的 AssetLibrary 实例（多个发布器并发时共用一份清单）
+            sync_draft: 是否更新之前创建的草稿（False 时总是新建草稿）
+        """
         self.article_dir = Path(article_dir).resolve()
-        self.appid = CONFIG["appid"]
-        self.appsecret = CONFIG["appsecret"]
-        self.access_token = None
-        self.primary = STYLE["primary_color"]
+        config = _get_config()
+        account = account or _default_account()
+        self.appid = account["appid"]
+        self.appsecret = account["appsecret"]
+        self.author = account["author"]
+        self.access_token = None   # 首次调用需要 token 的接口时才获取（见 _ensure_token）
+        self.token_failed = False
+        self.sync_draft = sync_draft
         self.parser = ArticleParser(article_dir)
         self.title_image_urls = {}  # 保存标题图片的微信URL映射 {数字: URL}
+        self.engine = RenderEngine()  # 保存块渲染缓存，watch 模式下只重新渲染改动的块
+        # 断点状态、素材库按实际生效的接口地址区分（模拟服务器上传的素材不会被真实发布复用）
+        self.api_base_url = _api_base_url()
+        self.state = PublishState(self.article_dir, self.appid, self.api_base_url)
+        # 共享素材库（可选）：内容与库中一致的图片直接复用已上传的 URL
+        self.library = library
+        if library is None and config["asset_library"]:
+            from asset_library import AssetLibrary
+            self.library = AssetLibrary(config["asset_library"])
+        self._image_index = None  # 相似图片索引，首次上传正文图片时创建（见 _dedupe_index）
+        self.split_plan = []      # 正文超长时的拆分方案（块区间），由预检给出，为空表示不拆分
 
     def run(self) -> str:
         """执行发布流程"""
@@ -245,6 +472,38 @@ class WechatPublisher:
         print("=" * 50 + "\n")
 
         # 1. 解析文章
+        error = self._prepare()
+        if error:
+            return error
+
+        # 2-3. 上传封面（access_token 在第一次真正调用接口前才获取，内容都没变时整个流程不访问网络）
+        cover_path = self.parser.get_cover_path()
+        thumb_media_id = self._ensure_cover(cover_path)
+        if not thumb_media_id:
+            return self._token_error() or "错误: 上传封面图片失败"
+
+        # 4-5. 处理正文并转换 HTML
+        html_content, parts = self._process_content()
+        html_hash = hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+        self.state.set_html_hash(html_hash)
+
+        # 保存预览文件
+        preview_path = self._write_preview(html_content)
+        print(f"      已生成预览: {preview_path}")
+
+        # 6. 创建或更新草稿
+        result = self._save_draft(
+            title=self.parser.title,
+            html_content=html_content,
+            thumb_media_id=thumb_media_id,
+            parts=parts,
+        )
+        result = self._token_error() or result
+        self._print_result(result)
+        return result
+
+    def _prepare(self) -> str:
+        """解析文章并预检，通过返回空字符串，否则返回错误信息"""
         print("[1/6] 解析文章...")
         try:
             self.parser.parse()
@@ -255,35 +514,23 @@ class WechatPublisher:
         except Exception as e:
             return f"错误: 解析文章失败 - {str(e)}"
 
-        # 2. 获取 token
-        if not self._get_token():
-            return "错误: 获取 access_token 失败"
+        # 预检：缺图、格式/大小超限、正文过长等问题在调用任何接口之前发现
+        report = preflight(self.article_dir, _get_config()["split_long_article"])
+        for warning in report["warnings"]:
+            print(f"      警告: {warning}")
+        if not report["ok"]:
+            for error in report["errors"]:
+                print(f"      错误: {error}")
+            return "错误: 预检未通过 - " + "；".join(report["errors"])
+        print(f"      预检通过（{report['elapsed_ms']:.1f} ms）")
+        self.split_plan = report["plan"]
 
-        # 3. 上传封面
         cover_path = self.parser.get_cover_path()
         if not cover_path or not os.path.exists(cover_path):
             return f"错误: 封面图片不存在 - {cover_path or 'assets/cover.png'}"
+        return ""
 
-        thumb_media_id = self._upload_cover(cover_path)
-        if not thumb_media_id:
-            return "错误: 上传封面图片失败"
-
-        # 4-5. 处理正文并转换 HTML
-        html_content = self._process_content()
-
-        # 保存预览文件
-        preview_path = self.article_dir / "preview.html"
-        with open(preview_path, 'w', encoding='utf-8') as f:
-            f.write(f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>预览</title></head><body style="max-width:600px;margin:0 auto;">{html_content}</body></html>')
-        print(f"      已生成预览: {preview_path}")
-
-        # 6. 创建草稿
-        result = self._create_draft(
-            title=self.parser.title,
-            html_content=html_content,
-            thumb_media_id=thumb_media_id,
-        )
-
+    def _print_result(self, result: str):
         print("\n" + "=" * 50)
         if result and not result.startswith("错误"):
             print("发布成功!")
@@ -293,36 +540,179 @@ class WechatPublisher:
             print(f"发布失败: {result}")
         print("=" * 50 + "\n")
 
-        return result
+    def _publish_template(self, template: dict, cover_path: str) -> str:
+        """用已渲染的模板发布到当前公众号（多公众号发布时每个公众号各执行一次）"""
+        thumb_media_id = self._ensure_cover(cover_path)
+        if not thumb_media_id:
+            return self._token_error() or "错误: 上传封面图片失败"
+
+        print(f"[4/6] 处理正文图片（{self.appid}）...")
+        urls = self._upload_images(template)
+        html_content = self._fill_template(template, urls)
+        html_hash = hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+        self.state.set_html_hash(html_hash)
 
-    def _get_token(self) -> bool:
-        """获取 access_token"""
+        result = self._save_draft(
+            title=self.parser.title,
+            html_content=html_content,
+            thumb_media_id=thumb_media_id,
+            parts=self._fill_parts(template, urls),
+        )
+        return self._token_error() or result
+
+    def _ensure_cover(self, cover_path: str) -> str:
+        """上传封面，封面内容未变化时复用断点状态中的 media_id"""
+        cover_hash = _file_hash(cover_path)
+        thumb_media_id = self.state.get_thumb(cover_hash)
+        if thumb_media_id:
+            print(f"[3/6] 封面未变化，复用 media_id: {thumb_media_id[:20]}...")
+            return thumb_media_id
+        thumb_media_id = self._upload_cover(cover_path)
+        if thumb_media_id:
+            self.state.set_thumb(cover_hash, thumb_media_id)
+        return thumb_media_id
+
+    def render_preview(self, reparse: bool = True) -> Path:
+        """
+        本地渲染预览（不调用微信接口，图片使用本地相对路径）
+
+        Args:
+            reparse: 是否重新解析 artical.md，仅标题图片变化时可跳过
+
+        Returns:
+            预览文件路径
+        """
+        if reparse or not self.parser.content_lines:
+            self.parser = ArticleParser(self.article_dir)
+            self.parser.parse()
+
+        # 带上修改时间，标题图片替换后浏览器会重新加载
+        assets = AssetIndex(self.article_dir / "assets")
+        self.title_image_urls = {
+            num: f"assets/{name}?v={assets.mtime_ns(name)}"
+            for num, name in assets.resolve_titles(self.parser.title_numbers()).items()
+        }
+
+        html_content = self._markdown_to_html(self.parser.get_content())
+        return self._write_preview(html_content)
+
+    def _write_preview(self, html_content: str) -> Path:
+        """原子写入 preview.html，避免浏览器读到写了一半的文件"""
+        preview_path = self.article_dir / "preview.html"
+        tmp_path = self.article_dir / "preview.html.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>预览</title></head><body style="max-width:600px;margin:0 auto;">{html_content}</body></html>')
+        os.replace(tmp_path, preview_path)
+        return preview_path
+
+    def _get_token(self, stale: str = "") -> bool:
+        """
+        获取 access_token（同一进程内未过期的 token 直接复用）
+
+        stale 为已确认失效的 token，缓存中仍是它时重新获取；并发的线程只会获取一次
+        """
         print("[2/6] 获取 access_token...")
 
-        url = f"{WECHAT_API['token']}?grant_type=client_credential&appid={self.appid}&secret={self.appsecret}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        cache_key = (_get_wechat_api()['token'], self.appid)
+        with _token_fetch_lock(cache_key):
+            with _token_lock:
+                token, expires_at = _token_cache.get(cache_key, ("", 0))
+            if token and token != stale and time.time() < expires_at:
+                self.access_token = token
+                print(f"      复用 access_token，剩余 {int(expires_at - time.time())} 秒")
+                return True
 
-        if 'access_token' in data:
-            self.access_token = data['access_token']
-            print(f"      成功，有效期 {data.get('expires_in', 7200)} 秒")
-            return True
-        else:
-            print(f"      失败: {data}")
-            return False
+            import requests
+
+            url = f"{_get_wechat_api()['token']}?grant_type=client_credential&appid={self.appid}&secret={self.appsecret}"
+            start = time.perf_counter()
+            response = requests.get(url, timeout=10)
+            data = response.json()
+            _record_api_call(self.appid, "token", data, time.perf_counter() - start)
+
+            if 'access_token' in data:
+                _get_metrics().inc("wechat_token_refresh_total", appid=self.appid)
+                self.access_token = data['access_token']
+                expires_in = data.get('expires_in', 7200)
+                with _token_lock:
+                    _token_cache[cache_key] = (self.access_token, time.time() + expires_in - TOKEN_EXPIRY_MARGIN)
+                print(f"      成功，有效期 {expires_in} 秒")
+                return True
+            else:
+                print(f"      失败: {data}")
+                return False
+
+    def _ensure_token(self) -> bool:
+        """还没有 access_token 时获取一次；获取失败后不再重试，本次发布的后续接口调用都直接失败"""
+        if self.access_token is None and not self.token_failed:
+            self.token_failed = not self._get_token()
+        return not self.token_failed
+
+    def _token_error(self) -> str:
+        return "错误: 获取 access_token 失败" if self.token_failed else ""
+
+    def _call_with_token(self, send, api: str) -> dict:
+        """
+        调用 send(access_token)，token 失效（如缓存的 token 已被顶替）时重新获取一次并重试
+
+        api 为 WECHAT_API 中的接口名，每次调用都计入该接口的日调用次数
+        """
+        if not self._ensure_token():
+            return {"errmsg": "获取 access_token 失败"}
+        start = time.perf_counter()
+        data = send(self.access_token)
+        _record_api_call(self.appid, api, data, time.perf_counter() - start)
+        if data.get('errcode') in INVALID_TOKEN_ERRCODES:
+            print(f"      access_token 已失效（{data['errcode']}），重新获取")
+            if self._get_token(stale=self.access_token):
+                start = time.perf_counter()
+                data = send(self.access_token)
+                _record_api_call(self.appid, api, data, time.perf_counter() - start)
+        return data
+
+    def query_quota(self, api: str) -> dict:
+        """
+        查询微信端某个接口当天的调用额度（openapi/quota/get）
+
+        Returns:
+            {"daily_limit", "used", "remain"}，查询失败返回空字典
+        """
+        import requests
+        from urllib.parse import urlparse
+
+        cgi_path = urlparse(_get_wechat_api()[api]).path
+
+        def send(access_token):
+            response = requests.post(
+                f"{_get_wechat_api()['quota_get']}?access_token={access_token}",
+                data=json.dumps({"cgi_path": cgi_path}).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                timeout=10
+            )
+            return response.json()
+
+        data = self._call_with_token(send, "quota_get")
+        if data.get('errcode', 0) != 0 or 'quota' not in data:
+            print(f"      查询 {cgi_path} 额度失败: {data}")
+            return {}
+        return data['quota']
 
     def _upload_cover(self, image_path: str) -> str:
         """上传封面图片"""
         print(f"[3/6] 上传封面图片: {image_path}")
 
-        url = f"{WECHAT_API['upload_material']}?access_token={self.access_token}&type=image"
+        import requests
 
-        with open(image_path, 'rb') as f:
-            files = {'media': (os.path.basename(image_path), f, 'image/png')}
-            response = requests.post(url, files=files, timeout=30)
-            data = response.json()
+        def send(access_token):
+            url = f"{_get_wechat_api()['upload_material']}?access_token={access_token}&type=image"
+            with open(image_path, 'rb') as f:
+                files = {'media': (os.path.basename(image_path), f, 'image/png')}
+                return requests.post(url, files=files, timeout=30).json()
+
+        data = self._call_with_token(send, "upload_material")
 
         if 'media_id' in data:
+            self._record_upload("upload_material", image_path)
             print(f"      成功，media_id: {data['media_id'][:20]}...")
             return data['media_id']
         else:
@@ -333,372 +723,342 @@ class WechatPublisher:
         """上传正文图片"""
         print(f"      上传图片: {image_path}")
 
-        url = f"{WECHAT_API['upload_img']}?access_token={self.access_token}"
+        import requests
 
-        with open(image_path, 'rb') as f:
-            files = {'media': (os.path.basename(image_path), f, 'image/png')}
-            response = requests.post(url, files=files, timeout=30)
-            data = response.json()
+        def send(access_token):
+            url = f"{_get_wechat_api()['upload_img']}?access_token={access_token}"
+            with open(image_path, 'rb') as f:
+                files = {'media': (os.path.basename(image_path), f, 'image/png')}
+                return requests.post(url, files=files, timeout=30).json()
+
+        data = self._call_with_token(send, "upload_img")
 
         if 'url' in data:
+            self._record_upload("upload_img", image_path)
             print(f"      成功")
             return data['url']
         else:
             print(f"      失败: {data}")
             return ""
 
-    def _process_content(self) -> str:
-        """处理正文内容"""
+    def _record_upload(self, api: str, image_path: str):
+        """记录成功上传的图片字节数"""
+        _get_metrics().inc("wechat_upload_bytes_total", os.path.getsize(image_path), api=api)
+
+    def _upload_content_image_cached(self, key: str, image_path: str) -> str:
+        """上传正文图片，图片内容未变化时复用断点状态中的 URL"""
+        file_hash = _file_hash(image_path)
+        reused_url = self._reuse_image_url(key, image_path, file_hash)
+        if reused_url:
+            return reused_url
+
+        wechat_url = self._upload_content_image(image_path)
+        if wechat_url:
+            self._remember_image_url(key, file_hash, wechat_url)
+        return wechat_url
+
+    def _reuse_image_url(self, key: str, image_path: str, file_hash: str) -> str:
+        """断点状态或素材库中已有的图片地址，没有则返回空字符串（不调用接口）"""
+        cached_url = self.state.get_image_url(key, file_hash)
+        if cached_url:
+            print(f"      复用已上传图片: {key}")
+            return cached_url
+
+        if self.library:
+            library_url = self.library.lookup_url(self.api_base_url, self.appid, file_hash)
+            if library_url:
+                print(f"      复用素材库图片: {key}")
+                self.state.set_image_url(key, file_hash, library_url)
+                return library_url
+            library_url = self._similar_library_url(image_path, file_hash)
+            if library_url:
+                print(f"      复用素材库相似图片: {key}")
+                self.state.set_image_url(key, file_hash, library_url)
+                return library_url
+        return ""
+
+    def _remember_image_url(self, key: str, file_hash: str, wechat_url: str):
+        """记录新上传的图片地址"""
+        self.state.set_image_url(key, file_hash, wechat_url)
+        # 素材库中的文件首次在该公众号上传后登记，之后所有文章复用
+        if self.library and self.library.contains(file_hash):
+            self.library.record_url(self.api_base_url, self.appid, file_hash, wechat_url)
+            self.library.save()
+
+    def _process_content(self) -> tuple:
+        """
+        处理正文内容
+
+        Returns:
+            (完整 HTML, 拆分后各篇的 HTML 列表)，不拆分时列表为空
+        """
         print("[4/6] 处理正文图片...")
+        template = self._render_template()
+        urls = self._upload_images(template)
 
-        content = self.parser.get_content()
+        print("[5/6] 转换为 HTML...")
+        html = self._fill_template(template, urls)
+        parts = self._fill_parts(template, urls)
+        print(f"      转换完成{f'，拆分为 {len(parts)} 篇' if parts else ''}")
 
-        # 先上传标题图片 (assets/1.png, assets/2.png, ... assets/9.png)
-        for i in range(1, 10):
-            title_img_path = self.article_dir / "assets" / f"{i}.png"
-            if title_img_path.exists():
-                wechat_url = self._upload_content_image(str(title_img_path))
-                if wechat_url:
-                    self.title_image_urls[str(i)] = wechat_url
-                    print(f"      标题图片 {i}.png 上传成功")
+        return html, parts
 
-        # 上传正文中的图片
-        img_pattern = r'!\[([^\]]*)\]\(([^)]+)\)'
-        images = re.findall(img_pattern, content)
+    def _render_template(self) -> dict:
+        """
+        渲染与公众号无关的 HTML 模板：本地图片地址和作者替换为占位符
 
-        for alt, img_path in images:
+        Returns:
+            {"content": 占位后的 Markdown, "html": 模板 HTML,
+             "images": {图片 key: 本地路径}, "titles": {标题序号: 图片 key},
+             "plan": 拆分方案, "parts": 拆分后各篇的模板 HTML（不拆分时为空列表）}
+        """
+        content = self.parser.get_content()
+        images = {}
+        titles = {}
+
+        # 缺少标题图片、正文图片不存在时预检已经报错，这里的图片都存在
+        # 标题图片：只上传正文中【标题N】用到的 assets/N.png（或 .jpg）
+        assets = AssetIndex(self.article_dir / "assets")
+        for num, name in assets.resolve_titles(self.parser.title_numbers()).items():
+            key = f"assets/{name}"
+            images.setdefault(key, str(assets.path(name)))
+            titles[num] = key
+
+        # 正文中的图片
+        img_pattern = r'!\[([^\]]*)\]\(([^)]+)\)'
+        for alt, img_path in re.findall(img_pattern, content):
             if img_path.startswith('http'):
                 continue
+            images[img_path] = str(self.article_dir / img_path)
+            content = content.replace(f']({img_path})', f']({IMAGE_PLACEHOLDER.format(img_path)})')
+
+        html = self._render_with_placeholders(content, titles)
+        parts = self._render_with_placeholders(content, titles, self.split_plan) if self.split_plan else []
+        return {"content": content, "html": html, "images": images, "titles": titles,
+                "plan": self.split_plan, "parts": parts}
+
+    def _render_with_placeholders(self, content: str, titles: dict, plan: list = None):
+        """渲染占位模板，给出 plan 时按拆分方案返回各篇 HTML 的列表"""
+        self.title_image_urls = {num: IMAGE_PLACEHOLDER.format(key) for num, key in titles.items()}
+        author, self.author = self.author, AUTHOR_PLACEHOLDER
+        try:
+            if plan:
+                return self.engine.render_parts(content, plan, self.title_image_urls, self.author)
+            return self._markdown_to_html(content)
+        finally:
+            self.author = author
+
+    def _upload_images(self, template: dict) -> dict:
+        """
+        上传模板中的图片，返回 {图片 key: 微信 URL}（上传失败的不在其中）
+
+        相似的图片只上传一次，其余复用同一个地址；标题图片只在内容完全相同时才合并
+        """
+        similar = self._similar_images(template)
+        urls = {}
+        for key, image_path in template["images"].items():
+            if similar.get(key) in urls:
+                self._reuse_similar(key, image_path, similar[key], urls)
+                continue
+            wechat_url = self._upload_content_image_cached(key, image_path)
+            if wechat_url:
+                urls[key] = wechat_url
+        return urls
+
+    def _similar_images(self, template: dict) -> dict:
+        """{图片 key: 与之相似、只需上传一次的代表图片 key}"""
+        # 一次并行算好全部图片的 sha256，后面逐张上传时直接命中缓存
+        fingerprint_many(list(template["images"].values()))
+        index = self._dedupe_index()
+        if not index:
+            return {}
+        return index.group(template["images"], exact_only=set(template["titles"].values()))
+
+    def _reuse_similar(self, key: str, image_path: str, similar_key: str, urls: dict):
+        print(f"      复用相似图片: {key} -> {similar_key}")
+        urls[key] = urls[similar_key]
+        self.state.set_image_url(key, _file_hash(image_path), urls[key])
+
+    def _dedupe_index(self):
+        """相似图片索引，已关闭或缺少 numpy/Pillow 时返回 None"""
+        if self._image_index is None:
+            self._image_index = False
+            threshold = _get_config()["image_dedupe_threshold"]
+            if threshold >= 0:
+                from image_dedupe import DEFAULT_DB_PATH, ImageHashIndex, available
+                if available():
+                    self._image_index = ImageHashIndex(IMAGE_HASH_DB or DEFAULT_DB_PATH, threshold)
+                else:
+                    print("      警告: 未安装 numpy/Pillow，跳过相似图片去重")
+        return self._image_index or None
 
-            full_path = self.article_dir / img_path
-            if full_path.exists():
-                wechat_url = self._upload_content_image(str(full_path))
-                if wechat_url:
-                    content = content.replace(f']({img_path})', f']({wechat_url})')
-            else:
-                print(f"      警告: 图片不存在 - {full_path}")
-
-        # 转换为 HTML
-        print("[5/6] 转换为 HTML...")
-        html = self._markdown_to_html(content)
-        print("      转换完成")
-
-        return html
+    def _similar_library_url(self, image_path: str, file_hash: str) -> str:
+        """在素材库已上传到当前公众号的图片中查找相似图片，返回其地址"""
+        index = self._dedupe_index()
+        if not index:
+            return ""
+        candidates = {
+            info["sha256"]: str(self.library.library_dir / name)
+            for name, info in self.library.files.items()
+            if self.library.lookup_url(self.api_base_url, self.appid, info["sha256"])
+        }
+        similar = index.find_similar(image_path, candidates, file_hash)
+        return self.library.lookup_url(self.api_base_url, self.appid, similar) if similar else ""
+
+    def _fill_template(self, template: dict, urls: dict) -> str:
+        """把模板中的占位符替换为当前公众号的图片地址和作者"""
+        html = template["html"]
+        uploaded = {num: key for num, key in template["titles"].items() if key in urls}
+        if len(uploaded) != len(template["titles"]):
+            # 有标题图片上传失败，这些标题降级为普通标题，需要重新渲染
+            html = self._render_with_placeholders(template["content"], uploaded)
+        return self._fill_placeholders(html, urls)
+
+    def _fill_parts(self, template: dict, urls: dict) -> list:
+        """拆分后的各篇，占位符替换方式同 _fill_template；不拆分时返回空列表"""
+        parts = template["parts"]
+        uploaded = {num: key for num, key in template["titles"].items() if key in urls}
+        if parts and len(uploaded) != len(template["titles"]):
+            parts = self._render_with_placeholders(template["content"], uploaded, template["plan"])
+        return [self._fill_placeholders(html, urls) for html in parts]
+
+    def _fill_placeholders(self, html: str, urls: dict) -> str:
+        # 上传失败的正文图片保留本地路径
+        html = IMAGE_PLACEHOLDER_RE.sub(lambda m: urls.get(m.group(1), m.group(1)), html)
+        return html.replace(AUTHOR_PLACEHOLDER, self.author)
 
     def _markdown_to_html(self, md: str) -> str:
         """Markdown 转 HTML"""
-        html_parts = []
-        is_first_heading = True  # 标记是否是第一个标题
-
-        # 外层容器
-        html_parts.append(f'<section style="font-family: {STYLE["font_family"]}; letter-spacing: 0.5px; text-align: justify; padding: 10px; color: {STYLE["text_color"]};">')
-
-        lines = md.split('\n')
-        i = 0
+        return self.engine.render(md, self.title_image_urls, self.author)
+
+    def _save_draft(self, title: str, html_content: str, thumb_media_id: str, parts: list = None) -> str:
+        """
+        保存草稿并记录到断点状态
+
+        同步模式下：内容（标题、作者、封面、正文）与上次完全一致时不调用接口；
+        有变化时更新上次创建的草稿，原草稿已不存在时才新建（其他错误直接返回，避免产生重复草稿）。
+        parts 为拆分后各篇的 HTML，全部保存在同一个多图文草稿中；篇数与上次不同时新建草稿。
+        """
+        articles = self._draft_articles(title, html_content, thumb_media_id, parts)
+        draft_hash = _draft_hash(articles)
+        draft = self.state.get_draft()
+
+        if self.sync_draft and self._can_update_draft(draft, len(articles)):
+            index = draft.get("index", 0)
+            if draft.get("hash") == draft_hash:
+                print(f"[6/6] 草稿内容未变化，跳过: {draft['media_id']}")
+                return self._record_draft(draft["media_id"], draft_hash, index, "unchanged", len(articles))
+            for offset, article in enumerate(articles):
+                result = self._update_draft(draft["media_id"], index + offset, article)
+                if result.get('errcode') != 0:
+                    error = self._update_error(result, offset, len(articles))
+                    if error:
+                        return error
+                    break
+            else:
+                return self._record_draft(draft["media_id"], draft_hash, index, "updated", len(articles))
 
-        while i < len(lines):
-            line = lines[i].strip()
+        result = self._create_draft(articles)
+        if result and not result.startswith("错误"):
+            self._record_draft(result, draft_hash, 0, "created", len(articles))
+        return result
 
-            # 跳过空行
-            if not line:
-                i += 1
-                continue
+    def _update_error(self, result: dict, offset: int, total: int) -> str:
+        """
+        更新草稿中第 offset 篇失败时的处理
 
-            # 引言块开始标记 - 按普通段落处理引言内容
-            if line == ArticleParser.QUOTE_START:
-                i += 1
-                while i < len(lines) and lines[i].strip() != ArticleParser.QUOTE_END:
-                    quote_line = lines[i].strip()
-                    if quote_line:
-                        # 处理图片
-                        img_match = re.match(r'!\[([^\]]*)\]\(([^)]+)\)', quote_line)
-                        if img_match:
-                            alt, src = img_match.groups()
-                            html_parts.append(self._render_image(src, alt))
-                        else:
-                            # 普通段落
-                            html_parts.append(self._render_paragraph(quote_line))
-                    i += 1
-                i += 1  # 跳过 QUOTE_END
-                continue
+        Returns:
+            空字符串表示原草稿已不存在、改为新建草稿；否则为要返回的错误信息
+        """
+        if result.get('errcode') in DRAFT_MISSING_ERRCODES and offset == 0:
+            print("      原草稿已不存在，改为新建草稿")
+            return ""
+        if offset == 0:
+            return f"错误: 更新草稿失败 - {result}"
+        # 前面几篇已经更新，不能再新建草稿（否则会留下一份更新了一半的旧草稿和一份新草稿）
+        return (f"错误: 草稿只更新了前 {offset}/{total} 篇，第 {offset + 1} 篇失败 - {result}。"
+                f"重新发布会再次更新全部篇目；原草稿中的篇目已被删除时可加 --new-draft 新建草稿")
+
+    def _can_update_draft(self, draft: dict, parts: int) -> bool:
+        """上次的草稿存在且篇数相同才能原地更新"""
+        if not draft.get("media_id"):
+            return False
+        if draft.get("parts", 1) != parts:
+            print(f"      拆分篇数变化（{draft.get('parts', 1)} -> {parts}），新建草稿")
+            return False
+        return True
 
-            # 处理【标题X】标记 - 渲染图片+标题文字
-            title_img_match = re.match(r'__TITLE_IMAGE_(\d+)__', line)
-            if title_img_match:
-                title_num = title_img_match.group(1)
-                i += 1
-                # 下一行是标题文字
-                title_text = ""
-                if i < len(lines):
-                    title_text = lines[i].strip()
-                    i += 1
-                # 渲染标题图片+标题文字
-                html_parts.append(self._render_title_with_image(title_num, title_text))
-                continue
+    def _record_draft(self, media_id: str, draft_hash: str, index: int, action: str, parts: int = 1) -> str:
+        """记录草稿和当前文章内容的指纹，返回 media_id（action 为 created、updated 或 unchanged）"""
+        from catalog import source_fingerprint
+
+        self.state.set_draft(media_id, draft_hash, index, source_fingerprint(self.article_dir), parts)
+        _get_metrics().inc("wechat_drafts_total", action=action)
+        return media_id
+
+    def _draft_articles(self, title: str, html_content: str, thumb_media_id: str, parts: list = None) -> list:
+        """草稿中的各篇文章，拆分后标题依次加上（1/N）…（N/N），共用同一张封面"""
+        if not parts:
+            return [self._draft_article(title, html_content, thumb_media_id)]
+        return [
+            self._draft_article(part_title(title, index, len(parts), WECHAT_LIMITS["max_title_chars"]),
+                                html, thumb_media_id)
+            for index, html in enumerate(parts, start=1)
+        ]
+
+    def _draft_article(self, title: str, html_content: str, thumb_media_id: str) -> dict:
+        return {
+            "title": title,
+            "author": self.author,
+            "digest": "",
+            "content": html_content,
+            "thumb_media_id": thumb_media_id,
+            "need_open_comment": 0,
+            "only_fans_can_comment": 0
+        }
 
-            # 代码块
-            if line.startswith('```'):
-                code_lines = []
-                i += 1
-                while i < len(lines) and not lines[i].strip().startswith('```'):
-                    code_lines.append(lines[i])
-                    i += 1
-                code_text = '\n'.join(code_lines)
-                html_parts.append(self._render_code(code_text))
-                i += 1
-                continue
+    def _update_draft(self, media_id: str, index: int, article: dict) -> dict:
+        """更新已有草稿中第 index 篇文章，返回接口结果（errcode 为 0 表示成功）"""
+        print(f"[6/6] 更新草稿: {media_id}")
 
-            # 一级标题
-            if line.startswith('# ') and not line.startswith('## '):
-                title = line[2:].strip()
-                html_parts.append(self._render_h1(title, is_first_heading))
-                is_first_heading = False
-                i += 1
-                continue
+        import requests
 
-            # 二级标题
-            if line.startswith('## '):
-                title = line[3:].strip()
-                html_parts.append(self._render_h2(title))
-                i += 1
-                continue
+        data = {"media_id": media_id, "index": index, "articles": article}
 
-            # 三级标题
-            if line.startswith('### '):
-                title = line[4:].strip()
-                html_parts.append(self._render_h3(title))
-                i += 1
-                continue
+        def send(access_token):
+            response = requests.post(
+                f"{_get_wechat_api()['update_draft']}?access_token={access_token}",
+                data=json.dumps(data, ensure_ascii=False).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                timeout=30
+            )
+            return response.json()
 
-            # 图片
-            img_match = re.match(r'!\[([^\]]*)\]\(([^)]+)\)', line)
-            if img_match:
-                alt, src = img_match.groups()
-                html_parts.append(self._render_image(src, alt))
-                i += 1
-                continue
+        result = self._call_with_token(send, "update_draft")
+        if result.get('errcode') == 0:
+            print("      成功")
+        else:
+            print(f"      失败: {result}")
+        return result
 
-            # 无序列表
-            if line.startswith('- ') or line.startswith('* '):
-                list_items = []
-                while i < len(lines):
-                    l = lines[i].strip()
-                    if l.startswith('- ') or l.startswith('* '):
-                        list_items.append(l[2:])
-                        i += 1
-                    elif l == '':
-                        i += 1
-                        break
-                    else:
-                        break
-                html_parts.append(self._render_ul(list_items))
-                continue
+    def _create_draft(self, articles: list) -> str:
+        """创建草稿（多篇时为多图文草稿）"""
+        print("[6/6] 创建草稿..." if len(articles) == 1 else f"[6/6] 创建草稿（{len(articles)} 篇）...")
 
-            # 有序列表
-            if re.match(r'^\d+\. ', line):
-                list_items = []
-                while i < len(lines):
-                    l = lines[i].strip()
-                    if re.match(r'^\d+\. ', l):
-                        list_items.append(re.sub(r'^\d+\. ', '', l))
-                        i += 1
-                    elif l == '':
-                        i += 1
-                        break
-                    else:
-                        break
-                html_parts.append(self._render_ol(list_items))
-                continue
+        import requests
 
-            # 分隔线
-            if line == '---' or line == '***':
-                html_parts.append(self._render_divider())
-                i += 1
-                continue
+        data = {"articles": articles}
 
-            # 普通段落
-            html_parts.append(self._render_paragraph(line))
-            i += 1
-
-        # 页脚
-        html_parts.append(self._render_footer())
-        html_parts.append('</section>')
-
-        return '\n'.join(html_parts)
-
-    # ========== 样式渲染方法 ==========
-
-    def _render_quote(self, text):
-        return f'''
-<section style="margin: 40px 0px;">
-    <section style="border-top: 2px solid {self.primary}; width: 60px; margin-bottom: 25px;"></section>
-    <section style="display: flex; align-items: flex-start;">
-        <section style="margin-right: 12px;">
-            <span style="font-size: 60px; line-height: 40px; color: {self.primary}; font-family: Georgia, serif;">"</span>
-        </section>
-        <section style="flex: 1; text-align: justify; font-size: 17px; color: {STYLE['light_text']}; line-height: 1.8; letter-spacing: 0.5px;">
-            {text}
-        </section>
-    </section>
-    <section style="display: flex; justify-content: flex-end; margin-top: 15px;">
-        <span style="font-size: 60px; line-height: 20px; color: {self.primary}; font-family: Georgia, serif; height: 30px; display: block;">"</span>
-    </section>
-</section>'''
-
-    def _render_title_with_image(self, title_num: str, title_text: str):
-        """渲染标题图片+标题文字"""
-        # 去掉标题文字开头的 # 号
-        title_text = re.sub(r'^#+\s*', '', title_text.strip())
-
-        # 从预上传的映射中获取微信URL
-        img_url = self.title_image_urls.get(title_num)
-
-        if not img_url:
-            # 如果没有找到URL（图片不存在或上传失败），降级为普通标题渲染
-            return self._render_h1(title_text, False)
-
-        return f'''
-<section style="margin: 45px 0 30px 0;">
-    <section style="text-align: left; margin-bottom: 15px;">
-        <img src="{img_url}" alt="标题{title_num}" style="max-width: 120px; height: auto;"/>
-    </section>
-    <section style="font-size: 24px; font-weight: bold; color: #1a1a1a; letter-spacing: 1px; line-height: 1.6; text-align: left;">
-        {self._process_inline(title_text)}
-    </section>
-</section>'''
-
-    def _render_h1(self, text, is_first=False):
-        # 第一个标题顶部边距小一些
-        margin_top = "20px" if is_first else "45px"
-        return f'''
-<section style="margin: {margin_top} 0 20px 0; display: flex; align-items: center;">
-    <section style="width: 4px; height: 26px; background-color: {self.primary}; margin-right: 12px; flex-shrink: 0;"></section>
-    <section style="font-size: 24px; font-weight: bold; color: #1a1a1a; letter-spacing: 1.5px;">
-        {self._process_inline(text)}
-    </section>
-</section>'''
-
-    def _render_h2(self, text):
-        return f'''
-<section style="margin: 35px 0 15px 0;">
-    <section style="font-size: 17px; font-weight: bold; color: {self.primary}; letter-spacing: 1px;">
-        {self._process_inline(text)}
-    </section>
-</section>'''
-
-    def _render_h3(self, text):
-        return f'''
-<section style="margin: 25px 0 10px 0;">
-    <section style="font-size: 16px; font-weight: bold; color: #1a1a1a; letter-spacing: 0.5px;">
-        {self._process_inline(text)}
-    </section>
-</section>'''
-
-    def _render_image(self, src, alt=""):
-        return f'''
-<section style="text-align: center; margin: 25px 0;">
-    <img src="{src}" alt="{alt}" style="max-width: 100%; border-radius: 5px;"/>
-</section>'''
-
-    def _render_paragraph(self, text):
-        processed = self._process_inline(text)
-        return f'''
-<section style="font-size: 17px; color: {STYLE['text_color']}; line-height: 1.8; margin-bottom: 15px;">
-    <p>{processed}</p>
-</section>'''
-
-    def _render_ul(self, items):
-        li_html = ''.join([
-            f'<li style="margin: 8px 0; line-height: 1.8;">{self._process_inline(item)}</li>'
-            for item in items
-        ])
-        return f'''
-<section style="font-size: 17px; color: {STYLE['text_color']}; line-height: 1.8; margin: 15px 0; padding-left: 20px;">
-    <ul style="margin: 0; padding-left: 20px;">{li_html}</ul>
-</section>'''
-
-    def _render_ol(self, items):
-        li_html = ''.join([
-            f'<li style="margin: 8px 0; line-height: 1.8;">{self._process_inline(item)}</li>'
-            for item in items
-        ])
-        return f'''
-<section style="font-size: 17px; color: {STYLE['text_color']}; line-height: 1.8; margin: 15px 0; padding-left: 20px;">
-    <ol style="margin: 0; padding-left: 20px;">{li_html}</ol>
-</section>'''
-
-    def _render_code(self, code):
-        escaped = code.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-        return f'''
-<section style="margin: 20px 0;">
-    <pre style="background: #f5f5f5; padding: 15px; border-radius: 5px; overflow-x: auto; font-size: 14px; line-height: 1.6;"><code>{escaped}</code></pre>
-</section>'''
-
-    def _render_divider(self):
-        return f'''
-<section style="margin: 45px auto; display: flex; align-items: center; justify-content: center; width: 60%;">
-    <section style="flex: 1; height: 1px; background-color: {self.primary}; opacity: 0.15;"></section>
-    <section style="width: 4px; height: 4px; background-color: {self.primary}; margin: 0 15px; transform: rotate(45deg);"></section>
-    <section style="flex: 1; height: 1px; background-color: {self.primary}; opacity: 0.15;"></section>
-</section>'''
-
-    def _render_footer(self):
-        return f'''
-<section style="margin-top: 60px; border-top: 1px solid #eee; text-align: center; padding-top: 20px;">
-    <span style="font-size: 11px; color: #bbb; letter-spacing: 3px; font-family: 'Helvetica Neue', Helvetica, sans-serif; text-transform: uppercase;">
-        {CONFIG['author']} · 2026 Edition
-    </span>
-</section>'''
-
-    def _process_inline(self, text):
-        """处理行内样式"""
-        # 粗体
-        text = re.sub(
-            r'\*\*(.+?)\*\*',
-            f'<span style="color: {self.primary}; font-weight: bold;">\\1</span>',
-            text
-        )
-        # 斜体
-        text = re.sub(r'\*(.+?)\*', r'<em>\1</em>', text)
-        # 链接
-        text = re.sub(
-            r'\[([^\]]+)\]\(([^)]+)\)',
-            f'<a href="\\2" style="color: {self.primary}; text-decoration: none;">\\1</a>',
-            text
-        )
-        # 行内代码
-        text = re.sub(
-            r'`([^`]+)`',
-            r'<code style="background: #f5f5f5; padding: 2px 6px; border-radius: 3px; font-size: 14px;">\1</code>',
-            text
-        )
-        return text
-
-    def _create_draft(self, title: str, html_content: str, thumb_media_id: str) -> str:
-        """创建草稿"""
-        print("[6/6] 创建草稿...")
-
-        url = f"{WECHAT_API['add_draft']}?access_token={self.access_token}"
-
-        data = {
-            "articles": [{
-                "title": title,
-                "author": CONFIG["author"],
-                "digest": "",
-                "content": html_content,
-                "thumb_media_id": thumb_media_id,
-                "need_open_comment": 0,
-                "only_fans_can_comment": 0
-            }]
-        }
+        def send(access_token):
+            response = requests.post(
+                f"{_get_wechat_api()['add_draft']}?access_token={access_token}",
+                data=json.dumps(data, ensure_ascii=False).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                timeout=30
+            )
+            return response.json()
 
-        response = requests.post(
-            url,
-            data=json.dumps(data, ensure_ascii=False).encode('utf-8'),
-            headers={'Content-Type': 'application/json'},
-            timeout=30
-        )
-        result = response.json()
+        result = self._call_with_token(send, "add_draft")
 
         if 'media_id' in result:
             print(f"      成功! media_id: {result['media_id']}")
@@ -709,12 +1069,42 @@ class WechatPublisher:
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("用法: python wechat_publisher.py <文章目录路径>")
+    args = sys.argv[1:]
+    watch = '--watch' in args
+    if watch:
+        args.remove('--watch')
+    new_draft = '--new-draft' in args
+    if new_draft:
+        args.remove('--new-draft')
+    accounts = None
+    if '--accounts' in args:
+        index = args.index('--accounts')
+        accounts = args[index + 1] if index + 1 < len(args) else ""
+        del args[index:index + 2]
+
+    if len(args) != 1 or accounts == "":
+        print("用法: python wechat_publisher.py <文章目录路径> [--watch] [--accounts 名称1,名称2|all] [--new-draft]")
         print("示例: python wechat_publisher.py ./artical/artical1")
+        print("      python wechat_publisher.py ./artical/artical1 --watch  # 监听文件变化，实时更新 preview.html")
+        print("      python wechat_publisher.py ./artical/artical1 --accounts all  # 发布到 WECHAT_ACCOUNTS 中的全部公众号")
+        print("      python wechat_publisher.py ./artical/artical1 --new-draft     # 不更新之前的草稿，新建一份")
         sys.exit(1)
 
-    article_dir = sys.argv[1]
-    result = publish_article(article_dir)
+    article_dir = args[0]
+    if watch:
+        from preview_watcher import watch_article
+        watch_article(WechatPublisher(article_dir))
+        sys.exit(0)
+
+    if accounts is not None:
+        names = None if accounts == "all" else [name.strip() for name in accounts.split(",") if name.strip()]
+        results = publish_to_accounts(article_dir, names, sync_draft=not new_draft)
+        print("\n" + "=" * 50)
+        for name, result in results.items():
+            print(f"   {name}: {'发布成功，草稿 media_id: ' + result if not result.startswith('错误') else result}")
+        print("=" * 50)
+        sys.exit(0 if all(not r.startswith("错误") for r in results.values()) else 1)
+
+    result = publish_article(article_dir, sync_draft=not new_draft)
     print(result)
 